@@ -0,0 +1,131 @@
+"""
+Benchmarks saving and loading an address book: the snapshot format of the codec module against pickle.
+
+Usage:
+    python benchmark_snapshot.py [NUMBER_OF_CONTACTS] [--mapped]
+
+With --mapped, snapshots of 1/100, 1/10 and all of the contacts are opened as a MappedSnapshot instead,
+to show that opening a book, reading a contact and reading a page do not depend on the size of the book.
+"""
+import os
+import pickle
+import random
+import sys
+import tempfile
+import time
+from datetime import date
+
+from my_address_book.address_book import AddressBook as AB
+from my_address_book.codec import CONTACTS
+from my_address_book.codec import MappedSnapshot
+from my_address_book.codec import write_snapshot
+from my_address_book.entities import Email
+from my_address_book.entities import Phone
+from my_address_book.entities import User
+from my_address_book.records import RecordContact
+
+SYLLABLES = ["ka", "lo", "mi", "ser", "an", "dr", "ol", "ve", "na", "tri", "po", "zu"]
+
+
+def make_book(size: int) -> AB:
+    """
+    The make_book function fills an address book with random contacts: one or two phones, most with an email
+    and a birthday.
+    """
+    random.seed(size)
+    addressbook = AB()
+    with addressbook.batch():
+        for number in range(size):
+            name = " ".join("".join(random.choices(SYLLABLES, k=3)).title() for _ in range(2)) + f" {number}"
+            record = RecordContact(User(name))
+            record.add_phone_number(Phone(f"+38067{random.randrange(10**7):07d}"), [1, "mobile"])
+            if number % 2:
+                record.add_phone_number(Phone(f"+38044{random.randrange(10**7):07d}"))
+            if number % 3:
+                record.add_email(Email(f"user{number}@corp{number % 50}.com"), [1, "work"])
+            if number % 4:
+                record.add_birthday(date(1950 + number % 50, 1 + number % 12, 1 + number % 28))
+            addressbook.add_record(record)
+    return addressbook
+
+
+def make_contacts(size: int):
+    """
+    The make_contacts function yields the (name, record) items of size contacts, in the order of their names,
+    without holding them in memory.
+    """
+    for number in range(size):
+        record = RecordContact(User(f"contact {number:08d}"))
+        record.add_phone_number(Phone(f"+38067{number % 10**7:07d}"), [1, "mobile"])
+        record.add_birthday(date(1950 + number % 50, 1 + number % 12, 1 + number % 28))
+        yield record.user.name, record
+
+
+def read_pickle_book(file_name: str) -> AB:
+    """
+    The read_pickle_book function reads a book the way read_records_from_file did before the snapshot format:
+    one pickle.load, with the garbage collector on and no indexes.
+    """
+    addressbook = AB()
+    with open(file_name, "rb") as file:
+        addressbook.data.update(pickle.load(file))
+    return addressbook
+
+
+def measure(title: str, function, *args) -> float:
+    start = time.perf_counter()
+    function(*args)
+    seconds = time.perf_counter() - start
+    print(f"{title:<32}{seconds:8.3f} s")
+    return seconds
+
+
+def main_mapped(size: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        for book_size in (size // 100, size // 10, size):
+            file_name = os.path.join(directory, f"book{book_size}.bin")
+            with open(file_name, "wb") as file:
+                write_snapshot(file, CONTACTS, make_contacts(book_size))
+
+            start = time.perf_counter()
+            snapshot = MappedSnapshot(file_name, CONTACTS)
+            opened = time.perf_counter()
+            snapshot.get_record(f"contact {book_size // 2:08d}")
+            found = time.perf_counter()
+            list(snapshot.page(book_size // 2, 20))
+            paged = time.perf_counter()
+            snapshot.close()
+            print(
+                f"{book_size:>9} contacts: open {(opened - start) * 1e3:.3f} ms, get_record {(found - opened) * 1e3:.3f} ms,"
+                f" page of 20 {(paged - found) * 1e3:.3f} ms"
+            )
+
+
+def main() -> None:
+    arguments = [argument for argument in sys.argv[1:] if argument != "--mapped"]
+    size = int(arguments[0]) if arguments else 100_000
+    if "--mapped" in sys.argv:
+        main_mapped(size)
+        return
+    addressbook = make_book(size)
+    with tempfile.TemporaryDirectory() as directory:
+        pickle_file, snapshot_file = os.path.join(directory, "book.pickle"), os.path.join(directory, "book.bin")
+
+        def save_pickle() -> None:
+            with open(pickle_file, "wb") as file:
+                pickle.dump(addressbook.data, file)
+
+        print(f"{size} contacts")
+        pickle_save = measure("save, pickle", save_pickle)
+        snapshot_save = measure("save, snapshot", addressbook.save_records_to_file, snapshot_file)
+        pickle_load = measure("load, pickle (no indexes)", read_pickle_book, pickle_file)
+        measure("load and index, snapshot", AB().read_records_from_file, snapshot_file)
+        loaded = AB()
+        snapshot_load = measure("load again, snapshot", loaded.read_records_from_file, snapshot_file)
+        measure("first search (loads indexes)", loaded.lookup_phone, "0951234567")
+        print(f"file size: pickle {os.path.getsize(pickle_file)} bytes, snapshot {os.path.getsize(snapshot_file)} bytes")
+        print(f"snapshot is {pickle_save / snapshot_save:.1f}x faster to save, {pickle_load / snapshot_load:.1f}x faster to load")
+
+
+if __name__ == "__main__":
+    main()
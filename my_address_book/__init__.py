@@ -1,17 +1,28 @@
-from .address_book import AddressBook
-from .constants import FILE_AB
-from .constants import FILE_NB
-from .main_form_AB import MainFormAB
-from .main_form_NB import MainFormNB
-from .main_form_SF import MainFormSF
-from .menu_forms_AB import AddContactForm
-from .menu_forms_AB import DeleteContactForm
-from .menu_forms_AB import EditContactForm
-from .menu_forms_NB import AddNoteForm
-from .menu_forms_NB import DeleteNoteForm
-from .menu_forms_NB import EditNoteForm
-from .notes_book import NotesBook
-from .theme import MyThemeApp
+"""
+The my_address_book package re-exports the books and the npyscreen forms of the application.
+
+The names are imported on first access, so the headless command line interface
+(python -m my_address_book) does not pay for loading npyscreen and prettytable.
+"""
+from importlib import import_module
+from typing import Any
+
+_EXPORTS = {
+    "AddressBook": ".address_book",
+    "FILE_AB": ".constants",
+    "FILE_NB": ".constants",
+    "MainFormAB": ".main_form_AB",
+    "MainFormNB": ".main_form_NB",
+    "MainFormSF": ".main_form_SF",
+    "AddContactForm": ".menu_forms_AB",
+    "DeleteContactForm": ".menu_forms_AB",
+    "EditContactForm": ".menu_forms_AB",
+    "AddNoteForm": ".menu_forms_NB",
+    "DeleteNoteForm": ".menu_forms_NB",
+    "EditNoteForm": ".menu_forms_NB",
+    "NotesBook": ".notes_book",
+    "MyThemeApp": ".theme",
+}
 
 __all__ = [
     "AddressBook",
@@ -29,3 +40,11 @@ __all__ = [
     "NotesBook",
     "MyThemeApp",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,4 @@
+"""Runs the headless command line interface: python -m my_address_book --help"""
+from my_address_book.cli import main
+
+raise SystemExit(main())
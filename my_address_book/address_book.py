@@ -5,51 +5,559 @@ This module defines the following classes:
     - AddressBook: A class representing an address book containing contact records.
     - Record: A class representing a contact record in the address book.
 """
+import heapq
+import locale
+import os
 import re
+import threading
+from datetime import date
+from datetime import timedelta
+from functools import partial
 
+from typing import Callable
+from typing import Iterable
+from typing import Iterator
+from typing import cast
+
+from my_address_book.codec import CONTACTS
+from my_address_book.constants import FUZZY_LIMIT
+from my_address_book.constants import FUZZY_MAX_DISTANCE
 from my_address_book.constants import PUNCTUATION
+from my_address_book.index_store import book_stamp
+from my_address_book.index_store import index_file_name
+from my_address_book.index_store import read_indexes
+from my_address_book.index_store import write_indexes
+from my_address_book.indexes import MIN_PHONE_SUFFIX
+from my_address_book.indexes import BirthdayIndex
+from my_address_book.indexes import EmailIndex
+from my_address_book.indexes import NameIndex
+from my_address_book.indexes import PhoneIndex
+from my_address_book.indexes import RecordIndex
+from my_address_book.indexes import bounded_levenshtein
+from my_address_book.indexes import canonical_phone
+from my_address_book.indexes import search_key
 from my_address_book.interface_book import Book
+from my_address_book.interface_book import _Batch
+from my_address_book.query import EmailMatches
+from my_address_book.query import compile_query
+from my_address_book.query import is_query
 from my_address_book.records import RecordContact
+from my_address_book.records import days_to_birthdays_table
+from my_address_book.storage import paused_gc
+
+
+class _IndexBuild:
+    """
+    A rebuild of the indexes of a book running in a background thread, with the new indexes it fills,
+    or a load of the index file put off until the indexes are first used (load).
+    """
+
+    def __init__(self, indexes: list[RecordIndex], load: Callable[[], None] | None = None):
+        self.indexes = indexes
+        self.done = threading.Event()
+        self.thread: threading.Thread | None = None
+        self.load = load
 
 
 class AddressBook(Book):
     """
     A class that represents an address book containing contact records.
 
+    The book keeps indexes over its records (see the indexes module). They are updated when a record is
+    added, changed or deleted; in a batch (see Book.batch), once per changed record at the end of the batch
+    or before the next search. Search results are plain views of the book and have no indexes.
+
+    A book read from a file loads its indexes from the index file next to it, when they are first used, if that was
+    written for the file as it is (see the index_store module); otherwise they are rebuilt and the index file is written. With
+    index_in_background set, they are rebuilt in a background thread and the searches scan the book meanwhile.
+
+    Attributes:
+        phone_index (PhoneIndex): The reverse phone index used by lookup_phone.
+        email_index (EmailIndex): The index of emails by domain, used by the '@domain' search.
+        name_index (NameIndex): The search keys of names and their trigram index, used by search and fuzzy_search.
+        birthday_index (BirthdayIndex): The min-heap of the next birthdays, used by next_birthdays and birthday_reminders.
+        index_in_background (bool): Rebuild missing or stale indexes of a book read from a file in the background.
+
     Methods:
-        add_record(record: 'Record') -> None:
+        add_record(record: 'Record', sort: bool = True) -> None:
             Adds a new contact record to the address book.
+        delete_record(record_name: str) -> None:
+            Removes a contact record from the address book.
+        reindex_record(record: 'RecordContact') -> None:
+            Updates the indexes after a record of the book has changed.
+        wait_for_indexes() -> None:
+            Waits for the indexes being rebuilt in the background.
+        save_indexes(file_name: str) -> bool:
+            Writes the indexes to the index file of the book file, for the next load.
+        merge_records(stale_keys: Iterable[str], items: Iterable[tuple[str, 'RecordContact']]) -> None:
+            Replaces records by the records saved by another process and updates the indexes.
+        lookup_phone(number: str) -> list['RecordContact']:
+            Returns the contacts owning a phone number.
         search(criteria: str) -> Union[str, 'AddressBook']:
-            Searches the address book for contacts matching the given criteria.
+            Searches the address book for contacts matching the given criteria;
+            names match in Cyrillic and in Latin spelling ('Oleksandr' finds 'Олександр' and vice versa),
+            '@example.com' finds the contacts with an email at the domain or its subdomains,
+            '~name' finds the names closest to the given one (see fuzzy_search),
+            'name:ann phone:+380 bday:<30 email:@corp.com' with AND/OR/NOT is a query (see the query module).
+        fuzzy_search(name: str, max_distance: int, limit: int) -> 'AddressBook':
+            Returns the contacts with the names closest to the given one, tolerating typos.
+        birthdays_within(days: int) -> 'AddressBook':
+            Returns the contacts whose birthday comes within the given number of days.
+        days_to_birthdays() -> dict[str, int]:
+            Returns the days to the next birthday of every contact with a birthday, computed once a day.
+        next_birthdays(k: int) -> 'AddressBook':
+            Returns the contacts with the k nearest birthdays, the nearest first.
+        birthday_reminders(days_ahead: int) -> Iterator[tuple[date, 'RecordContact']]:
+            Yields the birthdays due, each birthday once.
     """
 
-    def add_record(self, record: "RecordContact") -> None:
+    snapshot_kind = CONTACTS
+
+    def __init__(self, *args, **kwargs) -> None:
+        self.phone_index = PhoneIndex()
+        self.email_index = EmailIndex()
+        self.name_index = NameIndex()
+        self.birthday_index = BirthdayIndex()
+        self._days_to_birthdays: dict[str, int] = {}
+        self._days_to_birthdays_key: tuple[date, int] | None = None
+        self._pending_index: set[str] = set()
+        self._index_build: _IndexBuild | None = None
+        self.index_in_background = False
+        super().__init__(*args, **kwargs)
+
+    @property
+    def indexes(self) -> list[RecordIndex]:
+        """
+        Returns the indexes kept over the records of the book.
+        """
+        return [self.phone_index, self.email_index, self.name_index, self.birthday_index]
+
+    def add_record(self, record: "RecordContact", sort: bool = True) -> None:
         """
         Adds a new contact record to the address book.
+        Bulk callers pass sort=False and call sort_book() once after the last record.
         """
         name = record.user.name
         if name:
+            self._release_record(name)
             self.data[name] = record
-            self.sort_book()
+            record._book = self
+            self._index_record(name)
+            self.mark_changed(name)
+            if sort:
+                self.sort_book()
 
-    def search(self, criteria: str) -> "AddressBook":
+    def delete_record(self, record_name: str) -> None:
         """
-        Searches the address book for contacts matching the given criteria.
+        Removes a contact record from the address book.
         """
-        search_contacts = AddressBook()
+        self._release_record(record_name)
+        super().delete_record(record_name)
+        self._index_record(record_name)
+
+    def _release_record(self, name: str) -> None:
+        """
+        Releases the record with the name from the book, before it is replaced or deleted.
+        """
+        record = self.data.get(name)
+        if record is not None and record._book is self:
+            record._book = None
+
+    def _index_record(self, name: str) -> None:
+        """
+        Updates the indexes for the record with the name, added, changed or deleted; in a batch
+        or while the indexes are rebuilt in the background, later.
+        """
+        if self._batch is not None or self._index_build is not None:
+            self._pending_index.add(name)
+        else:
+            self._update_index(name)
 
+    def _update_index(self, name: str) -> None:
+        """
+        Puts the record with the name into the indexes, or takes it out of them if it is not in the book any more.
+        """
+        record = self.data.get(name)
+        for index in self.indexes:
+            if record is None:
+                index.remove(name)
+            else:
+                index.add(record)
+
+    def _update_pending_index(self) -> None:
+        """
+        Updates the indexes for the records changed in the batch (or during a rebuild) so far, before they are read.
+        """
+        if not self.indexes_ready:
+            return
+        while self._pending_index:
+            self._update_index(self._pending_index.pop())
+
+    def _commit_batch(self, batch: _Batch) -> None:
+        """
+        Updates the indexes for the records changed in the batch, then sorts the book once. When the batch
+        has changed most of the book (a bulk import), the indexes are rebuilt in bulk instead.
+        """
+        if self.indexes_ready and len(self._pending_index) > len(self.data) // 2:
+            self.reindex()
+        self._update_pending_index()
+        super()._commit_batch(batch)
+
+    def _rollback_batch(self, batch: _Batch) -> None:
+        """
+        Restores the records as they were when the batch began and rebuilds the indexes.
+        """
+        for name, record in self.data.items():
+            if batch.data.get(name) is not record:
+                record._book = None
+        super()._rollback_batch(batch)
+        self.reindex()
+
+    def reindex_record(self, record: "RecordContact") -> None:
+        """
+        Updates the indexes after a record of the book has changed; a record renamed in place is moved to its new name.
+        """
+        name = record.user.name
+        if self.data.get(name) is not record:
+            self._rename_record(record)
+            return
+        self._index_record(name)
+        self.mark_changed(name)
+
+    def _rename_record(self, record: "RecordContact") -> None:
+        """
+        Moves a record renamed in place (see User.name) from its old name to the new one, replacing a record
+        of that name as add_record does. A record renamed to an empty name stays under its old name.
+        """
+        old_name = next((name for name, value in self.data.items() if value is record), None)
+        if old_name is None or not record.user.name:
+            return
+        del self[old_name]
+        self._index_record(old_name)
+        self.add_record(record)
+
+    def reindex(self) -> None:
+        """
+        Rebuilds the indexes from all the records of the book; a rebuild in the background is dropped.
+        """
+        self._index_build = None
+        self._pending_index.clear()
         for record in self.data.values():
-            if self._matches_criteria(record, criteria):
-                search_contacts.add_record(record)
+            record._book = self
+        for index in self.indexes:
+            index.rebuild(self.data.values())
+        self.mark_changed()
+
+    def read_records_from_file(self, file_name: str) -> None:
+        """
+        Reads the records from a file (or a directory of shards) with the garbage collector paused. When the book
+        has an index file, it is loaded when the indexes are first used (see indexes_ready); otherwise
+        the indexes are rebuilt, in the background with index_in_background, and the index file is written.
+        """
+        stamp = book_stamp(file_name)
+        index_stamp = stamp if stamp is not None and os.path.exists(index_file_name(file_name)) else None
+        with paused_gc():
+            super().read_records_from_file(file_name)
+            if index_stamp is not None:
+                self._pending_index.clear()
+                for record in self.data.values():
+                    record._book = self
+                self._index_build = _IndexBuild(
+                    self.indexes, partial(self._load_index_file, file_name, index_stamp, len(self.data))
+                )
+                self.mark_changed()
+            elif not self.index_in_background:
+                self.reindex()
+                self._write_index_file(file_name, stamp, self.indexes)
+        if index_stamp is None and self.index_in_background:
+            self._rebuild_in_background(file_name, stamp)
+        self.saved_generation = self.generation
+
+    def _load_index_file(self, file_name: str, stamp: str, records: int) -> None:
+        """
+        Loads the indexes of the book read from the file with the stamp and the number of records from its index file;
+        when that was written for another version of the book, they are rebuilt as in read_records_from_file.
+        The index file is written only for the book as it is on the disk.
+        """
+        self._index_build = None
+        with paused_gc():
+            if read_indexes(index_file_name(file_name), stamp, self.indexes, records):
+                return
+            saved = self.generation == self.saved_generation
+            if not self.index_in_background:
+                self.reindex()
+        saved_stamp = stamp if saved else None
+        if self.index_in_background:
+            self._rebuild_in_background(file_name, saved_stamp)
+        else:
+            self._write_index_file(file_name, saved_stamp, self.indexes)
+        if saved:
+            self.saved_generation = self.generation
+
+    def merge_records(self, stale_keys: Iterable[str], items: Iterable[tuple[str, "RecordContact"]]) -> None:
+        """
+        Replaces records of the book by the records saved by another process (see Book.merge_records)
+        and updates the indexes for them.
+        """
+        stale_keys, records = list(stale_keys), dict(items)
+        super().merge_records(stale_keys, records.items())
+        for name in records.keys() | stale_keys:
+            record = self.data.get(name)
+            if record is not None:
+                record._book = self
+            self._index_record(name)
+
+    def _write_index_file(self, file_name: str, stamp: str | None, indexes: list[RecordIndex]) -> None:
+        """
+        Writes the index file of the book file with the stamp; the indexes are only a cache,
+        so a book is still loaded when its index file cannot be written.
+        """
+        if stamp is not None:
+            try:
+                write_indexes(index_file_name(file_name), stamp, indexes)
+            except OSError:
+                pass
+
+    def _rebuild_in_background(self, file_name: str, stamp: str | None) -> None:
+        """
+        Starts rebuilding the indexes in a background thread over the records read from the file. The records
+        changed meanwhile are indexed again when the new indexes are put in place (see indexes_ready).
+        The thread leaves the garbage collector on: pausing it would pause it for the whole process.
+        """
+        for index in self.indexes:
+            index.clear()
+        self._pending_index.clear()
+        records = list(self.data.values())
+        for record in records:
+            record._book = self
+        build = self._index_build = _IndexBuild([PhoneIndex(), EmailIndex(), NameIndex(), BirthdayIndex()])
+
+        def rebuild() -> None:
+            try:
+                for record in records:
+                    for index in build.indexes:
+                        index.add(record)
+                self._write_index_file(file_name, stamp, build.indexes)
+            finally:
+                build.done.set()
+
+        build.thread = threading.Thread(target=rebuild, name="index-rebuild", daemon=True)
+        build.thread.start()
+        self.mark_changed()
+
+    @property
+    def indexes_ready(self) -> bool:
+        """
+        Tells if the indexes cover the book; False while they are rebuilt in the background.
+        New indexes are put in place here, in the thread using the book, once they are built or loaded.
+        """
+        build = self._index_build
+        if build is not None and build.load is not None:
+            build.load()
+        elif build is not None and build.done.is_set():
+            self.phone_index = cast(PhoneIndex, build.indexes[0])
+            self.email_index = cast(EmailIndex, build.indexes[1])
+            self.name_index = cast(NameIndex, build.indexes[2])
+            self.birthday_index.load(build.indexes[3].dump())
+            self._index_build = None
+        return self._index_build is None
+
+    def wait_for_indexes(self) -> None:
+        """
+        Waits for the indexes being rebuilt in the background, if any, and puts them in place.
+        """
+        while not self.indexes_ready and self._index_build is not None:
+            self._index_build.done.wait()
+        self._update_pending_index()
+
+    def save_indexes(self, file_name: str) -> bool:
+        """
+        Writes the indexes to the index file of the book file (see the index_store module), so the next load
+        does not rebuild them. Nothing is written (False) when the book has changed since it was last saved to
+        or read from a file, its indexes are still being rebuilt or the index file cannot be written.
+        """
+        if self.generation != self.saved_generation or not self.indexes_ready:
+            return False
+        self._update_pending_index()
+        stamp = book_stamp(file_name)
+        if stamp is None:
+            return False
+        try:
+            with paused_gc():
+                write_indexes(index_file_name(file_name), stamp, self.indexes)
+        except OSError:
+            return False
+        return True
+
+    def lookup_phone(self, number: str) -> list["RecordContact"]:
+        """
+        Returns the contacts owning a phone number (caller ID). Local and international formats of the number
+        find the same contact; see PhoneIndex.lookup.
+        """
+        self._update_pending_index()
+        if not self.indexes_ready:
+            return list(self._view(self._scan_phone(number)).values())
+        return list(self._view(self.phone_index.lookup(number)).values())
+
+    def _scan_phone(self, number: str) -> set[str]:
+        """
+        Returns the contacts owning a phone number by scanning the book, with the rules of PhoneIndex.lookup,
+        while the indexes are rebuilt.
+        """
+        phone = canonical_phone(number)
+        suffixes = {digits for digits in (phone, phone.lstrip("0")) if len(digits) >= MIN_PHONE_SUFFIX}
+        exact, found = set(), set()
+        for name, record in self.data.items():
+            for phone_number in record.phone_numbers:
+                own = canonical_phone(phone_number.subrecord.phone or "")
+                if not own:
+                    continue
+                if own == phone:
+                    exact.add(name)
+                elif any(own.endswith(digits) or (len(own) >= MIN_PHONE_SUFFIX and digits.endswith(own)) for digits in suffixes):
+                    found.add(name)
+        return exact or found
+
+    def fuzzy_search(self, name: str, max_distance: int = FUZZY_MAX_DISTANCE, limit: int = FUZZY_LIMIT) -> "AddressBook":
+        """
+        Returns up to limit contacts whose names are within max_distance typos of the given name, the closest first.
+        """
+        self._update_pending_index()
+        if self.indexes_ready:
+            matches = self.name_index.closest(name, max_distance, limit)
+        else:
+            key = search_key(name)
+            distances = ((bounded_levenshtein(key, search_key(name_book), max_distance), name_book) for name_book in self.data)
+            matches = heapq.nsmallest(limit, ((distance, name_book) for distance, name_book in distances if distance is not None))
+        closest = AddressBook()
+        for _, name_closest in matches:
+            closest.data[name_closest] = self.data[name_closest]
+        return closest
+
+    def _view(self, names: set[str]) -> "AddressBook":
+        """
+        Returns a book (without indexes of its own) of the records with the given names, in the order of the book.
+        """
+        view = AddressBook()
+        for name in sorted(names, key=locale.strxfrm):
+            if name in self.data:
+                view.data[name] = self.data[name]
+        return view
+
+    def _normalize_criteria(self, criteria: str) -> str:
+        """
+        Queries differing only in spaces give the same results, so they are cached as one.
+        """
+        return " ".join(criteria.split()) if is_query(criteria) else criteria
 
+    def _search(self, criteria: str) -> "AddressBook":
+        """
+        Searches the address book for contacts matching the given criteria (see Book.search for the cache).
+        The results keep the order of the book, so they do not have to be sorted again.
+        """
+        self._update_pending_index()
+        if criteria.startswith("@") and len(criteria) > 1:
+            if not self.indexes_ready:
+                email = EmailMatches(criteria)
+                return self._view({name for name, record in self.data.items() if email.matches(self, record)})
+            return self._view(self.email_index.by_domain(criteria[1:]))
+
+        if criteria.startswith("~") and len(criteria) > 1:
+            return self.fuzzy_search(criteria[1:])
+
+        if is_query(criteria):
+            return self._view(compile_query(criteria).execute(self))
+
+        if criteria[0] in "-+" and criteria[1:].isdigit():
+            return self._search_birthdays(criteria[0] == "-", int(criteria[1:]))
+
+        search_contacts = AddressBook()
+        key_criteria = search_key(criteria)
+
+        for name, record in self.data.items():
+            if self._matches_criteria(record, criteria, key_criteria):
+                search_contacts.data[name] = record
+
+        return search_contacts
+
+    def _search_birthdays(self, within: bool, days: int) -> "AddressBook":
+        """
+        Returns the contacts whose birthday comes within the given number of days ('-7') or not before them ('+7').
+        """
+        search_contacts = AddressBook()
+        for name, days_to_birthday in self.days_to_birthdays().items():
+            if days >= days_to_birthday if within else days <= days_to_birthday:
+                search_contacts.data[name] = self.data[name]
         return search_contacts
 
-    def _matches_criteria(self, record: "RecordContact", criteria: str) -> bool:
+    def birthdays_within(self, days: int) -> "AddressBook":
+        """
+        Returns the contacts whose birthday comes within the given number of days, the nearest birthday first.
+        """
+        upcoming = [
+            (days_to_birthday, name) for name, days_to_birthday in self.days_to_birthdays().items() if days_to_birthday <= days
+        ]
+
+        birthdays = AddressBook()
+        for _, name in sorted(upcoming, key=lambda item: item[0]):
+            birthdays.data[name] = self.data[name]
+        return birthdays
+
+    def next_birthdays(self, k: int) -> "AddressBook":
+        """
+        Returns the contacts with the k nearest birthdays, from today on, the nearest first.
+        They are read from the top of the birthday heap, without scanning the book.
+        """
+        self._update_pending_index()
+        if self.indexes_ready:
+            names = [name for _, name in self.birthday_index.next_birthdays(k)]
+        else:
+            names = [name for _, name in heapq.nsmallest(k, ((days, name) for name, days in self.days_to_birthdays().items()))]
+        upcoming = AddressBook()
+        for name in names:
+            upcoming.data[name] = self.data[name]
+        return upcoming
+
+    def birthday_reminders(self, days_ahead: int = 0) -> Iterator[tuple[date, "RecordContact"]]:
+        """
+        Yields the (date, contact) of the birthdays from today to days_ahead days later, the nearest first.
+        Every birthday is yielded once, so a reminder loop can call it again and again.
+        """
+        self._update_pending_index()
+        if not self.indexes_ready:
+            today = date.today()
+            due = sorted((days, name) for name, days in self.days_to_birthdays().items() if days <= days_ahead)
+            for days, name in due:
+                if self.birthday_index.remind(name, today.toordinal() + days):
+                    yield today + timedelta(days=days), self.data[name]
+            return
+        for birthday, name in self.birthday_index.due(days_ahead):
+            yield birthday, self.data[name]
+
+    def days_to_birthdays(self) -> dict[str, int]:
+        """
+        Returns the days to the next birthday of every contact with a birthday. They are computed in one pass
+        over the book with the table of the day, and kept until midnight or until the book changes
+        (a changed birthday changes the book, see RecordContact.add_birthday).
+        """
+        today = date.today()
+        if self._days_to_birthdays_key != (today, self.generation):
+            table = days_to_birthdays_table(today)
+            self._days_to_birthdays = {
+                name: table[(record.user.birthday_date.month, record.user.birthday_date.day)]
+                for name, record in self.data.items()
+                if record.user.birthday_date is not None
+            }
+            self._days_to_birthdays_key = (today, self.generation)
+        return self._days_to_birthdays
+
+    def _matches_criteria(self, record: "RecordContact", criteria: str, key_criteria: str) -> bool:
         """
         Checks if a contact record matches the given search criteria.
+        The name is matched by its precomputed search key against the search key of the criteria.
         """
         if criteria[0] not in PUNCTUATION:
-            if re.search(criteria.lower(), record.user.name.lower()):
+            if re.search(key_criteria, self.name_index.key(record.user.name)):
                 return True
 
             if record.user.birthday_date and re.search(criteria, record.user.birthday_date.strftime("%d-%m-%Y")):
@@ -61,13 +569,13 @@ class AddressBook(Book):
             if any(re.search(criteria.lower(), email.subrecord.email.lower()) for email in record.emails):
                 return True
 
-        days_to_birthday = record.days_to_birthday()
+        if criteria[0] in "-+" and criteria[1:].isdigit():
+            days_to_birthday = self.days_to_birthdays().get(record.user.name)
 
-        if days_to_birthday is not None:
-            if criteria[0] == "-" and criteria[1:].isdigit():
-                return int(criteria[1:]) >= days_to_birthday
+            if days_to_birthday is not None:
+                if criteria[0] == "-":
+                    return int(criteria[1:]) >= days_to_birthday
 
-            if criteria[0] == "+" and criteria[1:].isdigit():
                 return int(criteria[1:]) <= days_to_birthday
 
         return False
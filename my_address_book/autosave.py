@@ -0,0 +1,171 @@
+"""
+The autosave module saves changed books in the background.
+
+An edit only marks its book dirty and returns at once. A worker thread saves a dirty book when its
+delay is over, so the edits made within the delay cost one save. Books are written with Book.write_book_file
+through storage.atomic_write, so the file on the disk always holds a complete snapshot, or a complete
+differential snapshot of the few records changed since it; a book kept
+in shards is saved with Book.save_records_to_file, which rewrites only its changed shards (see the shards module).
+
+The book is written while the application may go on changing it. The generation of the book is read
+before the write and checked after it: if the book has changed meanwhile (or a batch of changes is open),
+the written file is thrown away and the book is saved again after the next delay.
+
+Classes:
+    AutoSave: Saves the changed books in a background thread.
+"""
+import os
+import threading
+import time
+
+from my_address_book.constants import AUTOSAVE_DELAY
+from my_address_book.interface_book import Book
+from my_address_book.shards import is_sharded
+from my_address_book.storage import locked_directory
+
+
+class _BookChanged(Exception):
+    """The book changed while it was written"""
+
+
+class AutoSave:
+    """
+    Saves the changed books in a background thread.
+
+    Attributes:
+        delay (float): The seconds between marking a book dirty and saving it; the edits made meanwhile are saved together.
+        saves (int): The number of saves written.
+
+    Methods:
+        mark_dirty(book, file_name): Schedules the save of a changed book and returns at once.
+        flush(): Saves all the changed books now, in the calling thread.
+        close(): Saves all the changed books and stops the background thread.
+    """
+
+    def __init__(self, delay: float = AUTOSAVE_DELAY):
+        self.delay = delay
+        self.saves = 0
+        self._dirty: dict[str, tuple[Book, float]] = {}
+        self._condition = threading.Condition()
+        self._save_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._closed = False
+
+    def __enter__(self) -> "AutoSave":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def mark_dirty(self, book: Book, file_name: str) -> None:
+        """
+        The mark_dirty function schedules the save of a changed book to file_name after the delay.
+        A book already waiting keeps its time, so a stream of edits is saved at least once every delay.
+        """
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("The autosave is closed")
+            if file_name not in self._dirty:
+                self._dirty[file_name] = (book, time.monotonic() + self.delay)
+                self._condition.notify()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="autosave", daemon=True)
+                self._thread.start()
+
+    def flush(self) -> None:
+        """
+        The flush function saves all the changed books now, in the calling thread, after the save in progress
+        in the background (if any) is done.
+        """
+        errors = []
+        with self._save_lock:
+            with self._condition:
+                dirty, self._dirty = self._dirty, {}
+            for file_name, (book, _) in dirty.items():
+                try:
+                    self._save(book, file_name)
+                except OSError as error:
+                    self._keep_dirty(book, file_name)
+                    errors.append(error)
+        if errors:
+            raise errors[0]
+
+    def close(self) -> None:
+        """
+        The close function saves all the changed books and stops the background thread; call it on exit.
+        """
+        self.flush()
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        """
+        The _run function is the background thread: it waits for the first due book and saves the due books.
+        """
+        while self._wait_for_due():
+            with self._save_lock:
+                with self._condition:
+                    now = time.monotonic()
+                    due = {file_name: book for file_name, (book, due_time) in self._dirty.items() if due_time <= now}
+                    for file_name in due:
+                        del self._dirty[file_name]
+                for file_name, book in due.items():
+                    try:
+                        self._save(book, file_name)
+                    except OSError:
+                        # The disk may be full or the file locked: try again later, flush() reports the error.
+                        self._keep_dirty(book, file_name)
+
+    def _wait_for_due(self) -> bool:
+        """
+        The _wait_for_due function waits until a book is due to be saved (True) or the autosave is closed (False).
+        """
+        with self._condition:
+            while not self._closed:
+                now = time.monotonic()
+                due_times = [due_time for _, due_time in self._dirty.values()]
+                if due_times and min(due_times) <= now:
+                    return True
+                self._condition.wait(min(due_times) - now if due_times else None)
+            return False
+
+    def _save(self, book: Book, file_name: str) -> None:
+        """
+        The _save function writes a book and replaces its file, unless the book changed during the write;
+        then the book stays dirty and is saved again after the delay.
+        """
+        generation = book.generation
+        try:
+            if book.in_batch:
+                raise _BookChanged
+            if is_sharded(file_name):
+                # The written shards are committed; the records changed meanwhile are written by the next save.
+                book.save_records_to_file(file_name)
+                if book.generation != generation or book.in_batch:
+                    raise _BookChanged
+            else:
+
+                def check_unchanged() -> None:
+                    if book.generation != generation or book.in_batch:
+                        raise _BookChanged
+
+                with locked_directory(os.path.dirname(os.path.abspath(file_name))):
+                    book.write_book_file(file_name, check_unchanged)
+        except (_BookChanged, RuntimeError):
+            # RuntimeError: the records changed size while they were written.
+            self._keep_dirty(book, file_name)
+            return
+        book.saved_generation = generation
+        self.saves += 1
+
+    def _keep_dirty(self, book: Book, file_name: str) -> None:
+        """
+        The _keep_dirty function schedules a book that could not be saved to be saved again after the delay.
+        """
+        with self._condition:
+            self._dirty.setdefault(file_name, (book, time.monotonic() + self.delay))
+            self._condition.notify()
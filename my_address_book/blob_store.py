@@ -0,0 +1,133 @@
+"""
+The blob_store module keeps long note bodies in an append-only blob file next to the notes book (BLOB_SUFFIX,
+or BLOB_NAME in a directory of shards), synced before the snapshot referring to them, so they are read on demand.
+A full save of a directory of shards rewrites the bodies still used to a new blob file once most of it is unused.
+
+Classes:
+    BlobHandle: The place of a body in a blob file.
+    BlobWriter: Appends bodies to a blob file.
+
+Functions:
+    read_blobs(blobs: Sequence[BlobHandle]) -> list[str]: Reads many bodies, opening each blob file once.
+"""
+import os
+import zlib
+from typing import BinaryIO
+from typing import NamedTuple
+from typing import Sequence
+
+from my_address_book.constants import NOTE_COMPRESS_SIZE
+
+BLOB_MAGIC = b"MABB"
+BLOB_SUFFIX = ".blob"
+BLOB_NAME = "notes.blob"
+
+
+class BlobHandle(NamedTuple):
+    """
+    The place of a body in a blob file.
+
+    Attributes:
+        file_name (str): The blob file.
+        offset (int): The offset of the body in the file.
+        length (int): The number of bytes of the body in the file.
+        compressed (bool): The body is compressed with zlib.
+
+    Methods:
+        read(file: BinaryIO | None = None) -> str:
+            Reads the body from the blob file.
+    """
+
+    file_name: str
+    offset: int
+    length: int
+    compressed: bool
+
+    def read(self, file: BinaryIO | None = None) -> str:
+        """
+        The read function reads the body from the blob file, or from file when it is the blob file already open.
+        A missing or truncated file raises OSError.
+        """
+        if file is None:
+            with open(self.file_name, "rb") as file:
+                return self.read(file)
+        file.seek(self.offset)
+        data = file.read(self.length)
+        if len(data) != self.length:
+            raise OSError(f"The blob file {self.file_name} is truncated")
+        return (zlib.decompress(data) if self.compressed else data).decode()
+
+
+def read_blobs(blobs: Sequence[BlobHandle]) -> list[str]:
+    """
+    The read_blobs function reads the bodies of blobs, in their order, opening each blob file once
+    and reading it from the start to the end.
+    """
+    bodies = [""] * len(blobs)
+    files: dict[str, BinaryIO] = {}
+    try:
+        for number in sorted(range(len(blobs)), key=lambda number: (blobs[number].file_name, blobs[number].offset)):
+            blob = blobs[number]
+            if blob.file_name not in files:
+                files[blob.file_name] = open(blob.file_name, "rb")
+            bodies[number] = blob.read(files[blob.file_name])
+    finally:
+        for file in files.values():
+            file.close()
+    return bodies
+
+
+class BlobWriter:
+    """
+    Appends bodies to a blob file; the file is synced to the disk when the with block ends.
+
+    Attributes:
+        file_name (str): The blob file, created with its BLOB_MAGIC header if it does not exist.
+
+    Methods:
+        append(text: str) -> BlobHandle:
+            Appends a body and returns its handle.
+        close() -> None:
+            Syncs the file to the disk and closes it.
+    """
+
+    def __init__(self, file_name: str):
+        self.file_name = file_name
+        self._file = open(file_name, "ab")
+        self._offset = self._file.seek(0, os.SEEK_END)
+        if not self._offset:
+            self._offset = self._file.write(BLOB_MAGIC)
+
+    def __enter__(self) -> "BlobWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def append(self, text: str) -> BlobHandle:
+        """
+        The append function appends a body at the end of the blob file, compressed when that makes it smaller,
+        and returns its handle.
+        """
+        data = text.encode()
+        compressed = False
+        if len(data) > NOTE_COMPRESS_SIZE:
+            packed = zlib.compress(data)
+            if len(packed) < len(data):
+                data, compressed = packed, True
+        handle = BlobHandle(self.file_name, self._offset, len(data), compressed)
+        self._file.write(data)
+        self._offset += len(data)
+        return handle
+
+    def close(self) -> None:
+        """
+        The close function flushes and syncs the appended bodies to the disk and closes the file.
+        """
+        if self._file.closed:
+            return
+        try:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        finally:
+            self._file.close()
@@ -0,0 +1,537 @@
+"""
+The cli module provides a headless command line interface for scripted batch operations.
+
+It works with the same AddressBook, NotesBook, validation functions and sorter_run as the npyscreen
+application, but never loads npyscreen. The modules needed by a single command are imported by that
+command only, so the interface starts quickly.
+
+Usage:
+    python -m my_address_book [--addressbook FILE] [--notesbook FILE] [--json] COMMAND ...
+
+Commands:
+    search QUERY [--notes] [--jobs N]
+                                    Search contacts (or notes) with the search box syntax
+                                    or a query such as 'name:ann AND bday:<30' (notes: '#work NOT #done',
+                                    see the query module);
+                                    --jobs searches a very large address book in N processes.
+    add NAME [--phone P] [--email E] [--birthday DD-MM-YYYY]
+                                    Add a contact; 'P(mobile)' or 'E(work)' set an assignment.
+    delete NAME                     Delete a contact.
+    show NAME                       Show a contact, decoding only its record (see codec.MappedSnapshot).
+    list [--page N] [--page-size S] [--notes [--newest]]
+                                    List a page of contacts (or notes) in the order of the book;
+                                    --newest lists the notes the newest first.
+    lookup-phone NUMBER             List the contacts owning a phone number (caller ID).
+    email-domains                   Count the contacts per email domain.
+    birthdays-within DAYS           List contacts whose birthday is within DAYS days.
+    next-birthdays K                List the contacts with the K nearest birthdays.
+    reminders [--days N]            List the birthdays due today (or within N days).
+    import FILE                     Import contacts from a .csv or .vcf file (optionally .gz).
+    dedupe [--min-score S] [--apply]
+                                    List the contacts that are probably the same person; --apply merges them.
+    convert [FILE ...] [--notes]    Convert book files saved with pickle to the snapshot format (see the codec module);
+                                    --notes tells that the given files hold notes.
+    export [FILE] [--format F] [--gzip] [--notes]
+                                    Export contacts (or notes) to a file or stdout.
+    sort-folder PATH                Sort the files of a folder by their type.
+    serve [--host H] [--port P] [--unix PATH]
+                                    Serve the books as a local JSON API (see the server module).
+
+Functions:
+    main(argv: list[str] | None = None) -> int: Runs the command line interface and returns the exit code.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+from collections.abc import Mapping
+from typing import Callable
+from typing import TypeVar
+
+from my_address_book.address_book import AddressBook as AB
+from my_address_book.constants import DATE_FORMAT
+from my_address_book.constants import DEDUPE_MIN_SCORE
+from my_address_book.constants import EMAIL_ASSIGNMENTS
+from my_address_book.constants import FILE_AB
+from my_address_book.constants import FILE_NB
+from my_address_book.constants import NUMBER_OF_CONTACTS_PER_PAGE
+from my_address_book.constants import PHONE_ASSIGNMENTS
+from my_address_book.notes_book import NotesBook as NB
+from my_address_book.shards import ShardedStorage
+from my_address_book.shards import is_sharded
+from my_address_book.validation import check_name_in_address_book
+from my_address_book.validation import check_name_not_in_address_book
+from my_address_book.validation import check_path_address_to_sort_files_in_it
+
+
+BookT = TypeVar("BookT", AB, NB)
+
+
+class CommandError(Exception):
+    """An error reported to the user of the command line interface"""
+
+
+def _load_book(book: BookT, file_name: str) -> BookT:
+    """
+    The _load_book function reads a book from its file or directory of shards; a missing file gives an empty book.
+    A file saved with pickle is reported, to be converted first.
+    """
+    from my_address_book.codec import SnapshotError
+
+    if os.path.exists(file_name) or is_sharded(file_name):
+        try:
+            book.read_records_from_file(file_name)
+        except SnapshotError as error:
+            raise CommandError(str(error)) from error
+    return book
+
+
+def _open_records(book: BookT, file_name: str, key: str | None = None) -> Mapping:
+    """
+    The _open_records function maps the records of a book file into memory without reading them
+    (see codec.MappedSnapshot), for the commands that read only a few records. Of a book in shards, only
+    the shard holding the key is mapped; without a key, the shards are read whole. A file saved
+    in an older format or with a differential snapshot is read whole into the book; a missing file gives no records.
+    """
+    from my_address_book.blob_store import BLOB_SUFFIX
+    from my_address_book.codec import DELTA_SUFFIX
+    from my_address_book.codec import MappedSnapshot
+    from my_address_book.codec import SnapshotError
+
+    try:
+        if is_sharded(file_name):
+            shard = ShardedStorage(file_name).map_shard(key, book.snapshot_kind) if key is not None else None
+            return shard if shard is not None else _load_book(book, file_name).data
+        if not os.path.exists(file_name):
+            return {}
+        if os.path.exists(file_name + DELTA_SUFFIX):
+            return _load_book(book, file_name).data
+        return MappedSnapshot(file_name, book.snapshot_kind, file_name + BLOB_SUFFIX)
+    except SnapshotError:
+        return _load_book(book, file_name).data
+
+
+def _print_result(args: argparse.Namespace, data: object, text: str) -> None:
+    """
+    The _print_result function prints the result of a command as JSON or as text.
+    """
+    if args.json:
+        print(json.dumps(data, ensure_ascii=False))
+    else:
+        print(text)
+
+
+def _print_contacts(args: argparse.Namespace, addressbook: AB) -> None:
+    """
+    The _print_contacts function prints contacts as a JSON list or as the table of the main form.
+    """
+    if args.json:
+        from my_address_book.exporter import contact_to_dict
+
+        print(json.dumps([contact_to_dict(contact) for contact in addressbook.values()], ensure_ascii=False))
+    else:
+        from my_address_book.utils import print_all_contacts
+
+        print(print_all_contacts(addressbook))
+
+
+def _print_notes(args: argparse.Namespace, notesbook: NB) -> None:
+    """
+    The _print_notes function prints notes as a JSON list or as the table of the notes form.
+    """
+    if args.json:
+        from my_address_book.exporter import note_to_dict
+
+        print(json.dumps([note_to_dict(number, record) for number, record in notesbook.items()], ensure_ascii=False))
+    else:
+        from my_address_book.utils import print_all_notes
+
+        print(print_all_notes(notesbook))
+
+
+def command_search(args: argparse.Namespace) -> None:
+    """
+    The command_search function prints the contacts or, with --notes, the notes matching the query.
+    """
+    from my_address_book.query import QueryError
+
+    if args.notes:
+        try:
+            _print_notes(args, _load_book(NB(), args.notesbook).search(args.query))
+        except (QueryError, re.error) as error:
+            raise CommandError(str(error)) from error
+        return
+
+    addressbook = _load_book(AB(), args.addressbook)
+    try:
+        if args.jobs > 1:
+            from my_address_book.parallel_search import ParallelSearch
+
+            with ParallelSearch(addressbook, args.jobs) as parallel_search:
+                _print_contacts(args, parallel_search.search(args.query))
+        else:
+            _print_contacts(args, addressbook.search(args.query))
+    except (QueryError, re.error) as error:
+        raise CommandError(str(error)) from error
+
+
+def command_add(args: argparse.Namespace) -> None:
+    """
+    The command_add function validates a new contact, adds it to the address book and saves the book.
+    """
+    from my_address_book.importer import ContactRow
+    from my_address_book.importer import make_contact
+    from my_address_book.importer import split_assignment
+
+    addressbook = _load_book(AB(), args.addressbook)
+    message_error = check_name_in_address_book(addressbook, args.name)
+    if message_error:
+        raise CommandError(message_error)
+
+    row = ContactRow(
+        0,
+        args.name,
+        [split_assignment(phone, PHONE_ASSIGNMENTS) for phone in args.phone],
+        [split_assignment(email, EMAIL_ASSIGNMENTS) for email in args.email],
+        args.birthday,
+    )
+    try:
+        contact = make_contact(row)
+    except ValueError as error:
+        raise CommandError(str(error)) from error
+
+    addressbook.add_record(contact)
+    addressbook.save_records_to_file(args.addressbook)
+    _print_result(args, {"added": args.name}, f"The contact '{args.name}' has been added")
+
+
+def command_delete(args: argparse.Namespace) -> None:
+    """
+    The command_delete function deletes a contact from the address book and saves the book.
+    """
+    addressbook = _load_book(AB(), args.addressbook)
+    message_error = check_name_not_in_address_book(addressbook, args.name)
+    if message_error:
+        raise CommandError(message_error)
+
+    addressbook.delete_record(args.name)
+    addressbook.save_records_to_file(args.addressbook)
+    _print_result(args, {"deleted": args.name}, f"The contact '{args.name}' has been deleted.")
+
+
+def command_show(args: argparse.Namespace) -> None:
+    """
+    The command_show function prints a contact. Only its record is read from the address book file.
+    """
+    records = _open_records(AB(), args.addressbook, args.name)
+    message_error = check_name_not_in_address_book(records, args.name)
+    if message_error:
+        raise CommandError(message_error)
+
+    contact = AB()
+    contact.data[args.name] = records[args.name]
+    _print_contacts(args, contact)
+
+
+def command_list(args: argparse.Namespace) -> None:
+    """
+    The command_list function prints a page of the contacts or, with --notes, the notes in the order of the book.
+    Only the records of the page are read from the book file; with --newest, the notes book is read whole
+    and listed the newest first.
+    """
+    from itertools import islice
+
+    from my_address_book.codec import MappedSnapshot
+
+    if args.page < 1 or args.page_size < 1:
+        raise CommandError("The page and the page size start from 1")
+    notesbook, addressbook = NB(), AB()
+    records: Mapping
+    if args.notes and args.newest:
+        records = _load_book(notesbook, args.notesbook).newest_first()
+    elif args.notes:
+        records = _open_records(notesbook, args.notesbook)
+    else:
+        records = _open_records(addressbook, args.addressbook)
+    start = (args.page - 1) * args.page_size
+    if isinstance(records, MappedSnapshot):
+        page = dict(records.page(start, args.page_size))
+    else:
+        page = dict(islice(records.items(), start, start + args.page_size))
+
+    if args.notes:
+        notesbook.data = page
+        _print_notes(args, notesbook)
+    else:
+        addressbook.data = page
+        _print_contacts(args, addressbook)
+
+
+def command_lookup_phone(args: argparse.Namespace) -> None:
+    """
+    The command_lookup_phone function prints the contacts owning a phone number.
+    """
+    addressbook = _load_book(AB(), args.addressbook)
+    owners = AB()
+    for contact in addressbook.lookup_phone(args.number):
+        owners.data[contact.user.name] = contact
+    _print_contacts(args, owners)
+
+
+def command_email_domains(args: argparse.Namespace) -> None:
+    """
+    The command_email_domains function prints the number of contacts per email domain, the largest first.
+    """
+    addressbook = _load_book(AB(), args.addressbook)
+    counts = sorted(addressbook.email_index.domain_counts().items(), key=lambda item: (-item[1], item[0]))
+    _print_result(args, dict(counts), "\n".join(f"{domain}: {count}" for domain, count in counts))
+
+
+def command_birthdays_within(args: argparse.Namespace) -> None:
+    """
+    The command_birthdays_within function prints the contacts whose birthday comes within the given
+    number of days, the nearest birthday first.
+    """
+    addressbook = _load_book(AB(), args.addressbook)
+    _print_contacts(args, addressbook.birthdays_within(args.days))
+
+
+def command_next_birthdays(args: argparse.Namespace) -> None:
+    """
+    The command_next_birthdays function prints the contacts with the nearest birthdays, the nearest first.
+    """
+    addressbook = _load_book(AB(), args.addressbook)
+    _print_contacts(args, addressbook.next_birthdays(args.k))
+
+
+def command_reminders(args: argparse.Namespace) -> None:
+    """
+    The command_reminders function prints the birthdays due today or within the given number of days.
+    """
+    addressbook = _load_book(AB(), args.addressbook)
+    reminders = [
+        (birthday.strftime(DATE_FORMAT), record.user.name) for birthday, record in addressbook.birthday_reminders(args.days)
+    ]
+    _print_result(
+        args,
+        [{"date": birthday, "name": name} for birthday, name in reminders],
+        "\n".join(f"{birthday}: {name}" for birthday, name in reminders),
+    )
+
+
+def command_import(args: argparse.Namespace) -> None:
+    """
+    The command_import function imports contacts from a file and saves the address book once.
+    """
+    from my_address_book.importer import import_contacts
+
+    addressbook = _load_book(AB(), args.addressbook)
+    try:
+        report = import_contacts(addressbook, args.file, args.addressbook)
+    except (ValueError, FileNotFoundError) as error:
+        raise CommandError(str(error)) from error
+
+    data = {"imported": report.imported, "failed": report.failed, "errors": report.errors}
+    text = "\n".join([f"Imported: {report.imported}, failed: {report.failed}", *report.errors])
+    _print_result(args, data, text)
+
+
+def command_dedupe(args: argparse.Namespace) -> None:
+    """
+    The command_dedupe function lists the proposed merges of duplicate contacts and, with --apply,
+    merges them and saves the address book once.
+    """
+    from my_address_book.dedupe import find_duplicates
+    from my_address_book.dedupe import merge_duplicates
+
+    addressbook = _load_book(AB(), args.addressbook)
+    pairs = find_duplicates(addressbook, args.min_score)
+    data: dict[str, object] = {"pairs": [pair._asdict() for pair in pairs]}
+    lines = [f"{pair.keep} <- {pair.duplicate} ({pair.score}: {', '.join(pair.reasons)})" for pair in pairs]
+    if args.apply:
+        data["merged"] = merge_duplicates(addressbook, pairs, args.addressbook)
+        lines.append(f"Merged: {data['merged']}")
+    _print_result(args, data, "\n".join(lines))
+
+
+def command_convert(args: argparse.Namespace) -> None:
+    """
+    The command_convert function converts the given book files (of notes with --notes; by default both books,
+    or the book files of the layout before the shards) saved with pickle to the snapshot format, in place.
+    Files already converted are left as they are; a book without a file is skipped.
+    """
+    from my_address_book.codec import CONTACTS
+    from my_address_book.codec import NOTES
+    from my_address_book.codec import SnapshotError
+    from my_address_book.codec import convert_pickle_file
+
+    if args.files:
+        files = [(file_name, NOTES if args.notes else CONTACTS) for file_name in args.files]
+    else:
+        books = [(args.addressbook, CONTACTS), (args.notesbook, NOTES)]
+        files = [(ShardedStorage(name).legacy_file_name if is_sharded(name) else name, kind) for name, kind in books]
+        files = [(file_name, kind) for file_name, kind in files if os.path.isfile(file_name)]
+    converted = {}
+    for file_name, kind in files:
+        if not os.path.exists(file_name):
+            raise CommandError(f"File not found {file_name}")
+        try:
+            converted[file_name] = convert_pickle_file(file_name, kind)
+        except SnapshotError as error:
+            raise CommandError(str(error)) from error
+    _print_result(args, converted, "\n".join(f"{file_name}: {count} records converted" for file_name, count in converted.items()))
+
+
+def command_export(args: argparse.Namespace) -> None:
+    """
+    The command_export function writes the address book or, with --notes, the notes book to a file or stdout.
+    """
+    from my_address_book.exporter import export_book
+
+    book = _load_book(NB(), args.notesbook) if args.notes else _load_book(AB(), args.addressbook)
+    file_format = args.format or (None if args.file not in (None, "-") else "jsonl")
+    try:
+        count = export_book(book, args.file, file_format, args.gzip)
+    except ValueError as error:
+        raise CommandError(str(error)) from error
+
+    if args.file not in (None, "-"):
+        _print_result(args, {"exported": count}, f"Exported: {count}")
+
+
+def command_sort_folder(args: argparse.Namespace) -> None:
+    """
+    The command_sort_folder function sorts the files of a folder into folders by their type.
+    """
+    from my_address_book.garbage_sorter import sorter_run
+
+    message_error = check_path_address_to_sort_files_in_it(args.path)
+    if message_error:
+        raise CommandError(message_error)
+
+    result = sorter_run(args.path)
+    if isinstance(result, str):
+        raise CommandError(result)
+
+    errors = result or []
+    _print_result(args, {"sorted": args.path, "errors": errors}, "\n".join([f"The folder '{args.path}' is sorted", *errors]))
+
+
+def command_serve(args: argparse.Namespace) -> None:
+    """
+    The command_serve function serves both books over HTTP/JSON until it is interrupted.
+    """
+    import asyncio
+
+    from my_address_book.server import BookServer
+
+    server = BookServer(
+        _load_book(AB(), args.addressbook),
+        _load_book(NB(), args.notesbook),
+        args.addressbook,
+        args.notesbook,
+    )
+
+    async def serve() -> None:
+        await server.start(args.host, args.port, args.unix)
+        await server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    """
+    The _build_parser function describes the options and the commands of the interface.
+    """
+    parser = argparse.ArgumentParser(prog="python -m my_address_book", description="Headless address book commands.")
+    parser.add_argument("--addressbook", default=FILE_AB, help="address book file or directory of shards")
+    parser.add_argument("--notesbook", default=FILE_NB, help="notes book file or directory of shards")
+    parser.add_argument("--json", action="store_true", help="print the result as JSON")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def add_command(name: str, handler: Callable[[argparse.Namespace], None], help_text: str) -> argparse.ArgumentParser:
+        command = commands.add_parser(name, help=help_text)
+        command.set_defaults(handler=handler)
+        return command
+
+    command = add_command("search", command_search, "search contacts or notes")
+    command.add_argument("query")
+    command.add_argument("--notes", action="store_true", help="search the notes book")
+    command.add_argument("--jobs", type=int, default=1, help="search the address book in JOBS processes")
+
+    command = add_command("add", command_add, "add a contact")
+    command.add_argument("name")
+    command.add_argument("--phone", action="append", default=[], help="phone, optionally 'phone(mobile)'")
+    command.add_argument("--email", action="append", default=[], help="email, optionally 'email(work)'")
+    command.add_argument("--birthday", help="birthday as DD-MM-YYYY")
+
+    command = add_command("delete", command_delete, "delete a contact")
+    command.add_argument("name")
+
+    command = add_command("show", command_show, "show a contact")
+    command.add_argument("name")
+
+    command = add_command("list", command_list, "list a page of contacts or notes")
+    command.add_argument("--page", type=int, default=1)
+    command.add_argument("--page-size", type=int, default=NUMBER_OF_CONTACTS_PER_PAGE)
+    command.add_argument("--notes", action="store_true", help="list the notes book")
+    command.add_argument("--newest", action="store_true", help="list the notes the newest first")
+
+    command = add_command("lookup-phone", command_lookup_phone, "contacts owning a phone number")
+    command.add_argument("number")
+
+    add_command("email-domains", command_email_domains, "number of contacts per email domain")
+
+    command = add_command("birthdays-within", command_birthdays_within, "contacts with a birthday within DAYS days")
+    command.add_argument("days", type=int)
+
+    command = add_command("next-birthdays", command_next_birthdays, "contacts with the K nearest birthdays")
+    command.add_argument("k", type=int)
+
+    command = add_command("reminders", command_reminders, "birthdays due today")
+    command.add_argument("--days", type=int, default=0, help="also the birthdays within DAYS days")
+
+    command = add_command("import", command_import, "import contacts from .csv or .vcf")
+    command.add_argument("file")
+
+    command = add_command("dedupe", command_dedupe, "find and merge duplicate contacts")
+    command.add_argument("--min-score", type=float, default=DEDUPE_MIN_SCORE, help="the lowest score of a proposed merge")
+    command.add_argument("--apply", action="store_true", help="merge the proposed contacts")
+
+    command = add_command("convert", command_convert, "convert pickle book files to snapshots")
+    command.add_argument("files", nargs="*", metavar="FILE", help="the book files (default: both books)")
+    command.add_argument("--notes", action="store_true", help="the given files hold notes")
+
+    command = add_command("export", command_export, "export contacts or notes")
+    command.add_argument("file", nargs="?", help="target file, stdout if omitted or '-'")
+    command.add_argument("--format", choices=["csv", "jsonl", "vcard"])
+    command.add_argument("--gzip", action="store_true", help="compress the output")
+    command.add_argument("--notes", action="store_true", help="export the notes book")
+
+    command = add_command("sort-folder", command_sort_folder, "sort the files of a folder")
+    command.add_argument("path")
+
+    command = add_command("serve", command_serve, "serve the books as a local JSON API")
+    command.add_argument("--host", default="127.0.0.1")
+    command.add_argument("--port", type=int, default=8080)
+    command.add_argument("--unix", help="listen on this Unix socket instead of TCP")
+
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    """
+    The main function parses the command line, runs the command and returns the exit code:
+    0 on success and 1 when the command reports an error.
+    """
+    args = _build_parser().parse_args(argv)
+    try:
+        args.handler(args)
+    except CommandError as error:
+        print(error, file=sys.stderr)
+        return 1
+    return 0
@@ -0,0 +1,559 @@
+"""
+The codec module provides the compact binary snapshot format of the books, read a block at a time
+and without pickle: pickle book files are read only by convert_pickle_file.
+
+Format (varint: unsigned LEB128; text: a varint of the UTF-8 length + 1, 0 for None):
+    snapshot        MAGIC, VERSION, kind; blocks of (count, size, records); a block of 0 records; the directory
+    directory       the record offsets (uint64), the record numbers sorted by key (uint32), FOOTER
+    contact         name: text, birthday: varint (ordinal * 2 + 1 for a datetime, then its microseconds), phones, emails
+    note            number, preview, name: text, created: varint, blob: offset + 1, length, compressed, tags
+    delta           DELTA_MAGIC, VERSION, kind, the stamp of the full snapshot, the deleted keys, a snapshot
+
+Classes:
+    SnapshotError: A file that is not a valid snapshot.
+    MappedSnapshot: A read-only mapping over a snapshot file mapped into memory, decoding records on demand.
+
+Functions:
+    is_snapshot(file: BinaryIO) -> bool: Checks if an open file starts with a snapshot header.
+    write_snapshot(file: BinaryIO, kind: int, items: Iterable[tuple[str, Any]]) -> None: Writes a snapshot.
+    read_snapshot(file: BinaryIO, kind: int, blob_file: str | None = None) -> Iterator[tuple[str, Any]]:
+        Reads a snapshot record by record.
+    read_book_file(file: BinaryIO, kind: int, blob_file: str | None = None) -> Iterable[tuple[str, Any]]:
+        Reads a book file, telling a pickle file to be converted.
+    write_delta(file: BinaryIO, kind: int, base: str, items: Iterable, deleted: Iterable[str]) -> None:
+        Writes a differential snapshot.
+    read_delta(file: BinaryIO, kind: int, blob_file: str | None = None) -> tuple[str, list[str], Iterator]:
+        Reads a differential snapshot.
+    convert_pickle_file(file_name: str, kind: int, target_name: str | None) -> int:
+        Converts a pickled book file to a snapshot.
+"""
+import mmap
+import pickle
+import struct
+from collections.abc import ItemsView
+from collections.abc import Mapping
+from collections.abc import ValuesView
+from datetime import date
+from datetime import datetime
+from datetime import time
+from datetime import timedelta
+from functools import partial
+from itertools import islice
+from typing import Any
+from typing import BinaryIO
+from typing import Callable
+from typing import Iterable
+from typing import Iterator
+
+from my_address_book.blob_store import BlobHandle
+from my_address_book.constants import SNAPSHOT_BLOCK_SIZE
+from my_address_book.entities import Email
+from my_address_book.entities import Note
+from my_address_book.entities import Phone
+from my_address_book.entities import User
+from my_address_book.records import RecordContact
+from my_address_book.records import RecordNote
+from my_address_book.storage import atomic_write
+
+MAGIC = b"MABS"
+VERSION = 1
+CONTACTS = 1
+NOTES = 2
+KINDS = {CONTACTS: "contacts", NOTES: "notes"}
+HEADER_SIZE = len(MAGIC) + 2
+DIRECTORY_MAGIC = b"MABD"
+DELTA_MAGIC = b"MABX"
+DELTA_SUFFIX = ".delta"
+FOOTER = struct.Struct("<QQ4s")
+OFFSET = struct.Struct("<Q")
+NUMBER = struct.Struct("<I")
+PICKLE_PROTOCOL = b"\x80"  # the first byte of a pickle of protocol 2 or later
+CREATED_OFFSET = 62_135_596_800  # the seconds from 1 January of year 1 to the Unix epoch: no timestamp is negative
+
+Data = bytes | mmap.mmap  # a block read from a snapshot file or the whole file mapped into memory
+Decoder = Callable[[Data, int], tuple[str, Any, int]]
+
+
+class SnapshotError(ValueError):
+    """A file that is not a valid snapshot"""
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    while value > 0x7F:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _write_text(out: bytearray, text: str | None) -> None:
+    if text is None:
+        out.append(0)
+        return
+    data = text.encode()
+    _write_varint(out, len(data) + 1)
+    out += data
+
+
+def _write_assignment(out: bytearray, assignment: list | None) -> None:
+    if not assignment:
+        out.append(0)
+        return
+    index, label = assignment
+    _write_varint(out, index + 1)
+    _write_text(out, label)
+
+
+def _write_birthday(out: bytearray, birthday: date | None) -> None:
+    if not isinstance(birthday, date):  # the books of the first versions kept "" for no birthday
+        out.append(0)
+    elif isinstance(birthday, datetime):
+        _write_varint(out, birthday.toordinal() << 1 | 1)
+        _write_varint(out, ((birthday.hour * 60 + birthday.minute) * 60 + birthday.second) * 1_000_000 + birthday.microsecond)
+    else:
+        _write_varint(out, birthday.toordinal() << 1)
+
+
+def _encode_contact(out: bytearray, name: str, record: RecordContact) -> None:
+    _write_text(out, name)
+    _write_birthday(out, record.user.birthday_date)
+    _write_varint(out, len(record.phone_numbers))
+    for phone in record.phone_numbers:
+        _write_text(out, phone.subrecord.phone)
+        _write_assignment(out, phone.name)
+    _write_varint(out, len(record.emails))
+    for email in record.emails:
+        _write_text(out, email.subrecord.email)
+        _write_assignment(out, email.name)
+
+
+def _encode_note(out: bytearray, number: str, record: RecordNote) -> None:
+    note = record.note
+    _write_text(out, number)
+    _write_text(out, note.preview)
+    _write_text(out, note.name_note)
+    _write_varint(out, 0 if record.created is None else record.created + CREATED_OFFSET + 1)
+    if note.blob is None:
+        out.append(0)
+    else:
+        _write_varint(out, note.blob.offset + 1)
+        _write_varint(out, note.blob.length)
+        out.append(note.blob.compressed)
+    _write_varint(out, len(note.tags))
+    for tag in note.tags:
+        _write_text(out, tag)
+
+
+def _read_varint(data: Data, position: int) -> tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+
+def _read_text(data: Data, position: int) -> tuple[str | None, int]:
+    length = data[position]
+    if length < 0x80:
+        position += 1
+    else:
+        length, position = _read_varint(data, position)
+    if not length:
+        return None, position
+    end = position + length - 1
+    return data[position:end].decode(), end
+
+
+def _read_key(data: Data, position: int) -> tuple[str, int]:
+    key, position = _read_text(data, position)
+    if key is None:
+        raise SnapshotError("The snapshot is damaged: a text that may not be empty is missing")
+    return key, position
+
+
+def _read_assignment(data: Data, position: int) -> tuple[list | None, int]:
+    index, position = _read_varint(data, position)
+    if not index:
+        return None, position
+    label, position = _read_text(data, position)
+    return [index - 1, label], position
+
+
+def _text_span(data: Data, position: int) -> tuple[int, int]:
+    length, position = _read_varint(data, position)
+    return position, position + max(length - 1, 0)
+
+
+def _read_birthday(data: Data, position: int) -> tuple[date | None, int]:
+    value, position = _read_varint(data, position)
+    if not value:
+        return None, position
+    day = date.fromordinal(value >> 1)
+    if not value & 1:
+        return day, position
+    microseconds, position = _read_varint(data, position)
+    return datetime.combine(day, time()) + timedelta(microseconds=microseconds), position
+
+
+def _read_subrecords(data: Data, position: int, make: type, record: RecordContact) -> tuple[list, int]:
+    # The hot loop of a book load: the one-byte lengths and assignments are read inline.
+    count, position = _read_varint(data, position)
+    subrecords = []
+    subrecord = RecordContact.Subrecord
+    for _ in range(count):
+        length = data[position]
+        if length < 0x80:
+            position += 1
+        else:
+            length, position = _read_varint(data, position)
+        if length:
+            end = position + length - 1
+            value, position = data[position:end].decode(), end
+        else:
+            value = None
+        if data[position]:
+            assignment, position = _read_assignment(data, position)
+        else:
+            assignment, position = None, position + 1
+        entity = make(value)
+        entity._owner = record
+        subrecords.append(subrecord(entity, assignment))
+    return subrecords, position
+
+
+def _decode_contact(data: Data, position: int) -> tuple[str, RecordContact, int]:
+    # The entities are filled before they belong to the record, so the record is read clean (see entities.Entity).
+    name, position = _read_key(data, position)
+    birthday, position = _read_birthday(data, position)
+    user = User(name)
+    if birthday is not None:
+        user.birthday_date = birthday
+    record = RecordContact(user)
+    record.phone_numbers, position = _read_subrecords(data, position, Phone, record)
+    record.emails, position = _read_subrecords(data, position, Email, record)
+    return name, record, position
+
+
+def _decode_note(data: Data, position: int, blob_file: str | None = None) -> tuple[str, RecordNote, int]:
+    number, position = _read_key(data, position)
+    text, position = _read_text(data, position)
+    name_note, position = _read_text(data, position)
+    created, position = _read_varint(data, position)
+    record = RecordNote.__new__(RecordNote)
+    record.note = Note(text)
+    record.note.name_note = name_note
+    offset, position = _read_varint(data, position)
+    if offset:
+        length, position = _read_varint(data, position)
+        if blob_file is None:
+            raise SnapshotError("The notes have bodies in a blob file, which was not given")
+        record.note.set_blob(BlobHandle(blob_file, offset - 1, length, bool(data[position])), text)
+        position += 1
+    count, position = _read_varint(data, position)
+    tags = []
+    for _ in range(count):
+        tag, position = _read_key(data, position)
+        tags.append(tag)
+    record.note.tags = tags
+    record.note._owner = record
+    record.created = created - CREATED_OFFSET - 1 if created else None
+    return number, record, position
+
+
+def _decode_block(decode: Decoder, data: bytes, count: int) -> Iterator[tuple[str, Any]]:
+    position = 0
+    for _ in range(count):
+        key, record, position = decode(data, position)
+        yield key, record
+
+
+ENCODERS: dict[int, Callable[[bytearray, str, Any], None]] = {CONTACTS: _encode_contact, NOTES: _encode_note}
+DECODERS: dict[int, Decoder] = {CONTACTS: _decode_contact, NOTES: _decode_note}
+
+
+def _decoder(kind: int, blob_file: str | None) -> Decoder:
+    """
+    The _decoder function returns the decoder of the records of a snapshot of the kind;
+    the notes read their bodies saved out of line from blob_file.
+    """
+    return partial(_decode_note, blob_file=blob_file) if kind == NOTES else DECODERS[kind]
+
+
+def is_snapshot(file: BinaryIO) -> bool:
+    """
+    The is_snapshot function checks if an open file starts with a snapshot header; the position of the file is kept.
+    """
+    position = file.tell()
+    magic = file.read(len(MAGIC))
+    file.seek(position)
+    return magic == MAGIC
+
+
+def write_snapshot(file: BinaryIO, kind: int, items: Iterable[tuple[str, Any]]) -> None:
+    """
+    The write_snapshot function writes the (key, record) items of a book of the kind (CONTACTS or NOTES)
+    to an open binary file, a block of records at a time, followed by the directory of the records.
+    """
+    encode = ENCODERS[kind]
+    file.write(MAGIC + bytes((VERSION, kind)))
+    offset = HEADER_SIZE
+    offsets = bytearray()
+    keys: list[bytes] = []
+    items = iter(items)
+    while block := list(islice(items, SNAPSHOT_BLOCK_SIZE)):
+        payload = bytearray()
+        positions = []
+        for key, record in block:
+            positions.append(len(payload))
+            keys.append(key.encode())
+            encode(payload, key, record)
+        header = bytearray()
+        _write_varint(header, len(block))
+        _write_varint(header, len(payload))
+        for position in positions:
+            offsets += OFFSET.pack(offset + len(header) + position)
+        file.write(header)
+        file.write(payload)
+        offset += len(header) + len(payload)
+    file.write(b"\x00")
+
+    file.write(offsets)
+    file.write(b"".join(NUMBER.pack(number) for number in sorted(range(len(keys)), key=keys.__getitem__)))
+    file.write(FOOTER.pack(len(keys), offset + 1, DIRECTORY_MAGIC))
+
+
+def _read_file_varint(file: BinaryIO) -> int:
+    value = shift = 0
+    while True:
+        byte = file.read(1)
+        if not byte:
+            raise SnapshotError("The snapshot is truncated")
+        value |= (byte[0] & 0x7F) << shift
+        if byte[0] < 0x80:
+            return value
+        shift += 7
+
+
+def _read_file_text(file: BinaryIO) -> str:
+    length = _read_file_varint(file)
+    data = file.read(max(length - 1, 0))
+    if not length or len(data) != length - 1:
+        raise SnapshotError("The snapshot is truncated")
+    return data.decode()
+
+
+def _check_header(header: bytes, kind: int, magic: bytes = MAGIC) -> None:
+    """
+    The _check_header function checks the header of a snapshot (or, with DELTA_MAGIC, of a differential
+    snapshot) of a book of the kind.
+    """
+    if not header.startswith(magic) or len(header) != HEADER_SIZE:
+        raise SnapshotError("The file is not a book snapshot")
+    version, file_kind = header[-2:]
+    if version != VERSION:
+        raise SnapshotError(f"Unknown snapshot version {version}, expected {VERSION}")
+    if file_kind != kind:
+        raise SnapshotError(f"The snapshot holds {KINDS.get(file_kind, 'unknown records')}, expected {KINDS[kind]}")
+
+
+def read_snapshot(file: BinaryIO, kind: int, blob_file: str | None = None) -> Iterator[tuple[str, Any]]:
+    """
+    The read_snapshot function reads the (key, record) items of a snapshot of a book of the kind from an open binary
+    file, a block at a time; a file of another format, version or kind raises SnapshotError.
+    """
+    _check_header(file.read(HEADER_SIZE), kind)
+    decode = _decoder(kind, blob_file)
+    while count := _read_file_varint(file):
+        size = _read_file_varint(file)
+        data = file.read(size)
+        if len(data) != size:
+            raise SnapshotError("The snapshot is truncated")
+        try:
+            yield from _decode_block(decode, data, count)
+        except (IndexError, UnicodeDecodeError, ValueError) as error:
+            raise SnapshotError(f"The snapshot is damaged: {error}") from error
+
+
+def read_book_file(file: BinaryIO, kind: int, blob_file: str | None = None) -> Iterable[tuple[str, Any]]:
+    """
+    The read_book_file function reads the (key, record) items of a book file; a pickle file raises SnapshotError,
+    as it is read only by convert_pickle_file.
+    """
+    position = file.tell()
+    if file.read(1) == PICKLE_PROTOCOL:
+        name = getattr(file, "name", "The book file")
+        raise SnapshotError(f"{name} was saved with pickle; convert it with 'python -m my_address_book convert {name}'")
+    file.seek(position)
+    return read_snapshot(file, kind, blob_file)
+
+
+def write_delta(file: BinaryIO, kind: int, base: str, items: Iterable[tuple[str, Any]], deleted: Iterable[str]) -> None:
+    """
+    The write_delta function writes a differential snapshot to an open binary file: the keys deleted and the items
+    added or changed since the full snapshot with the stamp base.
+    """
+    header = bytearray(DELTA_MAGIC + bytes((VERSION, kind)))
+    _write_text(header, base)
+    deleted = list(deleted)
+    _write_varint(header, len(deleted))
+    for key in deleted:
+        _write_text(header, key)
+    file.write(header)
+    write_snapshot(file, kind, items)
+
+
+def read_delta(file: BinaryIO, kind: int, blob_file: str | None = None) -> tuple[str, list[str], Iterator[tuple[str, Any]]]:
+    """
+    The read_delta function reads a differential snapshot from an open binary file: the stamp of the full snapshot
+    it applies to, the deleted keys and an iterator of the added or changed (key, record) items.
+    """
+    _check_header(file.read(HEADER_SIZE), kind, DELTA_MAGIC)
+    try:
+        base = _read_file_text(file)
+        deleted = [_read_file_text(file) for _ in range(_read_file_varint(file))]
+    except UnicodeDecodeError as error:
+        raise SnapshotError(f"The snapshot is damaged: {error}") from error
+    return base, deleted, read_snapshot(file, kind, blob_file)
+
+
+class _MappedItems(ItemsView):
+    def __init__(self, snapshot: "MappedSnapshot"):
+        super().__init__(snapshot)
+        self._snapshot = snapshot
+
+    def __iter__(self) -> Iterator[tuple[str, Any]]:
+        return self._snapshot.page(0, len(self._snapshot))
+
+
+class _MappedValues(ValuesView):
+    def __init__(self, snapshot: "MappedSnapshot"):
+        super().__init__(snapshot)
+        self._snapshot = snapshot
+
+    def __iter__(self) -> Iterator[Any]:
+        return (record for _, record in self._snapshot.page(0, len(self._snapshot)))
+
+
+class MappedSnapshot(Mapping):
+    """
+    A read-only mapping of the keys to the records of a snapshot file mapped into memory: opening it reads only
+    the footer, and every read decodes a new record, not bound to a book.
+
+    Methods:
+        get_record(key: str) -> RecordContact | RecordNote:
+            Returns the record with the key, found by a binary search of the key directory.
+        page(start: int, count: int) -> Iterator[tuple[str, Any]]:
+            Yields up to count (key, record) items from the start position, in the order of the book.
+        close() -> None:
+            Unmaps the file.
+    """
+
+    def __init__(self, file_name: str, kind: int, blob_file: str | None = None):
+        with open(file_name, "rb") as file:
+            _check_header(file.read(HEADER_SIZE), kind)
+            self._decode = _decoder(kind, blob_file)
+            try:
+                self._data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError as error:
+                raise SnapshotError(f"The snapshot {file_name} is truncated") from error
+        try:
+            count, directory, magic = FOOTER.unpack_from(self._data, len(self._data) - FOOTER.size)
+        except struct.error as error:
+            self.close()
+            raise SnapshotError(f"The snapshot {file_name} is truncated") from error
+        if magic != DIRECTORY_MAGIC or directory + count * (OFFSET.size + NUMBER.size) + FOOTER.size != len(self._data):
+            self.close()
+            raise SnapshotError(f"The snapshot {file_name} is damaged")
+        self._count = count
+        self._offsets = directory
+        self._keys = directory + count * OFFSET.size
+
+    def __enter__(self) -> "MappedSnapshot":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _offset(self, number: int) -> int:
+        return OFFSET.unpack_from(self._data, self._offsets + number * OFFSET.size)[0]
+
+    def _find(self, key: str) -> int | None:
+        """
+        The _find function returns the offset of the record with the key, or None.
+        """
+        wanted, low, high = key.encode(), 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            offset = self._offset(NUMBER.unpack_from(self._data, self._keys + middle * NUMBER.size)[0])
+            start, end = _text_span(self._data, offset)
+            found = self._data[start:end]
+            if found == wanted:
+                return offset
+            if found < wanted:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def __getitem__(self, key: str) -> Any:
+        offset = self._find(key) if isinstance(key, str) else None
+        if offset is None:
+            raise KeyError(key)
+        return self._decode(self._data, offset)[1]
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and self._find(key) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        for number in range(self._count):
+            yield _read_key(self._data, self._offset(number))[0]
+
+    def items(self) -> ItemsView:
+        return _MappedItems(self)
+
+    def values(self) -> ValuesView:
+        return _MappedValues(self)
+
+    def get_record(self, key: str) -> Any:
+        """
+        The get_record function returns the record with the key; a missing key raises KeyError, like Book.get_record.
+        """
+        return self[key]
+
+    def page(self, start: int, count: int) -> Iterator[tuple[str, Any]]:
+        """
+        The page function yields up to count (key, record) items from the start position, in the order of the book.
+        Only the records of the page are decoded.
+        """
+        for number in range(max(start, 0), min(start + count, self._count)):
+            key, record, _ = self._decode(self._data, self._offset(number))
+            yield key, record
+
+    def close(self) -> None:
+        """
+        The close function unmaps the file; the records read from it stay valid.
+        """
+        self._data.close()
+
+
+def convert_pickle_file(file_name: str, kind: int, target_name: str | None = None) -> int:
+    """
+    The convert_pickle_file function converts a trusted pickle book file of the kind into a snapshot, written to
+    target_name or in place, and returns the number of records converted (0 for a file that already is a snapshot).
+    """
+    with open(file_name, "rb") as file:
+        if is_snapshot(file):
+            return 0
+        data = pickle.load(file)
+
+    record_type = RecordNote if kind == NOTES else RecordContact
+    if not all(isinstance(record, record_type) for record in data.values()):
+        raise SnapshotError(f"{file_name} does not hold {KINDS[kind]}")
+    with atomic_write(target_name or file_name) as file:
+        write_snapshot(file, kind, data.items())
+    return len(data)
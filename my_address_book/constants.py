@@ -9,8 +9,10 @@ from string import ascii_letters
 from string import punctuation
 
 current_dir = os.getcwd()
-FILE_AB = os.path.join(current_dir, "storage", "address_book.bin")
-FILE_NB = os.path.join(current_dir, "storage", "notes_book.bin")
+# The books are kept in shards (see the shards module); the trailing separator marks a directory.
+FILE_AB = os.path.join(current_dir, "storage", "address_book", "")
+FILE_NB = os.path.join(current_dir, "storage", "notes_book", "")
+STORAGE_SHARDS = 16
 
 
 NUMBER_OF_CONTACTS_PER_PAGE = 20
@@ -21,3 +23,83 @@ PUNCTUATION = punctuation
 NAME_RANGE = range(1, 50)
 PHONE_RANGE = range(7, 20)
 NOTE_LEN = 1
+
+DATE_FORMAT = "%d-%m-%Y"
+# The times of creation of the notes are kept as Unix timestamps and shown, in local time, in this format.
+NOTE_DATE_FORMAT = "%d-%m-%Y %H:%M:%S"
+PHONE_ASSIGNMENTS = ["home", "mobile", "work"]
+EMAIL_ASSIGNMENTS = ["home", "work"]
+
+CONTACT_CSV_FIELDS = ["name", "phones", "emails", "birthday"]
+NOTE_CSV_FIELDS = ["number", "name", "note", "date_of_creation", "tags"]
+MULTI_VALUE_SEPARATOR = ";"
+
+# Ukrainian national transliteration (2010), with the few Russian letters of CYRILLIC;
+# є, ї, й, ю, я are spelt differently at the beginning of a word.
+TRANSLITERATION = {
+    "а": "a",
+    "б": "b",
+    "в": "v",
+    "г": "h",
+    "ґ": "g",
+    "д": "d",
+    "е": "e",
+    "є": "ie",
+    "ё": "io",
+    "ж": "zh",
+    "з": "z",
+    "и": "y",
+    "і": "i",
+    "ї": "i",
+    "й": "i",
+    "к": "k",
+    "л": "l",
+    "м": "m",
+    "н": "n",
+    "о": "o",
+    "п": "p",
+    "р": "r",
+    "с": "s",
+    "т": "t",
+    "у": "u",
+    "ф": "f",
+    "х": "kh",
+    "ц": "ts",
+    "ч": "ch",
+    "ш": "sh",
+    "щ": "shch",
+    "ъ": "",
+    "ы": "y",
+    "ь": "",
+    "э": "e",
+    "ю": "iu",
+    "я": "ia",
+    "'": "",
+    "’": "",
+}
+TRANSLITERATION_INITIAL = {"є": "ye", "ё": "yo", "ї": "yi", "й": "y", "ю": "yu", "я": "ya"}
+
+FUZZY_MAX_DISTANCE = 2
+FUZZY_LIMIT = 10
+
+SEARCH_CACHE_SIZE = 64
+PARALLEL_SEARCH_MIN_RECORDS = 100_000
+
+AUTOSAVE_DELAY = 2.0
+SNAPSHOT_BLOCK_SIZE = 1024
+# A book file gets a differential snapshot while it holds at most this share of the records, a full one otherwise.
+SNAPSHOT_DELTA_SHARE = 0.25
+# Note bodies longer than NOTE_INLINE_SIZE characters are saved out of line (see the blob_store module),
+# zlib-compressed above NOTE_COMPRESS_SIZE bytes; the snapshots keep their first NOTE_PREVIEW_LENGTH characters.
+NOTE_INLINE_SIZE = 256
+NOTE_COMPRESS_SIZE = 1024
+NOTE_PREVIEW_LENGTH = 68
+# A full save of a directory of shards rewrites its blob file once the notes of the book take less than this share of it.
+NOTE_BLOB_LIVE_SHARE = 0.5
+
+DEDUPE_MIN_SCORE = 0.6
+DEDUPE_MAX_BLOCK_SIZE = 50
+DEDUPE_PHONE_DIGITS = 9
+
+IMPORT_BATCH_SIZE = 1000
+MAX_IMPORT_ERRORS = 100
@@ -0,0 +1,208 @@
+"""
+The dedupe module finds contacts that are probably the same person and merges them.
+
+Comparing every contact with every other one is O(n^2). Instead every contact gets a few blocking keys
+(the significant digits of its phones, its emails and a phonetic key of its name) and only the contacts
+sharing a key are compared. Blocks larger than DEDUPE_MAX_BLOCK_SIZE (a shared office number, a very
+common name) are skipped, so the number of compared pairs stays proportional to the size of the book.
+
+A compared pair is scored: a shared phone or email counts most, a similar name and the same birthday
+add to the score, different birthdays take from it. The pairs reaching DEDUPE_MIN_SCORE are proposed
+for merging; the accepted ones are merged into the contact with the most data and the book is saved once.
+
+Classes:
+    DuplicatePair(NamedTuple): A proposed merge of two contacts.
+
+Functions:
+    phonetic_key(name: str) -> str: Returns a key shared by the spellings of a name.
+    find_duplicates(addressbook: AB, ...) -> list[DuplicatePair]: Proposes merges, the most probable first.
+    merge_duplicates(addressbook: AB, pairs: Iterable[DuplicatePair], ...) -> int: Merges the accepted pairs.
+"""
+import re
+from collections import defaultdict
+from itertools import combinations
+from typing import Iterable
+from typing import NamedTuple
+
+from my_address_book.address_book import AddressBook as AB
+from my_address_book.constants import DEDUPE_MAX_BLOCK_SIZE
+from my_address_book.constants import DEDUPE_MIN_SCORE
+from my_address_book.constants import DEDUPE_PHONE_DIGITS
+from my_address_book.indexes import MIN_PHONE_SUFFIX
+from my_address_book.indexes import bounded_levenshtein
+from my_address_book.indexes import canonical_phone
+from my_address_book.indexes import search_key
+from my_address_book.records import RecordContact
+
+PHONETIC_REPLACEMENTS = [("x", "ks"), ("ph", "f"), ("w", "v"), ("ck", "k"), ("q", "k"), ("y", "i"), ("j", "i")]
+VOWELS = re.compile(r"[aeiou]")
+REPEATED = re.compile(r"(.)\1+")
+WORD = re.compile(r"[a-z]+")
+
+SHARED_PHONE_SCORE = 0.6
+SHARED_EMAIL_SCORE = 0.6
+NAME_SCORE = 0.7
+SAME_BIRTHDAY_SCORE = 0.2
+OTHER_BIRTHDAY_SCORE = -0.5
+
+
+class DuplicatePair(NamedTuple):
+    """A proposed merge: the duplicate contact is merged into the kept one"""
+
+    keep: str
+    duplicate: str
+    score: float
+    reasons: list[str]
+
+
+def phonetic_key(name: str) -> str:
+    """
+    The phonetic_key function returns a key shared by the spellings of a name: the words of the
+    transliterated name in order, each reduced to its first letter and its consonants,
+    so 'Oleksandr', 'Olexandr' and 'Олександр' all give 'olksndr'.
+    """
+    words = []
+    for word in sorted(WORD.findall(search_key(name))):
+        for spelling, sound in PHONETIC_REPLACEMENTS:
+            word = word.replace(spelling, sound)
+        words.append(REPEATED.sub(r"\1", word[0] + VOWELS.sub("", word[1:])))
+    return " ".join(words)
+
+
+class _Features(NamedTuple):
+    """The parts of a contact compared by the scoring, computed once per contact"""
+
+    phones: set[str]
+    emails: set[str]
+    name: str
+    birthday: tuple[int, int, int] | None
+
+    @classmethod
+    def of(cls, record: RecordContact) -> "_Features":
+        phones = {canonical_phone(phone.subrecord.phone)[-DEDUPE_PHONE_DIGITS:] for phone in record.phone_numbers}
+        birthday = record.user.birthday_date
+        return cls(
+            {phone for phone in phones if len(phone) >= MIN_PHONE_SUFFIX},
+            {email.subrecord.email.strip().lower() for email in record.emails if email.subrecord.email},
+            " ".join(sorted(WORD.findall(search_key(record.user.name)))),
+            (birthday.year, birthday.month, birthday.day) if birthday else None,
+        )
+
+    def blocking_keys(self) -> set[str]:
+        keys = {f"phone:{phone}" for phone in self.phones} | {f"email:{email}" for email in self.emails}
+        if self.name:
+            keys.add(f"name:{phonetic_key(self.name)}")
+        return keys
+
+    def richness(self) -> int:
+        return len(self.phones) + len(self.emails) + (self.birthday is not None)
+
+
+def _score(first: _Features, second: _Features) -> tuple[float, list[str]]:
+    """
+    The _score function scores how probably two contacts are the same person, from 0 to 1, with the reasons.
+    """
+    score, reasons = 0.0, []
+    if first.phones & second.phones:
+        score += SHARED_PHONE_SCORE
+        reasons.append("phone")
+    if first.emails & second.emails:
+        score += SHARED_EMAIL_SCORE
+        reasons.append("email")
+
+    longer = max(len(first.name), len(second.name))
+    if longer:
+        distance = bounded_levenshtein(first.name, second.name, longer // 3)
+        if distance is not None:
+            score += NAME_SCORE * (1 - distance / longer)
+            reasons.append("name")
+
+    if first.birthday and second.birthday:
+        if first.birthday == second.birthday:
+            score += SAME_BIRTHDAY_SCORE
+            reasons.append("birthday")
+        else:
+            score += OTHER_BIRTHDAY_SCORE
+    return min(score, 1.0), reasons
+
+
+def find_duplicates(
+    addressbook: AB, min_score: float = DEDUPE_MIN_SCORE, max_block_size: int = DEDUPE_MAX_BLOCK_SIZE
+) -> list[DuplicatePair]:
+    """
+    The find_duplicates function proposes the merges of contacts that are probably the same person,
+    the most probable first. Only the contacts sharing a blocking key are compared, every pair once.
+    The contact with the most phones, emails and birthday is kept; on a tie, the first in the book.
+    """
+    features: dict[str, _Features] = {}
+    blocks: defaultdict[str, list[str]] = defaultdict(list)
+    for name, record in addressbook.data.items():
+        features[name] = _Features.of(record)
+        for key in features[name].blocking_keys():
+            blocks[key].append(name)
+
+    order = {name: position for position, name in enumerate(addressbook.data)}
+    compared: set[tuple[str, str]] = set()
+    pairs = []
+    for names in blocks.values():
+        if len(names) > max_block_size:
+            continue
+        for first, second in combinations(names, 2):
+            if (first, second) in compared:
+                continue
+            compared.add((first, second))
+
+            score, reasons = _score(features[first], features[second])
+            if score < min_score:
+                continue
+            keep, duplicate = sorted((first, second), key=lambda name: (-features[name].richness(), order[name]))
+            pairs.append(DuplicatePair(keep, duplicate, round(score, 3), reasons))
+
+    pairs.sort(key=lambda pair: (-pair.score, order[pair.keep], order[pair.duplicate]))
+    return pairs
+
+
+def _merge_record(keep: RecordContact, duplicate: RecordContact) -> None:
+    """
+    The _merge_record function adds the phones, emails and birthday of the duplicate that the kept contact lacks;
+    phones are compared by their significant digits, so '0951234567' and '+380951234567' are the same phone.
+    """
+    phones = {canonical_phone(phone.subrecord.phone)[-DEDUPE_PHONE_DIGITS:] for phone in keep.phone_numbers}
+    for phone in duplicate.phone_numbers:
+        if canonical_phone(phone.subrecord.phone)[-DEDUPE_PHONE_DIGITS:] not in phones:
+            keep.add_phone_number(phone.subrecord, phone.name)
+
+    emails = {email.subrecord.email.lower() for email in keep.emails}
+    for email in duplicate.emails:
+        if email.subrecord.email.lower() not in emails:
+            keep.add_email(email.subrecord, email.name)
+
+    if keep.user.birthday_date is None and duplicate.user.birthday_date is not None:
+        keep.add_birthday(duplicate.user.birthday_date)
+
+
+def merge_duplicates(addressbook: AB, pairs: Iterable[DuplicatePair], save_file_name: str | None = None) -> int:
+    """
+    The merge_duplicates function merges the accepted pairs in one batch of the book and saves it once,
+    after the last merge; if a merge fails, none of them is kept.
+    When several pairs chain (a = b, b = c), all of them end up in one contact.
+    Returns the number of merged (deleted) contacts.
+    """
+    merged_into: dict[str, str] = {}
+
+    def resolve(name: str) -> str:
+        while name in merged_into:
+            name = merged_into[name]
+        return name
+
+    merged = 0
+    with addressbook.batch(save_file_name):
+        for pair in pairs:
+            keep, duplicate = resolve(pair.keep), resolve(pair.duplicate)
+            if keep == duplicate or keep not in addressbook.data or duplicate not in addressbook.data:
+                continue
+            _merge_record(addressbook.data[keep], addressbook.data[duplicate])
+            addressbook.delete_record(duplicate)
+            merged_into[duplicate] = keep
+            merged += 1
+    return merged
@@ -1,20 +1,60 @@
 """
 entities module defines the entities used in the address book application.
 
+A change of a property of an entity that belongs to a record is reported to the record (see Entity),
+which marks itself dirty, so the books save only the records that have changed.
+
 Classes:
+    Entity: The base of the entities, reporting their changes to the record they belong to.
+
     Email: Represents the email of a contact.
-        
+
     User: Represents a user.
-        
+
     Phone: Represents the phone number of a contact.
-    
+
+    Note: Represents a note; a long body saved out of line is read when it is first used (see the blob_store module).
+
+Functions:
+    normalize_tag(tag: str) -> str: Returns a tag as the notes keep it: without the '#' and casefolded.
 """
 
 
-from datetime import datetime, date
+from datetime import date
+from typing import Any
+from typing import Iterable
+
+from my_address_book.blob_store import BlobHandle
+from my_address_book.constants import NOTE_PREVIEW_LENGTH
+
+
+class Entity:
+    """
+    The base of the entities of a record. The setters of the properties call _changing before a change and
+    _changed after it; the record that owns the entity (set by RecordContact and RecordNote) keeps its state
+    for a rollback and marks itself dirty (see RecordContact.mark_dirty). An entity without a record reports nothing.
+
+    Attributes:
+        _owner (RecordContact | RecordNote | None): The record the entity belongs to; not pickled or copied.
+    """
+
+    _owner: Any = None
+
+    def _changing(self) -> None:
+        if self._owner is not None:
+            self._owner._journal()
 
+    def _changed(self) -> None:
+        if self._owner is not None:
+            self._owner.mark_dirty()
 
-class Email:
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state.pop("_owner", None)
+        return state
+
+
+class Email(Entity):
     """
     Represents the email of a contact.
 
@@ -44,10 +84,12 @@ class Email:
             If the email address is not valid, an error message will be returned.
             If the email address is valid, then it will return True.
         """
+        self._changing()
         if new_email is None:
             self.__email: str | None = None
         else:
             self.__email = new_email
+        self._changed()
 
     def __eq__(self, other: object) -> bool:
         if isinstance(other, Email):
@@ -55,7 +97,7 @@ class Email:
         return False
 
 
-class User:
+class User(Entity):
     """
     Represents a user.
 
@@ -81,7 +123,9 @@ class User:
         """
         Sets the name of the contact if it is valid, otherwise raises an error.
         """
+        self._changing()
         self.__name = new_name
+        self._changed()
 
     @property
     def birthday_date(self) -> date | None:
@@ -91,14 +135,16 @@ class User:
         return self.__birthday_date
 
     @birthday_date.setter
-    def birthday_date(self, new_birthday_date: datetime) -> None:
+    def birthday_date(self, new_birthday_date: date | None) -> None:
         """
         Sets the birthday date of the contact if it is valid, otherwise raises an error.
         """
+        self._changing()
         self.__birthday_date = new_birthday_date
+        self._changed()
 
 
-class Phone:
+class Phone(Entity):
     """
     Represents the phone number of a contact.
 
@@ -126,10 +172,12 @@ class Phone:
         """
         Sets the phone number of the contact if it is valid, otherwise raises an error.
         """
+        self._changing()
         if new_phone is None:
             self.__phone: str | None = None
         else:
             self.__phone = new_phone
+        self._changed()
 
     def __eq__(self, other: object) -> bool:
         if isinstance(other, Phone):
@@ -137,47 +185,126 @@ class Phone:
         return False
 
 
-class Note:
+def normalize_tag(tag: str) -> str:
+    """
+    The normalize_tag function returns a tag as the notes keep and the tag index keys it: without spaces
+    and the leading '#', casefolded, so '#Work' and 'work' are the same tag.
+    """
+    return tag.strip().lstrip("#").casefold()
+
+
+class Note(Entity):
     """
     A class that represents a note.
 
     Attributes:
         note (str | None): The content of the note.
         __name_note (str | None): The name of the note (private attribute).
+        blob (BlobHandle | None): The place of the content in the blob file of the notes book,
+            when it is saved out of line.
+        tags (tuple[str, ...]): The tags of the note, normalized (see normalize_tag) and sorted.
 
     Methods:
         note() -> str | None:
-            Returns the content of the note.
+            Returns the content of the note, read from the blob file the first time.
+        read_note() -> str | None:
+            Returns the content of the note without keeping it in memory when it is saved out of line.
         note(new_note: str) -> None:
             Sets the content of the note.
         name_note() -> str | None:
             Returns the name of the note.
         name_note(new_name_note: str) -> None:
             Sets the name of the note.
+        tags(new_tags: Iterable[str]) -> None:
+            Sets the tags of the note.
+        preview() -> str | None:
+            Returns the content, or its beginning when it is saved out of line, without reading the blob file.
+        loaded() -> bool:
+            Tells if the whole content is in memory.
+        set_blob(blob: BlobHandle, preview: str | None = None) -> None:
+            Records where the content is saved out of line.
     """
 
+    # A note saved inline has no blob; the instance attributes are set for the notes saved out of line.
+    _blob: BlobHandle | None = None
+    _loaded: bool = True
+    # A note without tags, including one pickled before the tags, shares the empty tuple.
+    _tags: tuple[str, ...] = ()
+    __note: str | None
+
     def __init__(self, note: str | None = None):
-        self.note: str = note
+        self.note = note
         self.__name_note: str | None = None
 
     @property
     def note(self) -> str | None:
         """
-        The note function returns the note of a given instance of the class.
+        The note function returns the note of a given instance of the class. A note saved out of line
+        is read from the blob file the first time and kept.
         """
+        if not self._loaded and self._blob is not None:
+            self.__note = self._blob.read()
+            self._loaded = True
         return self.__note
 
     @note.setter
-    def note(self, new_note: str) -> None:
+    def note(self, new_note: str | None) -> None:
         """
         The note function takes a string and assigns it to the note attribute of an object.
         If no string is passed, then the note attribute is set to None.
         """
 
+        self._changing()
         if new_note is None:
-            self.__note: str | None = None
+            self.__note = None
         else:
             self.__note = new_note
+        if self._blob is not None:
+            self._blob, self._loaded = None, True
+        self._changed()
+
+    def read_note(self) -> str | None:
+        """
+        The read_note function returns the note like the note property, but a note saved out of line and not loaded
+        is read from the blob file each time and not kept, so a scan of all the notes keeps only their previews.
+        """
+        if self._loaded or self._blob is None:
+            return self.__note
+        return self._blob.read()
+
+    @property
+    def loaded(self) -> bool:
+        """
+        The loaded function tells if the whole note is in memory, so read_note does not read the blob file.
+        """
+        return self._loaded or self._blob is None
+
+    @property
+    def blob(self) -> BlobHandle | None:
+        """
+        The blob function returns the place of the note in the blob file, if it is saved out of line.
+        """
+        return self._blob
+
+    @property
+    def preview(self) -> str | None:
+        """
+        The preview function returns the note, or its first NOTE_PREVIEW_LENGTH characters when it is saved
+        out of line, without reading the blob file.
+        """
+        if self._blob is None or self.__note is None:
+            return self.__note
+        return self.__note[:NOTE_PREVIEW_LENGTH]
+
+    def set_blob(self, blob: BlobHandle, preview: str | None = None) -> None:
+        """
+        The set_blob function records that the note is saved out of line at blob; it is not a change of the note.
+        With a preview (a note read from a snapshot), the note is not in memory and is read from the blob file
+        when it is first used.
+        """
+        self._blob = blob
+        if preview is not None:
+            self.__note, self._loaded = preview, False
 
     @property
     def name_note(self) -> str | None:
@@ -188,9 +315,30 @@ class Note:
         return self.__name_note
 
     @name_note.setter
-    def name_note(self, new_name_note: str) -> None:
+    def name_note(self, new_name_note: str | None) -> None:
         """
         The name_note function takes a string as an argument and assigns it to the name_note attribute of the class.
         """
 
+        self._changing()
         self.__name_note = new_name_note
+        self._changed()
+
+    @property
+    def tags(self) -> tuple[str, ...]:
+        """
+        The tags function returns the tags of the note, normalized and sorted.
+        """
+        return self._tags
+
+    @tags.setter
+    def tags(self, new_tags: Iterable[str]) -> None:
+        """
+        The tags function takes the tags of the note, with or without '#', and keeps each of them once,
+        normalized (see normalize_tag) and sorted; empty tags are left out. The record is told the old tags,
+        so its notes book updates only their bitmaps (see indexes.TagIndex.retag).
+        """
+        self._changing()
+        old_tags, self._tags = self._tags, tuple(sorted({normalize_tag(tag) for tag in new_tags} - {""}))
+        if self._owner is not None:
+            self._owner.mark_dirty(old_tags)
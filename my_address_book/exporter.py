@@ -0,0 +1,236 @@
+"""
+The exporter module provides a streaming export of the address book and the notes book.
+
+Every record is converted and written on its own, so the export never builds a full table or list
+of the book in memory. The output goes to a file (optionally gzip-compressed) or to stdout.
+
+Functions:
+    contact_to_dict(contact: RecordContact) -> dict: Converts a contact record into plain data.
+    note_to_dict(number: str, record: RecordNote) -> dict: Converts a note record into plain data.
+    iter_contacts(addressbook: AB, file_format: str) -> Iterator[str]: Yields the contacts as CSV, JSON Lines or vCard.
+    iter_notes(notesbook: NB, file_format: str) -> Iterator[str]: Yields the notes as CSV or JSON Lines.
+    export_book(book: AB | NB, file_name: str | None, ...) -> int: Writes a book to a file or stdout.
+"""
+import csv
+import gzip
+import io
+import json
+import os
+import sys
+from typing import IO
+from typing import Iterable
+from typing import Iterator
+
+from my_address_book.address_book import AddressBook as AB
+from my_address_book.constants import CONTACT_CSV_FIELDS
+from my_address_book.constants import DATE_FORMAT
+from my_address_book.constants import MULTI_VALUE_SEPARATOR
+from my_address_book.constants import NOTE_CSV_FIELDS
+from my_address_book.notes_book import NotesBook as NB
+from my_address_book.records import RecordContact
+from my_address_book.records import RecordNote
+from my_address_book.utils import format_tags
+
+EXPORT_FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".json": "jsonl", ".vcf": "vcard", ".vcard": "vcard"}
+VCARD_TYPES = {"mobile": "CELL", "home": "HOME", "work": "WORK"}
+
+
+def _subrecord_to_dict(value: str, assignment: list | None) -> dict:
+    """
+    The _subrecord_to_dict function converts a phone or email subrecord into a dictionary.
+    """
+    return {"value": value, "assignment": assignment[1] if assignment else None}
+
+
+def contact_to_dict(contact: RecordContact) -> dict:
+    """
+    The contact_to_dict function converts a contact record into a dictionary of plain values
+    that can be dumped to JSON. The birthday is written in ISO format.
+    """
+    birthday = contact.user.birthday_date
+    return {
+        "name": contact.user.name,
+        "phones": [_subrecord_to_dict(phone.subrecord.phone, phone.name) for phone in contact.phone_numbers],
+        "emails": [_subrecord_to_dict(email.subrecord.email, email.name) for email in contact.emails],
+        "birthday": birthday.isoformat()[:10] if birthday else None,
+    }
+
+
+def note_to_dict(number: str, record: RecordNote) -> dict:
+    """
+    The note_to_dict function converts a note record and its number in the notes book into a dictionary.
+    """
+    return {
+        "number": number,
+        "name": record.note.name_note,
+        "note": record.note.read_note(),
+        "date_of_creation": record.date_of_creation,
+        "tags": list(record.note.tags),
+    }
+
+
+def _join_values(values: list[dict]) -> str:
+    """
+    The _join_values function joins phones or emails into one CSV cell in the format read by the importer:
+    'value(assignment);value'.
+    """
+    return MULTI_VALUE_SEPARATOR.join(
+        f"{value['value']}({value['assignment']})" if value["assignment"] else value["value"] for value in values
+    )
+
+
+def _csv_lines(rows: Iterable[list]) -> Iterator[str]:
+    """
+    The _csv_lines function turns rows into CSV lines one by one, reusing a single small buffer.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def _contact_csv_rows(addressbook: AB) -> Iterator[list]:
+    """
+    The _contact_csv_rows function yields the header and a CSV row for every contact.
+    """
+    yield CONTACT_CSV_FIELDS
+    for contact in addressbook.values():
+        data = contact_to_dict(contact)
+        birthday = contact.user.birthday_date
+        yield [
+            data["name"],
+            _join_values(data["phones"]),
+            _join_values(data["emails"]),
+            birthday.strftime(DATE_FORMAT) if birthday else "",
+        ]
+
+
+def _note_csv_rows(notesbook: NB) -> Iterator[list]:
+    """
+    The _note_csv_rows function yields the header and a CSV row for every note.
+    """
+    yield NOTE_CSV_FIELDS
+    for number, record in notesbook.items():
+        note = record.note
+        yield [number, note.name_note or "", note.read_note(), record.date_of_creation, format_tags(note.tags)]
+
+
+def _escape_vcard(value: str) -> str:
+    """
+    The _escape_vcard function escapes the characters that have a special meaning in a vCard text value.
+    """
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace(",", "\\,").replace(";", "\\;")
+
+
+def _vcard_type(assignment: str | None, default: str = "") -> str:
+    """
+    The _vcard_type function makes the TYPE parameter of a TEL or EMAIL property from an assignment.
+    """
+    vcard_type = VCARD_TYPES.get(assignment or "", default)
+    return f";TYPE={vcard_type}" if vcard_type else ""
+
+
+def _contact_vcards(addressbook: AB) -> Iterator[str]:
+    """
+    The _contact_vcards function yields a vCard 3.0 block for every contact.
+    """
+    for contact in addressbook.values():
+        data = contact_to_dict(contact)
+        lines = ["BEGIN:VCARD", "VERSION:3.0", f"FN:{_escape_vcard(data['name'])}", f"N:;{_escape_vcard(data['name'])};;;"]
+        lines.extend(f"TEL{_vcard_type(phone['assignment'])}:{phone['value']}" for phone in data["phones"])
+        lines.extend(f"EMAIL{_vcard_type(email['assignment'], 'INTERNET')}:{email['value']}" for email in data["emails"])
+        if data["birthday"]:
+            lines.append(f"BDAY:{data['birthday']}")
+        lines.append("END:VCARD")
+        yield "\r\n".join(lines) + "\r\n"
+
+
+def _json_lines(records: Iterable[dict]) -> Iterator[str]:
+    """
+    The _json_lines function dumps every record into one line of JSON.
+    """
+    for record in records:
+        yield json.dumps(record, ensure_ascii=False) + "\n"
+
+
+def iter_contacts(addressbook: AB, file_format: str) -> Iterator[str]:
+    """
+    The iter_contacts function yields the contacts of the address book one by one
+    as CSV lines ('csv'), JSON lines ('jsonl') or vCard blocks ('vcard').
+    """
+    if file_format == "csv":
+        return _csv_lines(_contact_csv_rows(addressbook))
+    if file_format == "jsonl":
+        return _json_lines(contact_to_dict(contact) for contact in addressbook.values())
+    if file_format == "vcard":
+        return _contact_vcards(addressbook)
+    raise ValueError(f"Unknown export format '{file_format}', expected csv, jsonl or vcard")
+
+
+def iter_notes(notesbook: NB, file_format: str) -> Iterator[str]:
+    """
+    The iter_notes function yields the notes of the notes book one by one as CSV lines ('csv') or JSON lines ('jsonl').
+    """
+    if file_format == "csv":
+        return _csv_lines(_note_csv_rows(notesbook))
+    if file_format == "jsonl":
+        return _json_lines(note_to_dict(number, record) for number, record in notesbook.items())
+    raise ValueError(f"Unknown export format '{file_format}' for notes, expected csv or jsonl")
+
+
+def _detect_format(file_name: str | None) -> str:
+    """
+    The _detect_format function chooses the export format by the extension of the file name.
+    """
+    if file_name:
+        base_name = file_name[:-3] if file_name.endswith(".gz") else file_name
+        file_format = EXPORT_FORMATS.get(os.path.splitext(base_name)[1].lower())
+        if file_format:
+            return file_format
+    raise ValueError(f"Can not detect the export format of '{file_name}', expected .csv, .jsonl or .vcf")
+
+
+def _open_export_file(file_name: str | None, compress: bool) -> IO:
+    """
+    The _open_export_file function opens the export target: stdout for None or '-', a gzip stream
+    when compress is set or the name ends with .gz, and a plain text file otherwise.
+    """
+    if file_name in (None, "-"):
+        if compress:  # closing the gzip stream leaves stdout open
+            return gzip.open(sys.stdout.buffer, "wt", encoding="utf-8", newline="")
+        return sys.stdout
+    if compress or file_name.endswith(".gz"):
+        return gzip.open(file_name, "wt", encoding="utf-8", newline="")
+    return open(file_name, "w", encoding="utf-8", newline="")
+
+
+def export_book(
+    book: AB | NB,
+    file_name: str | None = None,
+    file_format: str | None = None,
+    compress: bool = False,
+) -> int:
+    """
+    The export_book function writes an address book or a notes book record by record to a file or,
+    when file_name is None or '-', to stdout. Without file_format the format is detected by the file extension.
+    It returns the number of exported records.
+    """
+    file_format = file_format or _detect_format(file_name)
+    chunks = iter_contacts(book, file_format) if isinstance(book, AB) else iter_notes(book, file_format)
+
+    file = _open_export_file(file_name, compress)
+    count = 0
+    try:
+        for chunk in chunks:
+            file.write(chunk)
+            count += 1
+    finally:
+        if file is sys.stdout:
+            file.flush()
+        else:
+            file.close()
+
+    return count - 1 if file_format == "csv" else count
@@ -0,0 +1,326 @@
+"""
+The importer module provides a streaming bulk import of contacts from CSV and vCard files.
+
+Records are parsed one at a time by generators, validated in batches and inserted into the
+address book without sorting; the book is sorted and saved only once, after the last batch.
+
+Classes:
+    ContactRow(NamedTuple): Raw contact data parsed from an import file.
+    ImportReport: The result of an import (number of imported contacts and the errors met).
+
+Functions:
+    split_assignment(value: str, assignments: list[str]) -> tuple: Splits 'value(assignment)' into its parts.
+    read_csv_contacts(lines: Iterable[str]) -> Iterator[ContactRow]: Parses contacts from CSV lines.
+    read_vcard_contacts(lines: Iterable[str]) -> Iterator[ContactRow]: Parses contacts from vCard 3/4 lines.
+    make_contact(row: ContactRow) -> RecordContact: Validates a parsed row and builds a contact record.
+    import_contacts(addressbook: AB, file_name: str, ...) -> ImportReport: Imports a file into the address book.
+"""
+import csv
+import gzip
+import os
+from datetime import date
+from datetime import datetime
+from itertools import islice
+from typing import IO
+from typing import Iterable
+from typing import Iterator
+from typing import NamedTuple
+
+from my_address_book.address_book import AddressBook as AB
+from my_address_book.constants import DATE_FORMAT
+from my_address_book.constants import EMAIL_ASSIGNMENTS
+from my_address_book.constants import IMPORT_BATCH_SIZE
+from my_address_book.constants import MAX_IMPORT_ERRORS
+from my_address_book.constants import MULTI_VALUE_SEPARATOR
+from my_address_book.constants import PHONE_ASSIGNMENTS
+from my_address_book.entities import Email
+from my_address_book.entities import Phone
+from my_address_book.entities import User
+from my_address_book.records import RecordContact
+from my_address_book.storage import paused_gc
+from my_address_book.utils import sanitize_phone_number
+from my_address_book.validation import birthday_date_validation
+from my_address_book.validation import email_validation
+from my_address_book.validation import name_validation
+from my_address_book.validation import phone_validation
+
+VCARD_TYPES = {"cell": "mobile", "mobile": "mobile", "home": "home", "work": "work"}
+
+
+class ContactRow(NamedTuple):
+    """Contact data parsed from an import file"""
+
+    line: int
+    name: str
+    phones: list[tuple[str, str | None]]
+    emails: list[tuple[str, str | None]]
+    birthday: str | None
+
+
+class ImportReport:
+    """
+    The result of a bulk import.
+
+    Attributes:
+        imported (int): The number of contacts added to the address book.
+        failed (int): The number of rows rejected by the validation.
+        errors (list[str]): The first MAX_IMPORT_ERRORS error messages, prefixed with the line number.
+    """
+
+    def __init__(self) -> None:
+        self.imported = 0
+        self.failed = 0
+        self.errors: list[str] = []
+
+    def add_error(self, line: int, message: str) -> None:
+        """
+        The add_error function counts a rejected row and keeps its message while the limit is not reached,
+        so that a broken file of a million rows does not grow the report without bound.
+        """
+        self.failed += 1
+        if len(self.errors) < MAX_IMPORT_ERRORS:
+            self.errors.append(f"line {line}: {message}")
+
+
+def split_assignment(value: str, assignments: list[str]) -> tuple[str, str | None]:
+    """
+    The split_assignment function splits a value written as 'value(assignment)', the way
+    print_all_contacts shows it, into the value and the assignment.
+    """
+    value = value.strip()
+    if value.endswith(")") and "(" in value:
+        value, assignment = value[:-1].rsplit("(", 1)
+        if assignment in assignments:
+            return value.strip(), assignment
+    return value, None
+
+
+def _parse_birthday(value: str) -> date | None:
+    """
+    The _parse_birthday function converts the birthday text of an import file into a date.
+    It understands the application format (dd-mm-YYYY) and the vCard formats (YYYYMMDD, YYYY-MM-DD).
+    Dates without a year (vCard 4 '--MMDD') can not be stored and are skipped.
+    """
+    value = value.strip()
+    if not value or value.startswith("--"):
+        return None
+
+    if len(value) == 10 and value[2] == value[5] == "-" and value.replace("-", "").isdigit():
+        return date(int(value[6:]), int(value[3:5]), int(value[:2]))
+
+    for date_format in (DATE_FORMAT, "%Y%m%d", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(value[:10], date_format).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Unknown birthday format '{value}'")
+
+
+def read_csv_contacts(lines: Iterable[str]) -> Iterator[ContactRow]:
+    """
+    The read_csv_contacts function parses contacts from CSV lines with the CONTACT_CSV_FIELDS header
+    'name,phones,emails,birthday'. Several phones or emails are separated by ';'
+    and may carry an assignment: '380951234567(mobile);380441234567(work)'.
+    """
+    reader = csv.DictReader(lines)
+    for row in reader:
+        phones = [
+            split_assignment(phone, PHONE_ASSIGNMENTS)
+            for phone in (row.get("phones") or "").split(MULTI_VALUE_SEPARATOR)
+            if phone.strip()
+        ]
+        emails = [
+            split_assignment(email, EMAIL_ASSIGNMENTS)
+            for email in (row.get("emails") or "").split(MULTI_VALUE_SEPARATOR)
+            if email.strip()
+        ]
+        yield ContactRow(
+            reader.line_num,
+            (row.get("name") or "").strip(),
+            phones,
+            emails,
+            row.get("birthday") or None,
+        )
+
+
+def _unfold_lines(lines: Iterable[str]) -> Iterator[tuple[int, str]]:
+    """
+    The _unfold_lines function joins folded vCard lines (continuations start with a space or a tab)
+    and yields each logical line with the number of the physical line it started on.
+    """
+    current = ""
+    current_number = 0
+    for number, line in enumerate(lines, 1):
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and current:
+            current += line[1:]
+            continue
+        if current:
+            yield current_number, current
+        current, current_number = line, number
+    if current:
+        yield current_number, current
+
+
+def _unescape_vcard(value: str) -> str:
+    """
+    The _unescape_vcard function restores the characters escaped in a vCard text value.
+    """
+    return value.replace("\\n", "\n").replace("\\,", ",").replace("\\;", ";").replace("\\\\", "\\")
+
+
+def _vcard_assignment(params: list[str], assignments: list[str]) -> str | None:
+    """
+    The _vcard_assignment function finds the assignment of a TEL or EMAIL property in its parameters.
+    Both 'TYPE=cell,voice' (vCard 3/4) and bare 'CELL' (vCard 2.1) parameters are accepted.
+    """
+    for param in params:
+        values = param.split("=", 1)[-1].strip('"').lower()
+        for value in values.split(","):
+            assignment = VCARD_TYPES.get(value)
+            if assignment in assignments:
+                return assignment
+    return None
+
+
+def _read_vcard_property(card: dict, name: str, params: list[str], value: str) -> None:
+    """
+    The _read_vcard_property function stores a FN, N, TEL, EMAIL or BDAY property in the card being read.
+    """
+    if name == "FN":
+        card["name"] = _unescape_vcard(value.strip())
+    elif name == "N" and not card["name"]:
+        card["name"] = " ".join(part.strip() for part in value.split(";")[1::-1] if part.strip())
+    elif name == "TEL":
+        phone = value.strip()
+        if phone.lower().startswith("tel:"):
+            phone = phone[4:]
+        card["phones"].append((phone, _vcard_assignment(params, PHONE_ASSIGNMENTS)))
+    elif name == "EMAIL":
+        card["emails"].append((value.strip(), _vcard_assignment(params, EMAIL_ASSIGNMENTS)))
+    elif name == "BDAY":
+        card["birthday"] = value
+
+
+def read_vcard_contacts(lines: Iterable[str]) -> Iterator[ContactRow]:
+    """
+    The read_vcard_contacts function parses contacts from vCard 3.0/4.0 lines.
+    It reads the FN (or N), TEL, EMAIL and BDAY properties of every BEGIN:VCARD ... END:VCARD block.
+    """
+    card: dict | None = None
+    for number, line in _unfold_lines(lines):
+        if ":" not in line:
+            continue
+        key, value = line.split(":", 1)
+        name, *params = key.split(";")
+        name = name.split(".")[-1].upper()
+
+        if name == "BEGIN" and value.strip().upper() == "VCARD":
+            card = {"line": number, "name": "", "phones": [], "emails": [], "birthday": None}
+        elif card is None:
+            continue
+        elif name == "END":
+            yield ContactRow(card["line"], card["name"], card["phones"], card["emails"], card["birthday"])
+            card = None
+        else:
+            _read_vcard_property(card, name, params, value)
+
+
+def make_contact(row: ContactRow) -> RecordContact:
+    """
+    The make_contact function validates one parsed row and builds a contact record from it.
+    Phones are normalized with sanitize_phone_number before validation, as AddContactForm does.
+    A ValueError with the validation message is raised for an invalid row.
+    """
+    message_error = name_validation(row.name)
+    if message_error:
+        raise ValueError(message_error)
+
+    birthday = _parse_birthday(row.birthday) if row.birthday else None
+    message_error = birthday_date_validation(birthday)
+    if message_error:
+        raise ValueError(message_error)
+
+    contact = RecordContact(User(row.name))
+    contact.add_birthday(birthday)
+
+    for phone, assignment in row.phones:
+        sanitized_phone = sanitize_phone_number(phone)
+        message_error = phone_validation(sanitized_phone)
+        if message_error:
+            raise ValueError(message_error)
+        phone_assignment = [PHONE_ASSIGNMENTS.index(assignment), assignment] if assignment else None
+        contact.add_phone_number(Phone(sanitized_phone), phone_assignment)
+
+    for email, assignment in row.emails:
+        message_error = email_validation(email)
+        if message_error:
+            raise ValueError(message_error)
+        email_assignment = [EMAIL_ASSIGNMENTS.index(assignment), assignment] if assignment else None
+        contact.add_email(Email(email), email_assignment)
+
+    return contact
+
+
+def _import_batch(addressbook: AB, batch: list[ContactRow], report: ImportReport) -> None:
+    """
+    The _import_batch function validates a batch of rows and adds the valid contacts to the address book.
+    Rows with a name that is already in the book are rejected.
+    """
+    for row in batch:
+        try:
+            contact = make_contact(row)
+        except ValueError as error:
+            report.add_error(row.line, str(error))
+            continue
+
+        if row.name in addressbook.data:
+            report.add_error(row.line, f"The contact '{row.name}' already exists in the address book.")
+            continue
+
+        addressbook.add_record(contact)
+        report.imported += 1
+
+
+def _open_import_file(file_name: str) -> IO[str]:
+    """
+    The _open_import_file function opens an import file for reading text, unpacking it on the fly
+    when it is gzip-compressed.
+    """
+    if file_name.endswith(".gz"):
+        return gzip.open(file_name, "rt", encoding="utf-8", newline="")
+    return open(file_name, "r", encoding="utf-8", newline="")
+
+
+def import_contacts(
+    addressbook: AB,
+    file_name: str,
+    save_file_name: str | None = None,
+    batch_size: int = IMPORT_BATCH_SIZE,
+) -> ImportReport:
+    """
+    The import_contacts function streams contacts from a CSV or vCard file (optionally gzip-compressed)
+    into the address book. The format is chosen by the file extension: .csv or .vcf/.vcard.
+    The rows are validated and added in batches of batch_size in one batch of the book (see Book.batch):
+    the book is sorted once and, if save_file_name is given, saved once; a failed import changes nothing.
+    """
+    base_name = file_name[:-3] if file_name.endswith(".gz") else file_name
+    extension = os.path.splitext(base_name)[1].lower()
+    if extension == ".csv":
+        parser = read_csv_contacts
+    elif extension in (".vcf", ".vcard"):
+        parser = read_vcard_contacts
+    else:
+        raise ValueError(f"Unknown import format '{extension}', expected .csv, .vcf or .vcard")
+
+    report = ImportReport()
+    with paused_gc(), addressbook.batch(save_file_name):
+        try:
+            with _open_import_file(file_name) as file:
+                rows = parser(file)
+                while batch := list(islice(rows, batch_size)):
+                    _import_batch(addressbook, batch, report)
+        except FileNotFoundError as error:
+            raise FileNotFoundError(f"File not found {file_name}") from error
+
+    return report
@@ -0,0 +1,93 @@
+"""
+The index_store module keeps the indexes of an address book as JSON next to the book, with the stamp of the book
+they were written for (see book_stamp), so a book is loaded without computing its indexes from scratch.
+
+Functions:
+    index_file_name(book_file_name: str) -> str: Returns the index file of a book file or directory of shards.
+    book_stamp(book_file_name: str) -> str | None: Returns the stamp of the book as it is on the disk.
+    write_indexes(file_name: str, stamp: str, indexes: list[RecordIndex]) -> None: Writes an index file.
+    read_indexes(file_name: str, stamp: str, indexes: list[RecordIndex], records: int) -> bool: Loads an index file.
+"""
+import json
+import os
+
+from my_address_book.codec import DELTA_SUFFIX
+from my_address_book.indexes import RecordIndex
+from my_address_book.shards import MANIFEST_NAME
+from my_address_book.shards import is_sharded
+from my_address_book.storage import atomic_write
+from my_address_book.storage import file_stamp
+
+INDEX_VERSION = 1
+INDEX_SUFFIX = ".idx"
+INDEX_NAME = "indexes.idx"
+
+
+def index_file_name(book_file_name: str) -> str:
+    """
+    The index_file_name function returns the index file of a book: INDEX_NAME in a directory of shards,
+    the book file name with INDEX_SUFFIX otherwise.
+    """
+    if is_sharded(book_file_name):
+        return os.path.join(book_file_name, INDEX_NAME)
+    return book_file_name + INDEX_SUFFIX
+
+
+def book_stamp(book_file_name: str) -> str | None:
+    """
+    The book_stamp function returns the size and the CRC-32 of the book file and of its differential snapshot
+    (or of the manifest of a book in shards) as they are on the disk; None when there is no book file.
+    """
+    if is_sharded(book_file_name):
+        return file_stamp(os.path.join(book_file_name, MANIFEST_NAME))
+    stamp, delta_stamp = file_stamp(book_file_name), file_stamp(book_file_name + DELTA_SUFFIX)
+    return stamp if stamp is None or delta_stamp is None else f"{stamp}+{delta_stamp}"
+
+
+def write_indexes(file_name: str, stamp: str, indexes: list[RecordIndex]) -> None:
+    """
+    The write_indexes function writes the dumps of the indexes with the stamp of the book to an index file,
+    replacing it atomically.
+    """
+    data = {
+        "version": INDEX_VERSION,
+        "stamp": stamp,
+        "indexes": {type(index).__name__: index.dump() for index in indexes},
+    }
+    with atomic_write(file_name) as file:
+        file.write(json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode())
+
+
+def _read_dumps(file_name: str, stamp: str) -> dict | None:
+    """
+    The _read_dumps function returns the dumps of the indexes in an index file written for the book with the stamp, or None.
+    """
+    try:
+        with open(file_name, "rb") as file:
+            data = json.loads(file.read())
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get("version") != INDEX_VERSION or data.get("stamp") != stamp:
+        return None
+    dumps = data.get("indexes")
+    return dumps if isinstance(dumps, dict) else None
+
+
+def read_indexes(file_name: str, stamp: str, indexes: list[RecordIndex], records: int) -> bool:
+    """
+    The read_indexes function loads the indexes from an index file written for the book with the stamp and the number
+    of records; False when it is missing, stale or damaged (then the indexes may be left empty).
+    """
+    dumps = _read_dumps(file_name, stamp)
+    if dumps is None or any(type(index).__name__ not in dumps for index in indexes):
+        return False
+    if "NameIndex" in dumps and len(dumps["NameIndex"]) != records:
+        return False
+    try:
+        for index in indexes:
+            index.load(dumps[type(index).__name__])
+    except (AttributeError, KeyError, TypeError, ValueError):
+        for index in indexes:
+            index.clear()
+        return False
+    return True
@@ -0,0 +1,966 @@
+"""
+The indexes module provides the in-memory indexes the address book keeps over its contacts
+and the notes book over its notes, kept up to date as records are added, changed and removed.
+
+Classes:
+    RecordIndex: The interface of an index over the contact records.
+    SortedKeys: A sorted list of keys with lazy inserts and prefix range scans.
+    PhoneIndex: A reverse phone index for caller-ID lookups.
+    EmailIndex: An index of emails by domain and local part.
+    NameIndex: The search keys of names and their trigram index for fuzzy (typo tolerant) search.
+    BirthdayIndex: A min-heap of the next birthdays for the upcoming birthdays and the reminders.
+    CreationIndex: The notes sorted by their time of creation, for ranges of time and the newest notes.
+    TagIndex: A bitmap of the notes of every tag, for combinations of tags.
+
+Functions:
+    canonical_phone(phone: str) -> str: Returns the digits of a phone number, as the index keys them.
+    search_key(text: str) -> str: Returns the casefolded Latin spelling of a name, as the index keys it.
+    bounded_levenshtein(first: str, second: str, max_distance: int) -> int | None: Edit distance up to a bound.
+    bitmap_of(numbers: Iterable[int]) -> int: Returns the bitmap with the bits of the numbers set.
+    bitmap_numbers(bitmap: int) -> Iterator[str]: Yields the numbers of the bits set in a bitmap.
+"""
+import heapq
+import re
+from abc import ABCMeta
+from abc import abstractmethod
+from bisect import bisect_left
+from bisect import insort
+from collections import Counter
+from datetime import date
+from itertools import compress
+from itertools import islice
+from typing import Iterable
+from typing import Iterator
+from typing import Mapping
+from typing import Sequence
+
+from my_address_book.constants import FUZZY_LIMIT
+from my_address_book.constants import FUZZY_MAX_DISTANCE
+from my_address_book.constants import PHONE_RANGE
+from my_address_book.constants import TRANSLITERATION
+from my_address_book.constants import TRANSLITERATION_INITIAL
+from my_address_book.records import RecordContact
+from my_address_book.records import RecordNote
+from my_address_book.records import days_to_birthdays_table
+from my_address_book.utils import PHONE_JUNK
+
+MIN_PHONE_SUFFIX = PHONE_RANGE[0]
+MAX_PENDING_INSERTS = 64
+MIN_HEAP_COMPACTION = 64
+UNKNOWN_CREATED = float("-inf")
+BINARY_DIGITS = bytes.maketrans(b"01", b"\x00\x01")
+
+TRANSLITERATE = str.maketrans(TRANSLITERATION)
+WORD_INITIAL = re.compile(f"(?<![\\w'’])[{''.join(TRANSLITERATION_INITIAL)}]")
+
+
+def canonical_phone(phone: str) -> str:
+    """
+    The canonical_phone function cleans a phone number as sanitize_phone_number does, without the '+',
+    so '+38(095)123-45-67' and '380951234567' get the same key.
+    """
+    return "".join(phone.translate(PHONE_JUNK).split())
+
+
+def search_key(text: str) -> str:
+    """
+    The search_key function casefolds a name and transliterates its Cyrillic letters to Latin,
+    so 'Олександр', 'OLEKSANDR' and 'Oleksandr' get the same key 'oleksandr'.
+    """
+    text = text.casefold()
+    if text.isascii():
+        return text
+    text = WORD_INITIAL.sub(lambda match: TRANSLITERATION_INITIAL[match.group()], text)
+    return text.translate(TRANSLITERATE)
+
+
+class RecordIndex(metaclass=ABCMeta):
+    """Interface of an index over the contact records"""
+
+    @abstractmethod
+    def add(self, record: RecordContact) -> None:
+        pass
+
+    @abstractmethod
+    def remove(self, name: str) -> None:
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        pass
+
+    @abstractmethod
+    def dump(self) -> dict:
+        pass
+
+    @abstractmethod
+    def load(self, state: dict) -> None:
+        pass
+
+    def rebuild(self, records: Iterable[RecordContact]) -> None:
+        """
+        The rebuild function indexes all the records anew; an index may build its dump and load it at once instead.
+        """
+        self.clear()
+        for record in records:
+            self.add(record)
+
+
+class SortedKeys:
+    """
+    A sorted list of string keys with range scans by prefix in O(log n + k); new keys are sorted in before the next scan.
+
+    Methods:
+        add(key): Adds a key that is not in the list yet.
+        update(keys): Adds keys that are not in the list yet.
+        remove(key): Removes a key.
+        clear(): Empties the list.
+        with_prefix(prefix): Yields the keys starting with the prefix, in order.
+    """
+
+    def __init__(self) -> None:
+        self._keys: list[str] = []
+        self._pending: set[str] = set()
+
+    def add(self, key: str) -> None:
+        self._pending.add(key)
+
+    def update(self, keys: Iterable[str]) -> None:
+        self._pending.update(keys)
+
+    def remove(self, key: str) -> None:
+        if key in self._pending:
+            self._pending.discard(key)
+            return
+        position = bisect_left(self._keys, key)
+        if position < len(self._keys) and self._keys[position] == key:
+            del self._keys[position]
+
+    def clear(self) -> None:
+        self._keys.clear()
+        self._pending.clear()
+
+    def _merge_pending(self) -> None:
+        if len(self._pending) <= MAX_PENDING_INSERTS:
+            for key in self._pending:
+                insort(self._keys, key)
+        else:
+            self._keys.extend(self._pending)
+            self._keys.sort()
+        self._pending.clear()
+
+    def with_prefix(self, prefix: str) -> Iterator[str]:
+        """
+        The with_prefix function yields the keys starting with the prefix, in order.
+        """
+        if self._pending:
+            self._merge_pending()
+        position = bisect_left(self._keys, prefix)
+        while position < len(self._keys) and self._keys[position].startswith(prefix):
+            yield self._keys[position]
+            position += 1
+
+
+class PhoneIndex(RecordIndex):
+    """
+    A reverse phone index: finds the names of the contacts that own a phone number,
+    exactly or by suffix (the numbers are also kept reversed in SortedKeys).
+
+    Methods:
+        add(record): Indexes the phone numbers of a contact.
+        remove(name): Removes the phone numbers of a contact from the index.
+        clear(): Empties the index.
+        dump(): Returns the canonical phones of every contact.
+        load(state): Rebuilds the index from the dumped phones.
+        rebuild(records): Indexes all the records anew, in bulk.
+        lookup(number): Returns the names of the contacts owning the phone number.
+        starting_with(digits): Returns the names of the contacts with a number starting with the digits.
+    """
+
+    def __init__(self) -> None:
+        self._names_by_phone: dict[str, set[str]] = {}
+        self._phones_by_name: dict[str, list[str]] = {}
+        self._phones = SortedKeys()
+        self._reversed_phones = SortedKeys()
+
+    def add(self, record: RecordContact) -> None:
+        """
+        The add function indexes the phone numbers of a contact; numbers indexed before for the same name are replaced.
+        """
+        name = record.user.name
+        self.remove(name)
+
+        phones = [canonical_phone(phone.subrecord.phone) for phone in record.phone_numbers if phone.subrecord.phone]
+        phones = [phone for phone in phones if phone]
+        if not phones:
+            return
+
+        self._phones_by_name[name] = phones
+        for phone in phones:
+            names = self._names_by_phone.get(phone)
+            if names is None:
+                self._names_by_phone[phone] = {name}
+                self._phones.add(phone)
+                self._reversed_phones.add(phone[::-1])
+            else:
+                names.add(name)
+
+    def rebuild(self, records: Iterable[RecordContact]) -> None:
+        """
+        The rebuild function cleans the phones of all the records and loads them at once.
+        """
+        state = {}
+        for record in records:
+            phones = [canonical_phone(phone.subrecord.phone) for phone in record.phone_numbers if phone.subrecord.phone]
+            phones = [phone for phone in phones if phone]
+            if phones:
+                state[record.user.name] = phones
+        self.load(state)
+
+    def remove(self, name: str) -> None:
+        """
+        The remove function removes the phone numbers of a contact from the index.
+        """
+        for phone in self._phones_by_name.pop(name, []):
+            names = self._names_by_phone.get(phone)
+            if names is None:
+                continue
+            names.discard(name)
+            if names:
+                continue
+
+            del self._names_by_phone[phone]
+            self._phones.remove(phone)
+            self._reversed_phones.remove(phone[::-1])
+
+    def clear(self) -> None:
+        """
+        The clear function empties the index.
+        """
+        self._names_by_phone.clear()
+        self._phones_by_name.clear()
+        self._phones.clear()
+        self._reversed_phones.clear()
+
+    def dump(self) -> dict[str, list[str]]:
+        """
+        The dump function returns the canonical phones of every contact.
+        """
+        return self._phones_by_name
+
+    def load(self, state: dict[str, list[str]]) -> None:
+        """
+        The load function rebuilds the index from the phones returned by dump, without cleaning the numbers again.
+        """
+        self.clear()
+        self._phones_by_name = state
+        names_by_phone = self._names_by_phone
+        for name, phones in state.items():
+            for phone in phones:
+                names = names_by_phone.get(phone)
+                if names is None:
+                    names_by_phone[phone] = {name}
+                else:
+                    names.add(name)
+        self._phones.update(names_by_phone)
+        self._reversed_phones.update(phone[::-1] for phone in names_by_phone)
+
+    def _ending_with(self, phone: str) -> set[str]:
+        """
+        The _ending_with function returns the names of the numbers that end with the given digits.
+        """
+        names: set[str] = set()
+        for reversed_phone in self._reversed_phones.with_prefix(phone[::-1]):
+            names.update(self._names_by_phone[reversed_phone[::-1]])
+        return names
+
+    def lookup(self, number: str) -> set[str]:
+        """
+        The lookup function returns the names of the contacts owning the phone number: an exact match, or else
+        the numbers matching by a suffix of at least MIN_PHONE_SUFFIX digits ('0951234567' finds '+380951234567').
+        """
+        phone = canonical_phone(number)
+        names = self._names_by_phone.get(phone)
+        if names:
+            return set(names)
+
+        found: set[str] = set()
+        for digits in {phone, phone.lstrip("0")}:
+            if len(digits) < MIN_PHONE_SUFFIX:
+                continue
+            found.update(self._ending_with(digits))
+            for length in range(len(digits) - 1, MIN_PHONE_SUFFIX - 1, -1):
+                found.update(self._names_by_phone.get(digits[-length:], ()))
+        return found
+
+    def starting_with(self, digits: str) -> set[str]:
+        """
+        The starting_with function returns the names of the contacts with a number starting with the digits.
+        """
+        names: set[str] = set()
+        for phone in self._phones.with_prefix(digits):
+            names.update(self._names_by_phone[phone])
+        return names
+
+
+def split_email(email: str) -> tuple[str, str]:
+    """
+    The split_email function splits an email into its local part and domain, both in lower case.
+    """
+    local_part, _, domain = email.strip().lower().rpartition("@")
+    return local_part, domain
+
+
+def reversed_domain(domain: str) -> str:
+    """
+    The reversed_domain function reverses the labels of a domain: 'mail.example.com' -> 'com.example.mail',
+    so that a domain and all its subdomains share one prefix.
+    """
+    return ".".join(reversed(domain.lower().strip(".").split(".")))
+
+
+class EmailIndex(RecordIndex):
+    """
+    An index of the contacts by the domain and the local part of their emails; a domain with its subdomains
+    is one range of the reversed domains in SortedKeys.
+
+    Methods:
+        add(record): Indexes the emails of a contact.
+        remove(name): Removes the emails of a contact from the index.
+        clear(): Empties the index.
+        dump(): Returns the split emails of every contact.
+        load(state): Rebuilds the index from the dumped emails.
+        rebuild(records): Indexes all the records anew, in bulk.
+        by_domain(domain, subdomains): Returns the names of the contacts with an email at the domain.
+        by_local_part(local_part): Returns the names of the contacts with an email with the local part.
+        domain_counts(): Returns the number of contacts per domain.
+    """
+
+    def __init__(self) -> None:
+        self._names_by_domain: dict[str, set[str]] = {}
+        self._names_by_local_part: dict[str, set[str]] = {}
+        self._emails_by_name: dict[str, list[tuple[str, str]]] = {}
+        self._reversed_domains = SortedKeys()
+
+    def add(self, record: RecordContact) -> None:
+        """
+        The add function indexes the emails of a contact; emails indexed before for the same name are replaced.
+        """
+        name = record.user.name
+        self.remove(name)
+
+        emails = [split_email(email.subrecord.email) for email in record.emails if email.subrecord.email]
+        emails = [(local_part, domain) for local_part, domain in emails if domain]
+        if not emails:
+            return
+
+        self._emails_by_name[name] = emails
+        for local_part, domain in emails:
+            names = self._names_by_domain.get(domain)
+            if names is None:
+                self._names_by_domain[domain] = {name}
+                self._reversed_domains.add(reversed_domain(domain))
+            else:
+                names.add(name)
+            self._names_by_local_part.setdefault(local_part, set()).add(name)
+
+    def rebuild(self, records: Iterable[RecordContact]) -> None:
+        """
+        The rebuild function splits the emails of all the records and loads them at once.
+        """
+        state = {}
+        for record in records:
+            emails = [split_email(email.subrecord.email) for email in record.emails if email.subrecord.email]
+            emails = [(local_part, domain) for local_part, domain in emails if domain]
+            if emails:
+                state[record.user.name] = emails
+        self.load(state)
+
+    def remove(self, name: str) -> None:
+        """
+        The remove function removes the emails of a contact from the index.
+        """
+        for local_part, domain in self._emails_by_name.pop(name, []):
+            names = self._names_by_local_part.get(local_part)
+            if names is not None:
+                names.discard(name)
+                if not names:
+                    del self._names_by_local_part[local_part]
+
+            names = self._names_by_domain.get(domain)
+            if names is not None:
+                names.discard(name)
+                if not names:
+                    del self._names_by_domain[domain]
+                    self._reversed_domains.remove(reversed_domain(domain))
+
+    def clear(self) -> None:
+        """
+        The clear function empties the index.
+        """
+        self._names_by_domain.clear()
+        self._names_by_local_part.clear()
+        self._emails_by_name.clear()
+        self._reversed_domains.clear()
+
+    def dump(self) -> dict[str, list[tuple[str, str]]]:
+        """
+        The dump function returns the (local part, domain) of the emails of every contact.
+        """
+        return self._emails_by_name
+
+    def load(self, state: dict[str, list]) -> None:
+        """
+        The load function rebuilds the index from the emails returned by dump.
+        """
+        self.clear()
+        names_by_domain, names_by_local_part = self._names_by_domain, self._names_by_local_part
+        for name, emails in state.items():
+            emails = self._emails_by_name[name] = [(local_part, domain) for local_part, domain in emails]
+            for local_part, domain in emails:
+                names = names_by_domain.get(domain)
+                if names is None:
+                    names_by_domain[domain] = {name}
+                else:
+                    names.add(name)
+                names = names_by_local_part.get(local_part)
+                if names is None:
+                    names_by_local_part[local_part] = {name}
+                else:
+                    names.add(name)
+        self._reversed_domains.update(reversed_domain(domain) for domain in names_by_domain)
+
+    def by_domain(self, domain: str, subdomains: bool = True) -> set[str]:
+        """
+        The by_domain function returns the names of the contacts with an email at the domain
+        and, unless subdomains is False, at any of its subdomains.
+        """
+        domain = domain.lower().strip(".")
+        names = set(self._names_by_domain.get(domain, ()))
+        if subdomains:
+            for key in self._reversed_domains.with_prefix(reversed_domain(domain) + "."):
+                names.update(self._names_by_domain[reversed_domain(key)])
+        return names
+
+    def by_local_part(self, local_part: str) -> set[str]:
+        """
+        The by_local_part function returns the names of the contacts with an email with the local part.
+        """
+        return set(self._names_by_local_part.get(local_part.lower(), ()))
+
+    def domain_counts(self) -> dict[str, int]:
+        """
+        The domain_counts function returns the number of contacts per email domain.
+        """
+        return {domain: len(names) for domain, names in self._names_by_domain.items()}
+
+
+def bounded_levenshtein(first: str, second: str, max_distance: int) -> int | None:
+    """
+    The bounded_levenshtein function returns the edit distance between two strings, or None as soon as
+    it is known to be greater than max_distance.
+    """
+    if abs(len(first) - len(second)) > max_distance:
+        return None
+
+    previous = list(range(len(second) + 1))
+    for i, first_char in enumerate(first, 1):
+        current = [i]
+        for j, second_char in enumerate(second, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (first_char != second_char)))
+        if min(current) > max_distance:
+            return None
+        previous = current
+
+    return previous[-1] if previous[-1] <= max_distance else None
+
+
+def _trigrams(key: str) -> set[str]:
+    """
+    The _trigrams function returns the trigrams of a key padded at both ends, so short names have trigrams too.
+    """
+    padded = f"  {key} "
+    return {"".join(trigram) for trigram in zip(padded, padded[1:], padded[2:])}
+
+
+class NameIndex(RecordIndex):
+    """
+    The search keys of contact names and their trigram index (built on the first fuzzy search)
+    for fuzzy search that tolerates typos.
+
+    Methods:
+        add(record): Indexes the name of a contact.
+        remove(name): Removes a name from the index.
+        clear(): Empties the index.
+        dump(): Returns the search key of every name.
+        load(state): Rebuilds the index from the dumped search keys.
+        key(name): Returns the search key of a name.
+        containing(fragment): Returns the names whose search key contains the fragment.
+        closest(query, max_distance, limit): Returns the names closest to the query.
+    """
+
+    def __init__(self) -> None:
+        self._key_by_name: dict[str, str] = {}
+        self._names_by_key: dict[str, set[str]] = {}
+        self._keys_by_trigram: dict[str, set[str]] = {}
+        self._keys_by_length: dict[int, set[str]] = {}
+        self._fuzzy_ready = False
+
+    def add(self, record: RecordContact) -> None:
+        """
+        The add function indexes the name of a contact.
+        """
+        name = record.user.name
+        if name in self._key_by_name:
+            return
+        key = self._key_by_name[name] = search_key(name)
+        names = self._names_by_key.get(key)
+        if names is not None:
+            names.add(name)
+            return
+
+        self._names_by_key[key] = {name}
+        if self._fuzzy_ready:
+            self._add_fuzzy_key(key)
+
+    def _add_fuzzy_key(self, key: str) -> None:
+        for trigram in _trigrams(key):
+            self._keys_by_trigram.setdefault(trigram, set()).add(key)
+        self._keys_by_length.setdefault(len(key), set()).add(key)
+
+    def remove(self, name: str) -> None:
+        """
+        The remove function removes a name from the index.
+        """
+        key = self._key_by_name.pop(name, None)
+        if key is None:
+            return
+        names = self._names_by_key[key]
+        names.discard(name)
+        if names:
+            return
+
+        del self._names_by_key[key]
+        if not self._fuzzy_ready:
+            return
+        for trigram in _trigrams(key):
+            keys = self._keys_by_trigram[trigram]
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_trigram[trigram]
+        self._keys_by_length[len(key)].discard(key)
+
+    def clear(self) -> None:
+        """
+        The clear function empties the index.
+        """
+        self._key_by_name.clear()
+        self._names_by_key.clear()
+        self._keys_by_trigram.clear()
+        self._keys_by_length.clear()
+        self._fuzzy_ready = False
+
+    def dump(self) -> dict[str, str]:
+        """
+        The dump function returns the search key of every name.
+        """
+        return self._key_by_name
+
+    def load(self, state: dict[str, str]) -> None:
+        """
+        The load function rebuilds the index from the search keys returned by dump, without transliterating
+        the names again. The trigrams are built on the first fuzzy search, as after add.
+        """
+        self.clear()
+        self._key_by_name = state
+        names_by_key = self._names_by_key
+        for name, key in state.items():
+            names = names_by_key.get(key)
+            if names is None:
+                names_by_key[key] = {name}
+            else:
+                names.add(name)
+
+    def key(self, name: str) -> str:
+        """
+        The key function returns the search key of a name, computing it only for a name that is not indexed.
+        """
+        key = self._key_by_name.get(name)
+        return key if key is not None else search_key(name)
+
+    def __len__(self) -> int:
+        return len(self._key_by_name)
+
+    def containing(self, fragment: str) -> set[str]:
+        """
+        The containing function returns the names whose search key contains the search key fragment.
+        Names sharing a key are checked once.
+        """
+        return {name for key, names in self._names_by_key.items() if fragment in key for name in names}
+
+    def _candidates(self, key: str, max_distance: int) -> Iterator[str]:
+        """
+        The _candidates function yields the keys that can be within max_distance of the query key: an edit changes
+        at most 3 trigrams, so they share all but 3 * max_distance of its trigrams (or are of a close length).
+        """
+        if not self._fuzzy_ready:
+            for indexed_key in self._names_by_key:
+                self._add_fuzzy_key(indexed_key)
+            self._fuzzy_ready = True
+        trigrams = _trigrams(key)
+        min_shared = len(trigrams) - 3 * max_distance
+        if min_shared > 0:
+            shared: Counter = Counter()
+            for trigram in trigrams:
+                shared.update(self._keys_by_trigram.get(trigram, ()))
+            yield from (candidate for candidate, count in shared.items() if count >= min_shared)
+        else:
+            for length in range(max(len(key) - max_distance, 0), len(key) + max_distance + 1):
+                yield from self._keys_by_length.get(length, ())
+
+    def closest(self, query: str, max_distance: int = FUZZY_MAX_DISTANCE, limit: int = FUZZY_LIMIT) -> list[tuple[int, str]]:
+        """
+        The closest function returns up to limit (distance, name) pairs of the names within max_distance
+        edits of the query, the closest first.
+        """
+        key = search_key(query)
+        matches: list[tuple[int, str]] = []
+        for candidate in self._candidates(key, max_distance):
+            distance = bounded_levenshtein(key, candidate, max_distance)
+            if distance is not None:
+                matches.extend((distance, name) for name in self._names_by_key[candidate])
+        return heapq.nsmallest(limit, matches)
+
+
+class BirthdayIndex(RecordIndex):
+    """
+    A min-heap of the next birthday of every contact, so the upcoming birthdays are found without
+    scanning and sorting the book; changed and removed entries are invalidated and dropped lazily.
+
+    Methods:
+        add(record): Schedules the next birthday of a contact.
+        remove(name): Removes a contact from the schedule.
+        clear(): Empties the schedule.
+        dump(): Returns the birthday (month, day) of every contact.
+        load(state): Rebuilds the schedule from the dumped birthdays.
+        rebuild(records): Schedules all the records anew, with one heapify.
+        next_birthdays(k, today): Returns the k nearest birthdays.
+        due(days_ahead, today): Yields the birthdays due, each birthday once.
+        remind(name, ordinal): Notes that a birthday has been reminded of.
+    """
+
+    def __init__(self) -> None:
+        # The entries are [date ordinal, name, (month, day), valid]; a passed birthday moves to its next year at the top.
+        self._heap: list[list] = []
+        self._entries: dict[str, list] = {}
+        self._reminded: set[tuple[str, int]] = set()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, record: RecordContact) -> None:
+        """
+        The add function schedules the next birthday of a contact; a contact whose birthday has not changed
+        keeps its entry.
+        """
+        name = record.user.name
+        birthday = record.user.birthday_date
+        if birthday is None:
+            self.remove(name)
+            return
+
+        month_day = (birthday.month, birthday.day)
+        entry = self._entries.get(name)
+        if entry is not None:
+            if entry[2] == month_day:
+                return
+            entry[3] = False
+
+        today = date.today()
+        entry = [today.toordinal() + days_to_birthdays_table(today)[month_day], name, month_day, True]
+        self._entries[name] = entry
+        heapq.heappush(self._heap, entry)
+        self._compact()
+
+    def rebuild(self, records: Iterable[RecordContact]) -> None:
+        """
+        The rebuild function schedules the birthdays of all the records with one heapify.
+        """
+        birthdays = ((record.user.name, record.user.birthday_date) for record in records)
+        self.load({name: (birthday.month, birthday.day) for name, birthday in birthdays if birthday is not None})
+
+    def remove(self, name: str) -> None:
+        """
+        The remove function removes a contact from the schedule.
+        """
+        entry = self._entries.pop(name, None)
+        if entry is not None:
+            entry[3] = False
+            self._compact()
+
+    def _compact(self) -> None:
+        """
+        The _compact function drops the invalid entries once they are the majority of the heap,
+        so the cost of a compaction is spread over the changes that made them.
+        """
+        if len(self._heap) > max(2 * len(self._entries), MIN_HEAP_COMPACTION):
+            self._heap = [entry for entry in self._heap if entry[3]]
+            heapq.heapify(self._heap)
+
+    def clear(self) -> None:
+        """
+        The clear function empties the schedule.
+        """
+        self._heap.clear()
+        self._entries.clear()
+        self._reminded.clear()
+
+    def dump(self) -> dict[str, tuple[int, int]]:
+        """
+        The dump function returns the birthday (month, day) of every contact; the dates of the next birthdays
+        depend on the day, so they are not dumped.
+        """
+        return {name: entry[2] for name, entry in self._entries.items()}
+
+    def load(self, state: Mapping[str, Sequence[int]]) -> None:
+        """
+        The load function rebuilds the schedule from the birthdays returned by dump, with one heapify.
+        The birthdays already reminded of are kept.
+        """
+        reminded, self._reminded = self._reminded, set()
+        self.clear()
+        self._reminded = reminded
+        today = date.today()
+        ordinal, table = today.toordinal(), days_to_birthdays_table(today)
+        for name, (month, day) in state.items():
+            self._entries[name] = [ordinal + table[(month, day)], name, (month, day), True]
+        self._heap = list(self._entries.values())
+        heapq.heapify(self._heap)
+
+    def _roll_forward(self, today: date) -> None:
+        """
+        The _roll_forward function drops the invalid entries from the top of the heap and moves
+        the birthdays that have passed to their next year.
+        """
+        heap, ordinal = self._heap, today.toordinal()
+        while heap and (not heap[0][3] or heap[0][0] < ordinal):
+            entry = heapq.heappop(heap)
+            self._reminded.discard((entry[1], entry[0]))
+            if entry[3]:
+                entry = [ordinal + days_to_birthdays_table(today)[entry[2]], entry[1], entry[2], True]
+                self._entries[entry[1]] = entry
+                heapq.heappush(heap, entry)
+
+    def _upcoming(self, today: date) -> Iterator[list]:
+        """
+        The _upcoming function yields the valid entries, the nearest first. The heap array is walked
+        best first, so the first k entries cost O(k log k) and the heap is not changed.
+        """
+        self._roll_forward(today)
+        heap = self._heap
+        frontier = [(heap[0][0], heap[0][1], 0)] if heap else []
+        while frontier:
+            position = heapq.heappop(frontier)[2]
+            if heap[position][3]:
+                yield heap[position]
+            for child in (2 * position + 1, 2 * position + 2):
+                if child < len(heap):
+                    heapq.heappush(frontier, (heap[child][0], heap[child][1], child))
+
+    def next_birthdays(self, k: int, today: date | None = None) -> list[tuple[date, str]]:
+        """
+        The next_birthdays function returns the (date, name) of the k nearest birthdays, from today on.
+        """
+        entries = islice(self._upcoming(today or date.today()), k)
+        return [(date.fromordinal(entry[0]), entry[1]) for entry in entries]
+
+    def due(self, days_ahead: int = 0, today: date | None = None) -> Iterator[tuple[date, str]]:
+        """
+        The due function yields the (date, name) of the birthdays from today to days_ahead days later,
+        the nearest first. Every birthday is yielded once: the next calls skip it until its next year.
+        """
+        today = today or date.today()
+        last = today.toordinal() + days_ahead
+        due = []
+        for entry in self._upcoming(today):
+            if entry[0] > last:
+                break
+            if (entry[1], entry[0]) not in self._reminded:
+                due.append((entry[1], entry[0]))
+
+        for name, ordinal in due:
+            self._reminded.add((name, ordinal))
+            yield date.fromordinal(ordinal), name
+
+    def remind(self, name: str, ordinal: int) -> bool:
+        """
+        The remind function notes that the birthday of the name on the date ordinal has been reminded of;
+        False when it had been already. due uses the same record, so a birthday is reminded of once.
+        """
+        if (name, ordinal) in self._reminded:
+            return False
+        self._reminded.add((name, ordinal))
+        return True
+
+
+class CreationIndex:
+    """
+    The (timestamp, number) pairs of the notes sorted by their time of creation, so the notes of a range of time
+    and the newest notes are found in O(log n + k); rebuilt when the book has changed otherwise (see generation).
+
+    Attributes:
+        generation (int | None): The generation of the notes book the index is up to date with.
+
+    Methods:
+        add(number, record): Adds a note.
+        remove(number, record): Removes a note.
+        rebuild(items): Rebuilds the index from the (number, record) items of a notes book.
+        between(start, end): Yields the numbers of the notes created from start up to end, the oldest first.
+        newest(): Yields the numbers of all the notes, the newest first.
+    """
+
+    def __init__(self) -> None:
+        # A note of an unknown time of creation gets UNKNOWN_CREATED, older than any time.
+        self._entries: list[tuple[float, int]] = []
+        self.generation: int | None = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, number: str, record: RecordNote) -> None:
+        insort(self._entries, (UNKNOWN_CREATED if record.created is None else record.created, int(number)))
+
+    def remove(self, number: str, record: RecordNote) -> None:
+        entry = (UNKNOWN_CREATED if record.created is None else record.created, int(number))
+        position = bisect_left(self._entries, entry)
+        if position < len(self._entries) and self._entries[position] == entry:
+            del self._entries[position]
+
+    def rebuild(self, items: Iterable[tuple[str, RecordNote]]) -> None:
+        """
+        The rebuild function sorts the (timestamp, number) pairs of the notes anew; the notes are mostly
+        in the order of their creation already, which the sort takes advantage of.
+        """
+        self._entries = sorted(
+            (UNKNOWN_CREATED if record.created is None else record.created, int(number)) for number, record in items
+        )
+
+    def between(self, start: int, end: int) -> Iterator[str]:
+        """
+        The between function yields the numbers of the notes created at start or later and before end
+        (Unix timestamps), the oldest first.
+        """
+        first, last = bisect_left(self._entries, (start,)), bisect_left(self._entries, (end,))
+        for _, number in self._entries[first:last]:
+            yield str(number)
+
+    def newest(self) -> Iterator[str]:
+        """
+        The newest function yields the numbers of the notes, the newest first and those of an unknown time
+        of creation last.
+        """
+        for _, number in reversed(self._entries):
+            yield str(number)
+
+
+def bitmap_of(numbers: Iterable[int]) -> int:
+    """
+    The bitmap_of function returns the bitmap (a Python int) with the bits of the numbers set, built in a bytearray.
+    """
+    numbers = list(numbers)
+    if not numbers:
+        return 0
+    bits = bytearray((max(numbers) >> 3) + 1)
+    for number in numbers:
+        bits[number >> 3] |= 1 << (number & 7)
+    return int.from_bytes(bits, "little")
+
+
+def bitmap_numbers(bitmap: int) -> Iterator[str]:
+    """
+    The bitmap_numbers function yields the numbers of the bits set in the bitmap, in ascending order, as the keys
+    of the notes; the bits are selected with itertools.compress.
+    """
+    bits = format(bitmap, "b")[::-1].encode().translate(BINARY_DIGITS)
+    return map(str, compress(range(len(bits)), bits))
+
+
+class TagIndex:
+    """
+    A bitmap (a Python int) of the notes of every tag, with the bit n set for the note number n, so tags are
+    combined by bitwise operators; rebuilt when the book has changed otherwise (see generation).
+
+    Attributes:
+        generation (int | None): The generation of the notes book the index is up to date with.
+        notes (int): The bitmap of all the notes, the complement a NOT is taken within.
+
+    Methods:
+        add(number, record): Adds a note.
+        remove(number, record): Removes a note.
+        retag(number, record, old_tags): Sets the tags of a note anew after they have changed from old_tags.
+        rebuild(items): Rebuilds the index from the (number, record) items of a notes book.
+        tagged(tag): Returns the bitmap of the notes with the tag.
+        counts(): Returns the number of notes of every tag.
+    """
+
+    def __init__(self) -> None:
+        self._bitmaps: dict[str, int] = {}
+        self.notes = 0
+        self.generation: int | None = None
+
+    def __len__(self) -> int:
+        return len(self._bitmaps)
+
+    def add(self, number: str, record: RecordNote) -> None:
+        bit = 1 << int(number)
+        self.notes |= bit
+        for tag in record.note.tags:
+            self._bitmaps[tag] = self._bitmaps.get(tag, 0) | bit
+
+    def remove(self, number: str, record: RecordNote) -> None:
+        self.notes &= ~(1 << int(number))
+        self._clear(number, record.note.tags)
+
+    def retag(self, number: str, record: RecordNote, old_tags: Iterable[str]) -> None:
+        """
+        The retag function clears the note from the bitmaps of its old tags and adds it again with its tags.
+        """
+        self._clear(number, old_tags)
+        self.add(number, record)
+
+    def _clear(self, number: str, tags: Iterable[str]) -> None:
+        """
+        The _clear function clears the note from the bitmaps of the tags, dropping the bitmaps left empty.
+        """
+        mask = ~(1 << int(number))
+        for tag in tags:
+            bitmap = self._bitmaps.get(tag, 0) & mask
+            if bitmap:
+                self._bitmaps[tag] = bitmap
+            else:
+                self._bitmaps.pop(tag, None)
+
+    def rebuild(self, items: Iterable[tuple[str, RecordNote]]) -> None:
+        """
+        The rebuild function gathers the numbers of the notes of every tag and builds each bitmap at once.
+        """
+        numbers: list[int] = []
+        tagged: dict[str, list[int]] = {}
+        for number, record in items:
+            numbers.append(int(number))
+            for tag in record.note.tags:
+                tagged.setdefault(tag, []).append(numbers[-1])
+        self.notes = bitmap_of(numbers)
+        self._bitmaps = {tag: bitmap_of(tag_numbers) for tag, tag_numbers in tagged.items()}
+
+    def tagged(self, tag: str) -> int:
+        """
+        The tagged function returns the bitmap of the notes with the (normalized) tag; 0 for an unknown tag.
+        """
+        return self._bitmaps.get(tag, 0)
+
+    def counts(self) -> dict[str, int]:
+        """
+        The counts function returns the number of notes of every tag, in the order of the tags.
+        """
+        return {tag: self._bitmaps[tag].bit_count() for tag in sorted(self._bitmaps)}
@@ -1,12 +1,38 @@
 """..."""
+import copy
 import locale
-import pickle
+import os
+import threading
 from abc import ABCMeta
 from abc import abstractmethod
 from collections import UserDict
+from contextlib import contextmanager
+from datetime import date
+from typing import Any
+from typing import BinaryIO
+from typing import Callable
+from typing import Iterable
+from typing import Iterator
+from typing import Self
 
+from my_address_book.blob_store import BLOB_SUFFIX
+from my_address_book.codec import DELTA_SUFFIX
+from my_address_book.codec import is_snapshot
+from my_address_book.codec import read_book_file
+from my_address_book.codec import read_delta
+from my_address_book.codec import write_delta
+from my_address_book.codec import write_snapshot
+from my_address_book.constants import SEARCH_CACHE_SIZE
+from my_address_book.constants import SNAPSHOT_DELTA_SHARE
 from my_address_book.records import RecordContact
 from my_address_book.records import RecordNote
+from my_address_book.search_cache import SearchCache
+from my_address_book.shards import ShardedStorage
+from my_address_book.shards import is_sharded
+from my_address_book.storage import atomic_write
+from my_address_book.storage import file_stamp
+from my_address_book.storage import locked_directory
+from my_address_book.storage import paused_gc
 
 
 class IBook(UserDict, metaclass=ABCMeta):
@@ -24,6 +50,10 @@ class IBook(UserDict, metaclass=ABCMeta):
     def sort_book(self) -> None:
         pass
 
+    @abstractmethod
+    def search(self, criteria: str) -> Self:
+        pass
+
     @abstractmethod
     def save_records_to_file(self, file_name: str) -> None:
         pass
@@ -33,55 +63,472 @@ class IBook(UserDict, metaclass=ABCMeta):
         pass
 
 
+class _Batch:
+    """
+    The state of an open batch of changes of a book: what is needed to roll it back and the work left for the commit.
+    """
+
+    def __init__(self, book: "Book"):
+        self.data = dict(book.data)
+        self.generation = book.generation
+        self.records: dict[int, tuple[Any, dict]] = {}
+        self.save_file_names: list[str] = []
+        self.sort = False
+
+
 class Book(IBook):
     """
     This class represents an address book.
 
+    Every change of the book increases its generation. Search results are kept in an LRU cache keyed by
+    the criteria and the generation, so a repeated search is answered from the cache until the book changes.
+    The results are shared between the callers and must not be changed.
+
+    Changes made in 'with book.batch():' are one transaction: sorting (and, in the address book, updating
+    the indexes) is done once when the batch ends, and the book is saved once; an exception rolls all
+    of them back.
+
+    A book saved to a directory is kept in shards (see the shards module): the keys of the changed records are
+    tracked, so a save rewrites only the shards holding them, and the shards saved by another process
+    are merged into the book by reload_changed. A book file gets a differential snapshot of the changed records
+    while they are few (see write_book_file). The records changed in place are found by their dirty flags
+    (see RecordContact.mark_dirty).
+
+    Attributes:
+        generation (int): The number of changes of the book, increased by every change.
+        changed_keys (set[str] | None): The keys of the records changed since the book was loaded from or saved to
+            shards_directory, or since the full snapshot of snapshot_file; None when they are not known
+            and the whole book is taken as changed.
+        added_keys (set[str]): The keys the book has given to new records since it was loaded from or saved to
+            shards_directory; the notes book numbers its notes, so another process may give a number to another note.
+        shards_directory (str | None): The directory of shards the book was last loaded from or saved to.
+        shard_files (list[str | None] | None): The shard files of shards_directory the book holds the records of;
+            None for a shard also saved by another process, to be read again by reload_changed.
+        saved_generation (int | None): The generation of the book last saved to or read from a file.
+        snapshot_file (str | None): The book file whose full snapshot the book was last read from or saved to.
+        snapshot_base (str | None): The stamp of that full snapshot (see storage.file_stamp).
+        search_cache (SearchCache): The cache of search results, with its hits and misses counters.
+        snapshot_kind (int): The kind of records in the snapshot files of the book (codec.CONTACTS or codec.NOTES).
+
     Methods:
         get_record(name: str) -> RecordNote | Record:
             Returns the contact record for the given name.
-        delete_record(record_name: str | int) -> None:
+        mark_changed(*keys: str) -> None:
+            Increases the generation of the book after a change and notes the keys of the changed records.
+        mark_all_changed() -> None:
+            Increases the generation of the book after a change of an unknown set of records.
+        mark_added(key: str) -> None:
+            Increases the generation of the book after a record is added under a key given by the book.
+        take_changes() -> tuple[set[str] | None, set[str]]:
+            Returns the keys changed and added since the last save, for a save to write them.
+        restore_changes(changed_keys: set[str] | None, added_keys: set[str]) -> None:
+            Gives back the keys taken by a save that has not written them.
+        batch(save_file_name: str | None) -> ContextManager['Book']:
+            Groups changes into one transaction, sorted and saved once and rolled back on an exception.
+        search(criteria: str) -> 'Book':
+            Returns the records matching the criteria, from the cache when the book has not changed.
+        delete_record(record_name: str) -> None:
             Removes a contact record from the book.
         sort_book() -> None:
             Sorts the address book by name.
         save_records_to_file(file_name: str) -> None:
-            Saves the data in the address book to a binary file using pickle.
+            Saves the data in the address book to a binary snapshot file, replacing the file atomically,
+            or to the changed shards of a directory.
+        write_records(file: BinaryIO) -> None:
+            Writes the data in the book to an open binary file.
+        write_book_file(file_name: str, before_commit: Callable[[], None] | None = None) -> bool:
+            Writes a differential or a full snapshot of the book to a book file.
+        free_key(taken: set[str]) -> str | None:
+            Returns a free key for a record another process has saved under a key the book has also added.
+        collect_dirty_records() -> None:
+            Notes the keys of the records changed in place for the next save.
+        prepare_snapshot(blob_file: str) -> None:
+            Saves the values kept out of the snapshots to the blob file before a save; the notes book saves long notes.
+        compact_blob_file(blob_file: str, new_file: str) -> bool:
+            Rewrites the values kept in the blob file to a new one when most of it is no longer used.
         read_records_from_file(file_name: str) -> None:
-            Reads data from a binary file using pickle and updates the address book.
+            Reads data from a binary snapshot file or from a directory of shards
+            and updates the address book.
+        update_records(items: Iterable[tuple[str, Any]]) -> None:
+            Puts the records read from a file into the book.
+        reload_changed(file_name: str) -> int:
+            Reads the shards another process has saved to the directory since the book was loaded or saved.
+        merge_records(stale_keys: Iterable[str], items: Iterable[tuple[str, Any]]) -> None:
+            Replaces records of the book by the records saved by another process.
     """
 
+    snapshot_kind: int
+
+    def __init__(self, *args, **kwargs) -> None:
+        self.generation = 0
+        self.changed_keys: set[str] | None = None
+        self.added_keys: set[str] = set()
+        self.shards_directory: str | None = None
+        self.shard_files: list[str | None] | None = None
+        self.snapshot_file: str | None = None
+        self.snapshot_base: str | None = None
+        self.saved_generation: int | None = None
+        self.search_cache = SearchCache(SEARCH_CACHE_SIZE)
+        self._batch: _Batch | None = None
+        # The keys to save are changed by the application and taken by a save, maybe in another thread (see the autosave module).
+        self._changes_lock = threading.Lock()
+        super().__init__(*args, **kwargs)
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state.pop("_changes_lock", None)
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._changes_lock = threading.Lock()
+
+    def __setitem__(self, key: str, item: Any) -> None:
+        super().__setitem__(key, item)
+        self.mark_changed(key)
+
+    def __delitem__(self, key: str) -> None:
+        super().__delitem__(key)
+        self.mark_changed(key)
+
+    def mark_changed(self, *keys: str) -> None:
+        """
+        The mark_changed function increases the generation of the book after a change,
+        so the cached search results of the previous generation are not used any more.
+        The keys of the records added, changed or deleted are noted for the next save of the shards;
+        a change without keys (sorting, indexing) changes no record.
+        """
+        with self._changes_lock:
+            self.generation += 1
+            if self.changed_keys is not None:
+                self.changed_keys.update(keys)
+
+    def mark_all_changed(self) -> None:
+        """
+        The mark_all_changed function increases the generation of the book after a change of records
+        that are not known one by one (e.g. renumbering); the next save of the shards rewrites them all.
+        """
+        with self._changes_lock:
+            self.generation += 1
+            self.changed_keys = None
+
+    def mark_added(self, key: str) -> None:
+        """
+        The mark_added function marks the record added under a key the book has given to it (see added_keys) changed.
+        """
+        with self._changes_lock:
+            self.generation += 1
+            self.added_keys.add(key)
+            if self.changed_keys is not None:
+                self.changed_keys.add(key)
+
+    def take_changes(self) -> tuple[set[str] | None, set[str]]:
+        """
+        The take_changes function notes the records changed in place (see collect_dirty_records) and returns
+        the keys changed and added since the last save, which the changes made during the save start again.
+        """
+        with self._changes_lock:
+            self.collect_dirty_records()
+            changed_keys, self.changed_keys = self.changed_keys, set()
+            added_keys, self.added_keys = self.added_keys, set()
+        return changed_keys, added_keys
+
+    def restore_changes(self, changed_keys: set[str] | None, added_keys: set[str]) -> None:
+        """
+        The restore_changes function gives back the keys taken by take_changes to a save that has not written them,
+        joined with the keys changed during the save.
+        """
+        with self._changes_lock:
+            self.changed_keys = None if changed_keys is None or self.changed_keys is None else changed_keys | self.changed_keys
+            self.added_keys |= added_keys
+
+    @contextmanager
+    def batch(self, save_file_name: str | None = None) -> Iterator[Self]:
+        """
+        The batch function groups the changes made in the with block into one transaction.
+        Sorting is done once when the block ends, and the book is saved once to save_file_name if it has changed,
+        so n changes cost one O(n log n) sort and one save. An exception in the block restores the records,
+        including the contacts and notes changed in place, and the book is not saved.
+        A batch opened inside another one joins it: the outer batch commits or rolls back all the changes.
+        """
+        if self._batch is not None:
+            if save_file_name and save_file_name not in self._batch.save_file_names:
+                self._batch.save_file_names.append(save_file_name)
+            yield self
+            return
+
+        batch = self._batch = _Batch(self)
+        if save_file_name:
+            batch.save_file_names.append(save_file_name)
+        try:
+            yield self
+        except BaseException:
+            self._batch = None
+            self._rollback_batch(batch)
+            raise
+
+        self._batch = None
+        self._commit_batch(batch)
+        if self.generation != batch.generation:
+            for file_name in batch.save_file_names:
+                self.save_records_to_file(file_name)
+
+    def _commit_batch(self, batch: _Batch) -> None:
+        """
+        The _commit_batch function does the work deferred to the end of a batch.
+        """
+        if batch.sort:
+            self.sort_book()
+
+    def _rollback_batch(self, batch: _Batch) -> None:
+        """
+        The _rollback_batch function restores the records of the book as they were when the batch began.
+        """
+        self.data = batch.data
+        for record, state in batch.records.values():
+            vars(record).clear()
+            vars(record).update(state)
+            record.own_entities()
+        self.mark_changed()
+
+    def journal_record(self, record: RecordContact | RecordNote) -> None:
+        """
+        The journal_record function is called by a record of the book before it changes in place:
+        in a batch, the state of the record before its first change is kept to roll the batch back.
+        """
+        if self._batch is not None and id(record) not in self._batch.records:
+            state = {name: value for name, value in vars(record).items() if name != "_book"}
+            self._batch.records[id(record)] = (record, copy.deepcopy(state))
+
     def get_record(self, name: str) -> RecordContact | RecordNote:
         """
         Returns the contact record for the given name.
         """
         return self.data[name]
 
-    def delete_record(self, record_name: str | int) -> None:
+    def delete_record(self, record_name: str) -> None:
         """
         Removes a contact record from the book.
         """
         del self.data[record_name]
+        self.mark_changed(record_name)
 
     def sort_book(self) -> None:
         """
-        The sort_addressbook function sorts the address book by name.
+        The sort_addressbook function sorts the address book by name. In a batch, the book is sorted once at its end.
         """
+        if self._batch is not None:
+            self._batch.sort = True
+            return
         self.data = dict(sorted(self.data.items(), key=lambda x: locale.strxfrm(x[0])))
+        self.mark_changed()
+
+    def search(self, criteria: str) -> Self:
+        """
+        The search function returns the records matching the criteria. The results are cached by the criteria,
+        the generation of the book and the day (searches by birthday depend on the date).
+        """
+        key = (self._normalize_criteria(criteria), self.generation, date.today())
+        result = self.search_cache.get(key)
+        if result is None:
+            result = self._search(criteria)
+            self.search_cache.put(key, result)
+        return result
+
+    def _normalize_criteria(self, criteria: str) -> str:
+        """
+        The _normalize_criteria function returns the form of the criteria the cache is keyed by;
+        criteria giving the same results should have the same form.
+        """
+        return criteria
+
+    @abstractmethod
+    def _search(self, criteria: str) -> Self:
+        pass
+
+    @property
+    def in_batch(self) -> bool:
+        """
+        Tells if a batch of changes is open; its changes may still be rolled back.
+        """
+        return self._batch is not None
 
     def save_records_to_file(self, file_name: str) -> None:
         """
-        Save the data in the address book to a binary file using pickle.
+        Save the data in the address book to a binary snapshot file (see the codec module). The file is replaced
+        atomically, so it always holds a complete snapshot of the book (see the storage module), with the directory
+        locked against the saves of other processes. A directory (see shards.is_sharded) gets only the shards
+        of the records changed since the last save, and a book file only a differential snapshot while few records
+        have changed (see write_book_file).
+        """
+        generation = self.generation
+        if is_sharded(file_name):
+            ShardedStorage(file_name).save(self)
+        else:
+            with locked_directory(os.path.dirname(os.path.abspath(file_name))):
+                self.write_book_file(file_name)
+        self.saved_generation = generation
+
+    def free_key(self, taken: set[str]) -> str | None:
+        """
+        The free_key function returns a key, not in taken, for a record another process has saved under a key
+        the book has also added (see added_keys); None when the records are keyed by a field of theirs.
+        """
+        return None
+
+    def collect_dirty_records(self) -> None:
+        """
+        The collect_dirty_records function notes the keys of the records changed in place (see RecordContact.mark_dirty)
+        as changed for the next save and marks the records clean.
+        """
+        for key, record in self.data.items():
+            if record.dirty:
+                record.dirty = False
+                if self.changed_keys is not None:
+                    self.changed_keys.add(key)
+
+    def write_book_file(self, file_name: str, before_commit: Callable[[], None] | None = None) -> bool:
+        """
+        The write_book_file function writes the book to a book file. While the records changed since the full
+        snapshot in the file are at most SNAPSHOT_DELTA_SHARE of the book, only they are written, to the differential
+        snapshot next to it (see codec.write_delta); otherwise the full snapshot is written and the differential one
+        removed. before_commit is called before the written file replaces the old one; it may raise to keep the old one.
+        Returns True for a differential snapshot.
         """
-        with open(file_name, "wb") as file:
-            pickle.dump(self.data, file)
+        self.prepare_snapshot(os.path.abspath(file_name) + BLOB_SUFFIX)
+        changed_keys, added_keys = self.take_changes()
+        base = self.snapshot_base if self.snapshot_file == os.path.abspath(file_name) else None
+        try:
+            if (
+                base is not None
+                and changed_keys is not None
+                and len(changed_keys) <= len(self.data) * SNAPSHOT_DELTA_SHARE
+                and file_stamp(file_name) == base
+            ):
+                items = [(key, record) for key in changed_keys if (record := self.data.get(key)) is not None]
+                with atomic_write(file_name + DELTA_SUFFIX) as file:
+                    write_delta(file, self.snapshot_kind, base, items, (key for key in changed_keys if key not in self.data))
+                    if before_commit is not None:
+                        before_commit()
+                # The next differential snapshot holds these changes too: it replaces this one.
+                self.restore_changes(changed_keys, set())
+                return True
+            with atomic_write(file_name) as file:
+                self.write_records(file)
+                if before_commit is not None:
+                    before_commit()
+        except BaseException:
+            self.restore_changes(changed_keys, added_keys)
+            raise
+        try:
+            os.remove(file_name + DELTA_SUFFIX)
+        except FileNotFoundError:
+            pass
+        self.snapshot_file, self.snapshot_base = os.path.abspath(file_name), file_stamp(file_name)
+        self.shards_directory = self.shard_files = None
+        return False
+
+    def prepare_snapshot(self, blob_file: str) -> None:
+        """
+        The prepare_snapshot function is called under the lock of the storage before the book is saved,
+        to append the values kept out of its snapshots to the blob file of the book (see the blob_store module).
+        A book keeps everything in its snapshots by default.
+        """
+
+    def compact_blob_file(self, blob_file: str, new_file: str) -> bool:
+        """
+        The compact_blob_file function is called under the lock of the storage before a full save, to rewrite
+        the values of the book kept in blob_file to new_file when most of blob_file is no longer used.
+        Returns True if it did; a book keeps everything in its snapshots by default.
+        """
+        return False
+
+    def write_records(self, file: BinaryIO) -> None:
+        """
+        Writes the data of the book to an open binary file as a snapshot.
+        """
+        write_snapshot(file, self.snapshot_kind, self.data.items())
 
     def read_records_from_file(self, file_name: str) -> None:
         """
-        Read data from a binary file using pickle and update the address book.
+        Read data from a binary snapshot file and update the address book. Files saved with pickle
+        before the snapshot format raise codec.SnapshotError until they are converted
+        with 'python -m my_address_book convert'. A directory is read shard by shard
+        (see shards.ShardedStorage.load).
+        """
+        if is_sharded(file_name):
+            ShardedStorage(file_name).load(self)
+        else:
+            empty = not self.data
+            try:
+                with open(file_name, "rb") as file:
+                    snapshot = is_snapshot(file)
+                    self.update_records(read_book_file(file, self.snapshot_kind, os.path.abspath(file_name) + BLOB_SUFFIX))
+            except FileNotFoundError as error:
+                raise FileNotFoundError(f"File not found {file_name}") from error
+            self.snapshot_file = self.snapshot_base = None
+            if snapshot and empty:
+                self.snapshot_file, self.snapshot_base = os.path.abspath(file_name), file_stamp(file_name)
+                self.changed_keys = set()
+                self._read_delta(file_name)
+        self.saved_generation = self.generation
+
+    def _read_delta(self, file_name: str) -> None:
+        """
+        The _read_delta function applies the differential snapshot of the book file, if there is one written
+        for the full snapshot read. Its changes stay noted as changed, so the next differential snapshot keeps them.
         """
         try:
-            with open(file_name, "rb") as file:
-                content = pickle.load(file)
-                self.data.update(content)
-        except FileNotFoundError as error:
-            raise FileNotFoundError(f"File not found {file_name}") from error
+            with open(file_name + DELTA_SUFFIX, "rb") as file:
+                base, deleted, items = read_delta(file, self.snapshot_kind, os.path.abspath(file_name) + BLOB_SUFFIX)
+                if base != self.snapshot_base:
+                    return
+                with paused_gc():
+                    records = dict(items)
+        except FileNotFoundError:
+            return
+        for key in deleted:
+            self.data.pop(key, None)
+        new_keys = records.keys() - self.data.keys()
+        with paused_gc():
+            self.data.update(records)
+        if new_keys:
+            self.sort_book()
+        self.changed_keys = set(deleted) | records.keys()
+
+    def reload_changed(self, file_name: str) -> int:
+        """
+        The reload_changed function reads into the book the shards another process has saved to the directory
+        file_name since the book was loaded from or saved to it, keeping the changes not saved yet, and returns
+        their number (see shards.ShardedStorage.refresh). A book file is not reloaded: 0.
+        """
+        if not is_sharded(file_name):
+            return 0
+        return ShardedStorage(file_name).refresh(self)
+
+    def merge_records(self, stale_keys: Iterable[str], items: Iterable[tuple[str, Any]]) -> None:
+        """
+        The merge_records function replaces the records with the stale keys by the (key, record) items saved
+        by another process. They are not changes of this book, so they are not noted for the next save;
+        the book is sorted again only when it gets new keys.
+        """
+        records = dict(items)
+        new_keys = records.keys() - self.data.keys()
+        for key in stale_keys:
+            if key not in records:
+                self.data.pop(key, None)
+        with paused_gc():
+            self.data.update(records)
+        if new_keys:
+            self.sort_book()
+        self.mark_changed()
+
+    def update_records(self, items: Iterable[tuple[str, Any]]) -> None:
+        """
+        The update_records function puts the (key, record) items read from a file into the book,
+        with the garbage collector paused. Which records differ from the shards saved before is not known
+        any more, so the next save of the shards rewrites them all.
+        """
+        with paused_gc():
+            self.data.update(items)
+        self.mark_all_changed()
@@ -8,7 +8,10 @@ Classes:
 import npyscreen
 
 from my_address_book.address_book import AddressBook as AB
+from my_address_book.constants import LETTERS
+from my_address_book.constants import NUMBER_OF_CONTACTS_PER_PAGE
 from my_address_book.interface_main_form import MainForm
+from my_address_book.query import QueryError
 from my_address_book.utils import print_all_contacts
 
 
@@ -26,7 +29,9 @@ class MainFormAB(MainForm):
         delete_contact: Allows the user to delete a contact from the address book.
         while_editing: Called when editing the search criteria, performs search and updates the contact list.
         search_contact:
-        beforeEditing: Called before the form is displayed, updates the list of contacts.
+        beforeEditing: Called before the form is displayed, updates the list of contacts and reminds of birthdays.
+        remind_birthdays: Shows the birthdays of today that have not been shown yet.
+        show_birthdays: Lists the nearest birthdays.
         update_list: Updates the list of contacts in the address book to reflect any changes.
     """
 
@@ -45,6 +50,7 @@ class MainFormAB(MainForm):
         self.menu.addItem("Delete contact", self.delete_contact, "3")
         self.menu.addItem("Notesbook", self.to_notesbook_fotm, "4")
         self.menu.addItem("Sorting files", self.to_sorting_files_fotm, "5")
+        self.menu.addItem("Birthdays", self.show_birthdays, "6")
         self.menu.addItem("Close Menu", self.close_menu, "^X")
         self.menu.addItem("Exit", self.exit, "^E")
 
@@ -58,11 +64,18 @@ class MainFormAB(MainForm):
         It takes two arguments: self and addressbook. The first argument, self, is an instance of the MainForm class
         that contains all of the widgets on our form. The second argument, addressbook, is an instance of AddressBook
         class that contains all contacts from our database.
+        When nothing is found for a name, the closest names are shown, so a typo still finds the contact.
+        While a query is incomplete (e.g. 'name:'), the list is left as it is.
         """
 
         if self.search_widget.value:
             criteria = self.search_widget.value
-            searched_contacts = addressbook.search(criteria)
+            try:
+                searched_contacts = addressbook.search(criteria)
+            except QueryError:
+                return
+            if not searched_contacts and not criteria.strip(LETTERS):
+                searched_contacts = addressbook.fuzzy_search(criteria)
             self.update_list(searched_contacts)
         else:
             self.update_list(addressbook)
@@ -70,10 +83,27 @@ class MainFormAB(MainForm):
     def beforeEditing(self) -> None:
         """
         The beforeEditing function is called before the form is displayed.
-        It updates the list of contacts to be displayed in the form.
+        It merges the contacts saved by another instance of the application and updates the list
+        of contacts to be displayed in the form.
         """
+        self.parentApp.reload_changed()
         addressbook = self.parentApp.addressbook
         self.update_list(addressbook)
+        self.remind_birthdays(addressbook)
+
+    def remind_birthdays(self, addressbook: AB) -> None:
+        """
+        The remind_birthdays function shows the birthdays of today that have not been shown yet.
+        """
+        reminders = [record.user.name for _, record in addressbook.birthday_reminders()]
+        if reminders:
+            npyscreen.notify_confirm("Today is the birthday of " + ", ".join(reminders), "Birthdays", editw=1)
+
+    def show_birthdays(self) -> None:
+        """
+        The show_birthdays function lists the nearest birthdays in the contact list.
+        """
+        self.update_list(self.parentApp.addressbook.next_birthdays(NUMBER_OF_CONTACTS_PER_PAGE))
 
     def update_list(self, addressbook: AB) -> None:
         """
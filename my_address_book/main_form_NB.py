@@ -2,6 +2,7 @@ import npyscreen
 
 from my_address_book.interface_main_form import MainForm
 from my_address_book.notes_book import NotesBook as NB
+from my_address_book.query import QueryError
 from my_address_book.utils import print_all_notes
 
 
@@ -57,11 +58,15 @@ class MainFormNB(MainForm):
         The second argument, notesbook, is a reference to an instance of NotesBook class.
         This function uses criteria_validation function from criteria_validation module
         to validate user input before searching for it in the NotesBook instance.
+        While a tag query is incomplete (e.g. '#work AND'), the list is left as it is.
         """
 
         if self.search_widget.value:
             criteria = self.search_widget.value
-            searched_notes = notesbook.search(criteria)
+            try:
+                searched_notes = notesbook.search(criteria)
+            except QueryError:
+                return
             self.update_list(searched_notes)
         else:
             self.update_list(notesbook)
@@ -70,7 +75,9 @@ class MainFormNB(MainForm):
         """
         The beforeEditing function is called before the form is displayed.
         It allows you to set up the form, and populate it with data from your application.
+        The notes saved by another instance of the application are merged first.
         """
+        self.parentApp.reload_changed()
 
         notessbook = self.parentApp.notesbook
         self.update_list(notessbook)
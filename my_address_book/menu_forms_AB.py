@@ -138,10 +138,10 @@ class DeleteContactForm(npyscreen.ActionPopup):
     def delete_contact(self) -> str:
         """
         The delete_contact function is called when the user presses the 'Delete Contact' button.
-        It deletes a contact from the address book, and saves it to file.
+        It deletes a contact from the address book and marks the book to be saved in the background.
         """
         self.parentApp.addressbook.delete_record(self.contact_name_for_del.value)
-        self.parentApp.addressbook.save_records_to_file(FILE_AB)
+        self.parentApp.autosave.mark_dirty(self.parentApp.addressbook, FILE_AB)
         return f"The contact '{self.contact_name_for_del.value}' has been deleted."
 
     def on_ok(self) -> None:
@@ -448,7 +448,7 @@ class AddContactForm(npyscreen.ActionForm):
         contact.add_birthday(self.contact_birth.value)
 
         self.parentApp.addressbook.add_record(contact)
-        self.parentApp.addressbook.save_records_to_file(FILE_AB)
+        self.parentApp.autosave.mark_dirty(self.parentApp.addressbook, FILE_AB)
         return f"The contact '{self.contact_name.value}' has been added"
 
     def _add_phone_numbers(self, contact: RecordContact):
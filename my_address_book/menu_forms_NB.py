@@ -4,8 +4,11 @@ import npyscreen
 from my_address_book.constants import FILE_NB
 from my_address_book.entities import Note
 from my_address_book.records import RecordNote
+from my_address_book.utils import format_tags
 from my_address_book.validation import check_number_not_in_notes_book
 from my_address_book.validation import note_validation
+from my_address_book.validation import split_tags
+from my_address_book.validation import tags_validation
 
 
 class EditNoteForm(npyscreen.ActionPopup):
@@ -132,7 +135,7 @@ class DeleteNoteForm(npyscreen.ActionPopup):
         """
 
         self.parentApp.notesbook.delete_record(self.number_note_for_del.value)
-        self.parentApp.notesbook.save_records_to_file(FILE_NB)
+        self.parentApp.autosave.mark_dirty(self.parentApp.notesbook, FILE_NB)
         return f"The note '{self.number_note_for_del.value}' has been deleted."
 
     def on_ok(self) -> None:
@@ -165,6 +168,7 @@ class AddNoteForm(npyscreen.ActionForm):
     Attributes:
         value (str): The value of the note being added or edited.
         wg_note_name (npyscreen.TitleText): The widget for entering the name of the note.
+        wg_tags (npyscreen.TitleText): The widget for entering the tags of the note, separated by spaces or commas.
         wg_note (npyscreen.MultiLineEdit): The widget for entering the content of the note.
 
     Methods:
@@ -188,6 +192,7 @@ class AddNoteForm(npyscreen.ActionForm):
 
         self.value = None
         self.wg_note_name: npyscreen.TitleText = self.add(npyscreen.TitleText, name="Note name:")
+        self.wg_tags: npyscreen.TitleText = self.add(npyscreen.TitleText, name="Tags:")
         self.wg_name: npyscreen.TitleFixedText = self.add(npyscreen.TitleFixedText, name="Note:", editable=False)
         self.wg_note: npyscreen.MultiLineEdit = self.add(npyscreen.MultiLineEdit)
 
@@ -197,12 +202,14 @@ class AddNoteForm(npyscreen.ActionForm):
         It allows you to set up the values of widgets on your form, based on
         the state of your application or user input.  It also allows you to
         change which widgets are available for editing, and how they behave.
+        A long note saved out of line is read from the blob file here, when it is opened (see Note.note).
         """
 
         if self.value:
             record_note: RecordNote = self.parentApp.notesbook.get_record(self.value)
 
             self.wg_note_name.value = record_note.note.name_note
+            self.wg_tags.value = format_tags(record_note.note.tags)
             self.wg_note.value = record_note.note.note
 
     def after_editing(self) -> None:
@@ -216,6 +223,7 @@ class AddNoteForm(npyscreen.ActionForm):
 
         self.value = None
         self.wg_note_name.value = None
+        self.wg_tags.value = ""
         self.wg_note.value = ""
 
         self.parentApp.getForm("ADD NOTE").name = "Add note"
@@ -233,6 +241,11 @@ class AddNoteForm(npyscreen.ActionForm):
             npyscreen.notify_confirm(message_error, "Error", editw=1)
             self.wg_note.value = ""
             return False
+
+        message_error = tags_validation(self.wg_tags.value or "")
+        if message_error:
+            npyscreen.notify_confirm(message_error, "Error", editw=1)
+            return False
         return True
 
     def add_note(self) -> str:
@@ -247,9 +260,11 @@ class AddNoteForm(npyscreen.ActionForm):
 
         if self.wg_note_name.value:
             record_note.add_note_name(self.wg_note_name.value)
+        if self.wg_tags.value:
+            record_note.add_tags(*split_tags(self.wg_tags.value))
 
         self.parentApp.notesbook.add_record(record_note)
-        self.parentApp.notesbook.save_records_to_file(FILE_NB)
+        self.parentApp.autosave.mark_dirty(self.parentApp.notesbook, FILE_NB)
         return "The note has been added"
 
     def change_note(self) -> str:
@@ -1,10 +1,30 @@
 """
 ...
 """
+import os
 import re
+from datetime import date
+from datetime import datetime
+from datetime import time
+from datetime import timedelta
+from itertools import islice
+from typing import Any
+from typing import Iterable
 
+from my_address_book.blob_store import BLOB_MAGIC
+from my_address_book.blob_store import BlobWriter
+from my_address_book.blob_store import read_blobs
+from my_address_book.codec import NOTES
+from my_address_book.constants import DATE_FORMAT
+from my_address_book.constants import NOTE_BLOB_LIVE_SHARE
+from my_address_book.constants import NOTE_INLINE_SIZE
 from my_address_book.constants import PUNCTUATION
+from my_address_book.indexes import CreationIndex
+from my_address_book.indexes import TagIndex
 from my_address_book.interface_book import Book
+from my_address_book.interface_book import _Batch
+from my_address_book.query import compile_tag_query
+from my_address_book.query import is_tag_query
 from my_address_book.records import RecordNote
 
 
@@ -12,41 +32,340 @@ class NotesBook(Book):
     """
     A class that represents a notes book containing note records.
 
+    The notes are indexed by their time of creation (see indexes.CreationIndex), so the notes of a range of days
+    and the newest notes are found without scanning the book; the search box takes 'created:DD-MM-YYYY',
+    'created:DD-MM-YYYY..DD-MM-YYYY' (either day may be left out) and 'last:N' for them.
+
+    The tags of the notes are indexed by a bitmap per tag (see indexes.TagIndex), so a search with tags
+    ('#work AND #urgent NOT #done meeting', see the query module) combines the tags by bitwise operations
+    and checks the words only against the notes the tags leave. A note of the book tells the book about
+    its changes (see RecordNote.mark_dirty), which keeps the index and the search cache up to date.
+
     Methods:
         add_record(record: 'RecordNote') -> None:
             Adds a new note record to the notes book.
         search(criteria: str) -> Union[str, 'NotesBook']:
             Performs a search for notes based on the given criteria.
+        sort_book() -> None:
+            Sorts the notes by their numbers.
         note_number() -> str:
             Generates a new note number for adding a note to the book.
         re_numbering() -> None:
             Re-numbers the note records in the book to ensure sequential numbering.
+        prepare_snapshot(blob_file: str) -> None:
+            Saves the long notes out of line before the book is saved.
+        compact_blob_file(blob_file: str, new_file: str) -> bool:
+            Rewrites the long notes to a new blob file when most of the old one is no longer used.
+        created_between(first: date | None, last: date | None) -> NotesBook:
+            Returns the notes created from the day first to the day last, the oldest first.
+        created_in_last_days(days: int) -> NotesBook:
+            Returns the notes created today and in the days - 1 days before, the oldest first.
+        newest_first(count: int | None = None) -> NotesBook:
+            Returns the newest notes, the newest first.
+        tag_note(number: str, *tags: str) -> None:
+            Adds tags to a note of the book.
+        untag_note(number: str, *tags: str) -> None:
+            Removes tags from a note of the book.
+        tag_counts() -> dict[str, int]:
+            Returns the number of notes of every tag.
     """
 
+    snapshot_kind = NOTES
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._creation_index = CreationIndex()
+        self._tag_index = TagIndex()
+
+    def _indexes_in_step(self) -> list[CreationIndex | TagIndex]:
+        """
+        Returns the indexes up to date with the book, which a change of a known note keeps up to date.
+        """
+        return [index for index in (self._creation_index, self._tag_index) if index.generation == self.generation]
+
     def add_record(self, record: "RecordNote") -> None:
         """
         Adds a new note record to the notes book.
         """
         note_num: str = self._note_number()
+        indexes = self._indexes_in_step()
         self.data[note_num] = record
+        record._book = self
+        self.mark_added(note_num)
+        for index in indexes:
+            index.add(note_num, record)
+            index.generation = self.generation
 
-    def search(self, criteria: str) -> "NotesBook":
-        search_notes = NotesBook()
+    def delete_record(self, record_name: str) -> None:
+        """
+        Removes a note record from the notes book.
+        """
+        record, indexes = self.data[record_name], self._indexes_in_step()
+        super().delete_record(record_name)
+        if record._book is self:
+            record._book = None
+        for index in indexes:
+            index.remove(record_name, record)
+            index.generation = self.generation
+
+    def tag_note(self, number: str, *tags: str) -> None:
+        """
+        The tag_note function adds the tags, with or without '#', to the note with the number
+        and updates the tag index.
+        """
+        self.data[number].add_tags(*tags)
+
+    def untag_note(self, number: str, *tags: str) -> None:
+        """
+        The untag_note function removes the tags from the note with the number and updates the tag index.
+        """
+        self.data[number].remove_tags(*tags)
+
+    def reindex_record(self, record: "RecordNote", old_tags: tuple[str, ...] | None = None) -> None:
+        """
+        Notes the change of a note of the book changed in place, and updates the tag index when its tags
+        have changed from old_tags. The notes are not keyed by a field of theirs, so the number of the note is looked up.
+        """
+        number = next((number for number, note in self.data.items() if note is record), None)
+        if number is None:
+            return
+        indexes = self._indexes_in_step()
+        self.mark_changed(number)
+        if old_tags is not None and self._tag_index in indexes:
+            self._tag_index.retag(number, record, old_tags)
+        for index in indexes:
+            index.generation = self.generation
+
+    def read_records_from_file(self, file_name: str) -> None:
+        """
+        Reads the notes from a file (or a directory of shards), see Book.read_records_from_file.
+        """
+        super().read_records_from_file(file_name)
+        self._own_records()
+
+    def merge_records(self, stale_keys: Iterable[str], items: Iterable[tuple[str, Any]]) -> None:
+        """
+        Replaces notes of the book by the notes saved by another process (see Book.merge_records).
+        """
+        super().merge_records(stale_keys, items)
+        self._own_records()
+
+    def _rollback_batch(self, batch: _Batch) -> None:
+        """
+        Restores the notes as they were when the batch began; the notes added in the batch are released.
+        """
+        for record in self.data.values():
+            record._book = None
+        super()._rollback_batch(batch)
+        self._own_records()
+
+    def _own_records(self) -> None:
+        """
+        Makes the book the owner of its records, so their changes are reported to it.
+        """
+        for record in self.data.values():
+            record._book = self
+
+    @property
+    def creation_index(self) -> CreationIndex:
+        """
+        The creation_index function returns the index of the times of creation of the notes. It is rebuilt first
+        when the book has changed otherwise than by add_record and delete_record (e.g. renumbered or read)
+        since it was last brought up to date.
+        """
+        if self._creation_index.generation != self.generation:
+            self._creation_index.rebuild(self.data.items())
+            self._creation_index.generation = self.generation
+        return self._creation_index
+
+    @property
+    def tag_index(self) -> TagIndex:
+        """
+        The tag_index function returns the index of the tags of the notes. It is rebuilt first when the book
+        has changed otherwise than by add_record, delete_record and the changes of its notes since it was last
+        brought up to date.
+        """
+        if self._tag_index.generation != self.generation:
+            self._tag_index.rebuild(self.data.items())
+            self._tag_index.generation = self.generation
+        return self._tag_index
+
+    def tag_counts(self) -> dict[str, int]:
+        """
+        The tag_counts function returns the number of notes of every tag, in the order of the tags.
+        """
+        return self.tag_index.counts()
 
+    def _notes(self, numbers: Iterable[str]) -> "NotesBook":
+        """
+        Returns a notes book of the notes with the numbers, in their order and with their numbers in this book.
+        """
+        notes = NotesBook()
+        notes.data = {number: self.data[number] for number in numbers}
+        return notes
+
+    def created_between(self, first: date | None, last: date | None) -> "NotesBook":
+        """
+        The created_between function returns the notes created from the day first to the day last, both included,
+        in local time and the oldest first; a day left out (None) leaves the range open on that side.
+        """
+        start = -(2**63) if first is None else int(datetime.combine(first, time.min).timestamp())
+        end = 2**63 if last is None else int(datetime.combine(last + timedelta(days=1), time.min).timestamp())
+        return self._notes(self.creation_index.between(start, end))
+
+    def created_in_last_days(self, days: int) -> "NotesBook":
+        """
+        The created_in_last_days function returns the notes created today and in the days - 1 days before,
+        the oldest first.
+        """
+        today = date.today()
+        return self.created_between(today - timedelta(days=days - 1), today)
+
+    def newest_first(self, count: int | None = None) -> "NotesBook":
+        """
+        The newest_first function returns the count newest notes (all of them by default), the newest first.
+        """
+        return self._notes(islice(self.creation_index.newest(), count))
+
+    def sort_book(self) -> None:
+        """
+        Sorts the notes by their numbers. In a batch, the book is sorted once at its end.
+        """
+        if self._batch is not None:
+            self._batch.sort = True
+            return
+        self.data = dict(sorted(self.data.items(), key=lambda item: int(item[0])))
+        self.mark_changed()
+
+    def prepare_snapshot(self, blob_file: str) -> None:
+        """
+        Appends the notes longer than NOTE_INLINE_SIZE that are not in blob_file yet to it (see the blob_store module),
+        so the snapshots hold only their previews. A note changed during the save keeps its new text inline.
+        """
+        moved = [
+            (record.note, record.note.note)
+            for record in self.data.values()
+            if (
+                record.note.blob.file_name != blob_file
+                if record.note.blob is not None
+                else len(record.note.preview or "") > NOTE_INLINE_SIZE
+            )
+        ]
+        if not moved:
+            return
+        with BlobWriter(blob_file) as writer:
+            blobs = [writer.append(text) for _, text in moved]
+        for (note, text), blob in zip(moved, blobs):
+            if note.note is text:
+                note.set_blob(blob)
+
+    def compact_blob_file(self, blob_file: str, new_file: str) -> bool:
+        """
+        Rewrites the notes saved in blob_file to new_file when they take less than NOTE_BLOB_LIVE_SHARE of it,
+        so the bodies of the changed and deleted notes do not pile up. Returns True if it did.
+        """
+        notes = [
+            record.note
+            for record in self.data.values()
+            if record.note.blob is not None and record.note.blob.file_name == blob_file
+        ]
+        try:
+            size = os.path.getsize(blob_file)
+        except FileNotFoundError:
+            return False
+        blobs = [note.blob for note in notes]
+        if sum(blob.length for blob in blobs) >= (size - len(BLOB_MAGIC)) * NOTE_BLOB_LIVE_SHARE:
+            return False
+        with BlobWriter(new_file) as writer:
+            new_blobs = [writer.append(body) for body in read_blobs(blobs)]
+        for note, blob, new_blob in zip(notes, blobs, new_blobs):
+            if note.blob is blob:
+                note.set_blob(new_blob)
+        return True
+
+    def _normalize_criteria(self, criteria: str) -> str:
+        """
+        Tag queries differing only in spaces give the same results, so they are cached as one.
+        """
+        return " ".join(criteria.split()) if is_tag_query(criteria) else criteria
+
+    def _search(self, criteria: str) -> "NotesBook":
+        """
+        Searches the notes for the criteria in the text, the name and the date of creation (see Book.search for the cache).
+        Criteria with a tag are a tag query (see the query module).
+        """
+        if is_tag_query(criteria):
+            return self._notes(compile_tag_query(criteria).execute(self))
+        created_notes = self._search_created(criteria)
+        if created_notes is not None:
+            return created_notes
+        return self._search_text(criteria)
+
+    def _search_text(self, criteria: str) -> "NotesBook":
+        """
+        Searches the notes for the criteria in the text, the name and the date of creation. A note is listed
+        for each of them it matches, numbered in the order found; the notes stay owned by this book.
+        """
+        found = []
         if criteria[0] not in PUNCTUATION:
-            for record in self.data.values():
-                if re.search(criteria.lower(), record.note.note.lower()):
-                    search_notes.add_record(record)
+            text_found = self._text_matches(re.compile(criteria.lower()))
+            for key, record in self.data.items():
+                if key in text_found:
+                    found.append(record)
 
                 if record.note.name_note:
                     if re.search(criteria.lower(), record.note.name_note.lower()):
-                        search_notes.add_record(record)
+                        found.append(record)
 
                 if re.search(criteria, record.date_of_creation):
-                    search_notes.add_record(record)
+                    found.append(record)
 
+        search_notes = NotesBook()
+        search_notes.data = {str(number): record for number, record in enumerate(found, 1)}
         return search_notes
 
+    def _text_matches(self, pattern: re.Pattern) -> set[str]:
+        """
+        Returns the keys of the notes whose text matches the pattern. The notes saved out of line are matched
+        against their previews first; only those the preview does not decide are read, in one pass over the blob file.
+        """
+        matched, unread = set(), []
+        for key, record in self.data.items():
+            note = record.note
+            if note.loaded:
+                if pattern.search((note.read_note() or "").lower()):
+                    matched.add(key)
+                continue
+            preview = (note.preview or "").lower()
+            match = pattern.search(preview)
+            # A match ending before the end of the preview is in the whole note too.
+            if match and match.end() < len(preview):
+                matched.add(key)
+            else:
+                unread.append(key)
+        bodies = read_blobs([self.data[key].note.blob for key in unread])
+        matched.update(key for key, body in zip(unread, bodies) if pattern.search(body.lower()))
+        return matched
+
+    def _search_created(self, criteria: str) -> "NotesBook | None":
+        """
+        Answers the searches by the time of creation from the index: 'last:N' for the notes of the last N days,
+        'created:A..B' for the notes created from the day A to the day B (DATE_FORMAT, either one may be left out)
+        and 'created:A' for the notes of the day A. Returns None for other criteria and invalid days.
+        """
+        field, _, value = criteria.strip().partition(":")
+        if field == "last" and value.isdigit():
+            return self.created_in_last_days(int(value))
+        if field != "created" or not value:
+            return None
+        first, separator, last = value.partition("..")
+        try:
+            first_day = datetime.strptime(first, DATE_FORMAT).date() if first else None
+            last_day = datetime.strptime(last, DATE_FORMAT).date() if last else None
+            return self.created_between(first_day, last_day if separator else first_day)
+        except (ValueError, OverflowError, OSError):
+            return None
+
     def _note_number(self) -> str:
         """
         The note_number function is used to number the notes in a notebook.
@@ -57,6 +376,13 @@ class NotesBook(Book):
         length_notesbook = len(self.data)
         return str(length_notesbook + 1)
 
+    def free_key(self, taken: set[str]) -> str:
+        """
+        The free_key function returns the number after the highest number in taken, for a note another process
+        has saved under a number the book has also given to a note.
+        """
+        return str(max(map(int, taken), default=0) + 1)
+
     def _re_numbering(self) -> None:
         """
         The re_numbering function takes a dictionary of records and re-numbers the keys in order.
@@ -67,3 +393,5 @@ class NotesBook(Book):
         records = list(self.data.values())
         new_keys = list(map(str, range(1, len(keys) + 1)))
         self.data = dict(zip(new_keys, records))
+        if keys != new_keys:
+            self.mark_all_changed()
@@ -0,0 +1,110 @@
+"""
+The parallel_search module searches very large address books in contiguous shards kept by worker processes.
+
+Classes:
+    ParallelSearch: Searches an address book in shards kept by worker processes.
+"""
+import gc
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from my_address_book.address_book import AddressBook as AB
+from my_address_book.constants import PARALLEL_SEARCH_MIN_RECORDS
+
+_shard: AB | None = None
+
+
+def _load_shard(records: dict) -> None:
+    """
+    The _load_shard function keeps the shard of a worker process and indexes it. The collector is paused
+    while the indexes are built and the loaded objects are frozen, so it never scans them again.
+    """
+    global _shard
+    gc.disable()
+    try:
+        _shard = AB()
+        _shard.data = records
+        _shard.reindex()
+    finally:
+        gc.enable()
+    gc.freeze()
+
+
+def _search_shard(criteria: str) -> list[str]:
+    """
+    The _search_shard function searches the shard of the worker process and returns the names found, in order.
+    """
+    if _shard is None:
+        raise RuntimeError("The worker has no shard loaded")
+    return list(_shard.search(criteria))
+
+
+class ParallelSearch:
+    """
+    Searches an address book in shards kept by worker processes, loaded again after the book changes.
+
+    Attributes:
+        addressbook (AB): The searched address book.
+        shards (int): The number of shards and worker processes.
+        min_records (int): Smaller books are searched in the calling process.
+
+    Methods:
+        search(criteria): Returns the contacts matching the criteria, in the order of the book.
+        close(): Stops the worker processes.
+    """
+
+    def __init__(self, addressbook: AB, shards: int | None = None, min_records: int = PARALLEL_SEARCH_MIN_RECORDS):
+        self.addressbook = addressbook
+        self.shards = shards or os.cpu_count() or 1
+        self.min_records = min_records
+        self._executors: list[ProcessPoolExecutor] = []
+        self._generation: int | None = None
+
+    def __enter__(self) -> "ParallelSearch":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def _load_shards(self) -> None:
+        """
+        The _load_shards function cuts the book into shards and starts a worker process for every shard;
+        the workers load their shard once.
+        """
+        self.close()
+        shard_size = -(-len(self.addressbook.data) // self.shards)
+        records = iter(self.addressbook.data.items())
+        for _ in range(self.shards):
+            shard = dict(islice(records, shard_size))
+            self._executors.append(ProcessPoolExecutor(1, initializer=_load_shard, initargs=(shard,)))
+        self._generation = self.addressbook.generation
+
+    def search(self, criteria: str) -> AB:
+        """
+        The search function sends the criteria to all the shards at once and joins the names found
+        in the order of the shards. Errors of the criteria (a bad query or regular expression) are raised here.
+        """
+        if len(self.addressbook.data) < self.min_records or criteria.startswith("~"):
+            return self.addressbook.search(criteria)
+
+        if self._generation != self.addressbook.generation:
+            self._load_shards()
+
+        futures = [executor.submit(_search_shard, criteria) for executor in self._executors]
+        found = AB()
+        for future in futures:
+            for name in future.result():
+                record = self.addressbook.data.get(name)
+                if record is not None:
+                    found.data[name] = record
+        return found
+
+    def close(self) -> None:
+        """
+        The close function stops the worker processes.
+        """
+        for executor in self._executors:
+            executor.shutdown(cancel_futures=True)
+        self._executors.clear()
+        self._generation = None
@@ -0,0 +1,569 @@
+"""
+The query module provides the field-scoped query language of the address book search, compiled into plans
+that answer the indexed terms first and check the other terms against the candidates left.
+
+Syntax:
+    name:ann            The name contains 'ann', in Cyrillic or Latin spelling.
+    phone:+380          A phone number starts with the digits, or (7 digits or more) is the caller ID number.
+    email:@corp.com     An email at the domain or its subdomains;
+                        'email:ann@' by local part, 'email:ann@corp.com' exact, 'email:ann' contains.
+    bday:<30 bday:>300  The birthday comes in less (more) than the given number of days.
+    bday:06-1990        The birthday as DD-MM-YYYY contains the text.
+    ann                 A word without a field matches as the plain search box criteria.
+    a b, a AND b        Both terms match.
+    a OR b              Either term matches.
+    NOT a               The term does not match.
+    (a OR b) c          Parentheses group terms; "quoted values" may contain spaces.
+
+The notes book takes tag queries in the same syntax, combined over the bitmaps of indexes.TagIndex:
+    #work               The note has the tag (in any case).
+    meeting             A word without '#' matches as the plain notes search box criteria.
+    #work #urgent NOT #done, #work OR #home, (#a OR #b) meeting
+                        The operators and parentheses as above.
+
+Classes:
+    QueryError: A query that cannot be parsed.
+    Predicate: The interface of a node of a query plan.
+    QueryPlan: A compiled query.
+    TagPredicate: The interface of a node of a tag query plan.
+    TagQueryPlan: A compiled tag query.
+
+Functions:
+    is_query(criteria: str) -> bool: Checks if the criteria uses the query language.
+    compile_query(criteria: str) -> QueryPlan: Parses a query into a plan; plans of recent queries are reused.
+    is_tag_query(criteria: str) -> bool: Checks if the notes search criteria has a tag.
+    compile_tag_query(criteria: str) -> TagQueryPlan: Parses a tag query into a plan; plans of recent queries are reused.
+"""
+import re
+from abc import ABCMeta
+from abc import abstractmethod
+from functools import lru_cache
+from typing import TYPE_CHECKING
+from typing import Generic
+from typing import Iterator
+from typing import TypeVar
+
+from my_address_book.constants import DATE_FORMAT
+from my_address_book.entities import normalize_tag
+from my_address_book.indexes import MIN_PHONE_SUFFIX
+from my_address_book.indexes import bitmap_numbers
+from my_address_book.indexes import bitmap_of
+from my_address_book.indexes import canonical_phone
+from my_address_book.indexes import search_key
+from my_address_book.indexes import split_email
+from my_address_book.records import RecordContact
+from my_address_book.records import RecordNote
+
+if TYPE_CHECKING:
+    from my_address_book.address_book import AddressBook
+    from my_address_book.notes_book import NotesBook
+
+FIELDS = ("name", "phone", "email", "bday")
+OPERATORS = ("AND", "OR", "NOT")
+FILTER_THRESHOLD = 64
+QUERY_CACHE_SIZE = 128
+
+QUERY_SYNTAX = re.compile(rf"(?:^|[\s(])(?:{'|'.join(FIELDS)}):|(?:^|\s)(?:{'|'.join(OPERATORS)})(?:\s|$)")
+TOKEN = re.compile(r'\s*(\(|\)|[^\s()"]*"[^"]*"|[^\s()"]+)')
+TAG_SYNTAX = re.compile(r"(?:^|[\s(])#[^\s()]")
+
+
+class QueryError(ValueError):
+    """A query that cannot be parsed"""
+
+
+class Predicate(metaclass=ABCMeta):
+    """
+    Interface of a node of a query plan.
+
+    Attributes:
+        indexed (bool): The node is answered from the indexes of the book, without scanning it.
+        rank (int): The order of the node in an AND: the more selective or the cheaper, the lower.
+    """
+
+    indexed = False
+    rank = 10
+
+    def select(self, book: "AddressBook") -> set[str]:
+        """
+        The select function returns the names of the matching contacts; nodes without an index scan the book.
+        """
+        return {name for name, record in book.data.items() if self.matches(book, record)}
+
+    @abstractmethod
+    def matches(self, book: "AddressBook", record: RecordContact) -> bool:
+        pass
+
+
+class Criteria(Predicate):
+    """A word without a field, matched as the plain search box criteria"""
+
+    rank = 8
+
+    def __init__(self, criteria: str):
+        self.criteria = criteria
+        self.key_criteria = search_key(criteria)
+
+    def matches(self, book: "AddressBook", record: RecordContact) -> bool:
+        return book._matches_criteria(record, self.criteria, self.key_criteria)
+
+
+class NameContains(Predicate):
+    """name:value"""
+
+    indexed = True
+    rank = 4
+
+    def __init__(self, value: str):
+        self.key = search_key(value)
+
+    def select(self, book: "AddressBook") -> set[str]:
+        return book.name_index.containing(self.key)
+
+    def matches(self, book: "AddressBook", record: RecordContact) -> bool:
+        return self.key in book.name_index.key(record.user.name)
+
+
+class PhoneMatches(Predicate):
+    """phone:value"""
+
+    indexed = True
+    rank = 1
+
+    def __init__(self, value: str):
+        self.value = value
+        self.digits = canonical_phone(value)
+        if not self.digits.isdigit():
+            raise QueryError(f"phone: needs digits, but got '{value}'")
+        self.caller_id = len(self.digits) >= MIN_PHONE_SUFFIX
+        if not self.caller_id:
+            self.rank = 5
+
+    def select(self, book: "AddressBook") -> set[str]:
+        names = book.phone_index.starting_with(self.digits)
+        if self.caller_id:
+            names.update(book.phone_index.lookup(self.value))
+        return names
+
+    def matches(self, book: "AddressBook", record: RecordContact) -> bool:
+        for subrecord in record.phone_numbers:
+            phone = canonical_phone(subrecord.subrecord.phone)
+            if phone.startswith(self.digits):
+                return True
+            if self.caller_id:
+                short, long = sorted((phone.lstrip("0"), self.digits.lstrip("0")), key=len)
+                if len(short) >= MIN_PHONE_SUFFIX and long.endswith(short):
+                    return True
+        return False
+
+
+class EmailMatches(Predicate):
+    """email:@domain, email:local@, email:local@domain or email:text"""
+
+    indexed = True
+
+    def __init__(self, value: str):
+        self.value = value.lower()
+        self.local_part, self.domain = split_email(value) if "@" in value else (self.value, "")
+        self.rank = 2 if self.local_part and self.domain else 3
+        if "@" not in value:
+            self.indexed = False
+            self.rank = 6
+
+    def select(self, book: "AddressBook") -> set[str]:
+        if not self.indexed:
+            return super().select(book)
+        if not self.local_part:
+            return book.email_index.by_domain(self.domain)
+        names = book.email_index.by_local_part(self.local_part)
+        if self.domain:
+            names &= book.email_index.by_domain(self.domain, subdomains=False)
+        return names
+
+    def matches(self, book: "AddressBook", record: RecordContact) -> bool:
+        for email in record.emails:
+            local_part, domain = split_email(email.subrecord.email)
+            if not self.indexed:
+                if self.value in f"{local_part}@{domain}":
+                    return True
+            elif not self.local_part:
+                if domain == self.domain or domain.endswith("." + self.domain):
+                    return True
+            elif local_part == self.local_part and (not self.domain or domain == self.domain):
+                return True
+        return False
+
+
+class BirthdayMatches(Predicate):
+    """bday:<days, bday:>days or bday:text"""
+
+    rank = 7
+
+    def __init__(self, value: str):
+        self.operator, self.days, self.text = None, 0, value
+        if value[:1] in "<>" and value[1:].isdigit():
+            self.operator, self.days = value[0], int(value[1:])
+            self.rank = 6
+
+    def select(self, book: "AddressBook") -> set[str]:
+        if self.operator is None:
+            return super().select(book)
+        return {name for name, days_to_birthday in book.days_to_birthdays().items() if self._compare(days_to_birthday)}
+
+    def matches(self, book: "AddressBook", record: RecordContact) -> bool:
+        if self.operator is None:
+            birthday = record.user.birthday_date
+            return birthday is not None and self.text in birthday.strftime(DATE_FORMAT)
+
+        days_to_birthday = book.days_to_birthdays().get(record.user.name)
+        return days_to_birthday is not None and self._compare(days_to_birthday)
+
+    def _compare(self, days_to_birthday: int) -> bool:
+        return days_to_birthday < self.days if self.operator == "<" else days_to_birthday > self.days
+
+
+class Not(Predicate):
+    """NOT term"""
+
+    rank = 9
+
+    def __init__(self, term: Predicate):
+        self.term = term
+
+    def select(self, book: "AddressBook") -> set[str]:
+        if self.term.indexed:
+            return set(book.data) - self.term.select(book)
+        return super().select(book)
+
+    def matches(self, book: "AddressBook", record: RecordContact) -> bool:
+        return not self.term.matches(book, record)
+
+
+class Or(Predicate):
+    """term OR term"""
+
+    def __init__(self, terms: list[Predicate]):
+        self.terms = terms
+        self.indexed = all(term.indexed for term in terms)
+        self.rank = max(term.rank for term in terms)
+
+    def select(self, book: "AddressBook") -> set[str]:
+        if not self.indexed:
+            return super().select(book)
+        names: set[str] = set()
+        for term in self.terms:
+            names |= term.select(book)
+        return names
+
+    def matches(self, book: "AddressBook", record: RecordContact) -> bool:
+        return any(term.matches(book, record) for term in self.terms)
+
+
+class And(Predicate):
+    """term AND term; the terms are kept ordered by their rank"""
+
+    def __init__(self, terms: list[Predicate]):
+        self.terms = sorted(terms, key=lambda term: (not term.indexed, term.rank))
+        self.indexed = self.terms[0].indexed
+        self.rank = min(term.rank for term in terms)
+
+    def select(self, book: "AddressBook") -> set[str]:
+        """
+        The select function takes the names of the most selective indexed term and narrows them down:
+        with the other indexed terms while many names are left, then by checking the few names left.
+        """
+        first, *others = self.terms
+        names = first.select(book)
+        for term in others:
+            if not names:
+                break
+            if term.indexed and len(names) > FILTER_THRESHOLD:
+                names &= term.select(book)
+            else:
+                names = {name for name in names if term.matches(book, book.data[name])}
+        return names
+
+    def matches(self, book: "AddressBook", record: RecordContact) -> bool:
+        return all(term.matches(book, record) for term in self.terms)
+
+
+class QueryPlan:
+    """
+    A compiled query.
+
+    Attributes:
+        criteria (str): The text of the query.
+        root (Predicate): The root of the plan.
+
+    Methods:
+        execute(book): Returns the names of the contacts of the book matching the query.
+    """
+
+    def __init__(self, criteria: str, root: Predicate):
+        self.criteria = criteria
+        self.root = root
+
+    def execute(self, book: "AddressBook") -> set[str]:
+        """
+        The execute function returns the names of the matching contacts. A book without indexes
+        (a search result) or with its indexes still being rebuilt is scanned.
+        """
+        if not book.indexes_ready or len(book.name_index) != len(book.data):
+            return {name for name, record in book.data.items() if self.root.matches(book, record)}
+        return self.root.select(book)
+
+
+Node = TypeVar("Node")
+
+
+class _Parser(Generic[Node]):
+    """A recursive descent parser of the query languages; the nodes it builds are given by its class attributes and term"""
+
+    or_node: type
+    and_node: type
+    not_node: type
+
+    def __init__(self, criteria: str):
+        self.tokens = TOKEN.findall(criteria)
+        self.position = 0
+
+    def peek(self) -> str | None:
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def take(self) -> str:
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def parse(self) -> Node:
+        if not self.tokens:
+            raise QueryError("The query is empty")
+        root = self.parse_or()
+        if self.peek() is not None:
+            raise QueryError(f"Unexpected '{self.peek()}' in the query")
+        return root
+
+    def parse_or(self) -> Node:
+        terms = [self.parse_and()]
+        while self.peek() == "OR":
+            self.take()
+            terms.append(self.parse_and())
+        return terms[0] if len(terms) == 1 else self.or_node(terms)
+
+    def parse_and(self) -> Node:
+        terms = [self.parse_not()]
+        while self.peek() not in (None, "OR", ")"):
+            if self.peek() == "AND":
+                self.take()
+            terms.append(self.parse_not())
+        return terms[0] if len(terms) == 1 else self.and_node(terms)
+
+    def parse_not(self) -> Node:
+        if self.peek() == "NOT":
+            self.take()
+            return self.not_node(self.parse_not())
+        return self.parse_term()
+
+    def parse_term(self) -> Node:
+        token = self.peek()
+        if token is None or token in (")", "AND", "OR"):
+            raise QueryError(f"A term is missing {'at the end' if token is None else 'before ' + repr(token)} of the query")
+        self.take()
+
+        if token == "(":
+            term = self.parse_or()
+            if self.peek() != ")":
+                raise QueryError("A ')' is missing in the query")
+            self.take()
+            return term
+        return self.term(token)
+
+    @abstractmethod
+    def term(self, token: str) -> Node:
+        pass
+
+
+class _QueryParser(_Parser[Predicate]):
+    """A recursive descent parser of the query language of the address book"""
+
+    or_node = Or
+    and_node = And
+    not_node = Not
+
+    def term(self, token: str) -> Predicate:
+        field, separator, value = token.partition(":")
+        if not separator or field not in FIELDS:
+            return Criteria(token.strip('"'))
+        value = value.strip('"')
+        if not value:
+            raise QueryError(f"The field '{field}:' needs a value")
+        if field == "name":
+            return NameContains(value)
+        if field == "phone":
+            return PhoneMatches(value)
+        if field == "email":
+            return EmailMatches(value)
+        return BirthdayMatches(value)
+
+
+def is_query(criteria: str) -> bool:
+    """
+    The is_query function checks if the criteria uses the query language (a field or an operator);
+    other criteria keep the plain search box syntax.
+    """
+    return QUERY_SYNTAX.search(criteria) is not None
+
+
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def compile_query(criteria: str) -> QueryPlan:
+    """
+    The compile_query function parses a query into a plan. Plans are kept for the recent queries,
+    so a query typed again is not parsed again.
+    """
+    return QueryPlan(criteria, _QueryParser(criteria).parse())
+
+
+class TagPredicate(metaclass=ABCMeta):
+    """
+    Interface of a node of a tag query plan.
+
+    Attributes:
+        indexed (bool): The node is answered from the tag index, without reading the notes.
+    """
+
+    indexed = True
+
+    @abstractmethod
+    def select(self, book: "NotesBook", candidates: int) -> int:
+        """
+        The select function returns the bitmap of the notes of the candidates bitmap that match the node.
+        """
+
+
+class HasTag(TagPredicate):
+    """#tag"""
+
+    def __init__(self, tag: str):
+        self.tag = normalize_tag(tag)
+        if not self.tag:
+            raise QueryError("A tag is missing after '#'")
+
+    def select(self, book: "NotesBook", candidates: int) -> int:
+        return book.tag_index.tagged(self.tag) & candidates
+
+
+class NoteText(TagPredicate):
+    """A word without '#', matched as the plain notes search box criteria"""
+
+    indexed = False
+
+    def __init__(self, criteria: str):
+        try:
+            self.pattern = re.compile(criteria.lower())
+            self.date_pattern = re.compile(criteria)
+        except re.error as error:
+            raise QueryError(f"'{criteria}' is not a valid search pattern: {error}") from error
+
+    def select(self, book: "NotesBook", candidates: int) -> int:
+        return bitmap_of(int(number) for number in bitmap_numbers(candidates) if self.matches(book.data[number]))
+
+    def matches(self, record: RecordNote) -> bool:
+        note, name_note = record.note.read_note(), record.note.name_note
+        return bool(
+            (note and self.pattern.search(note.lower()))
+            or (name_note and self.pattern.search(name_note.lower()))
+            or self.date_pattern.search(record.date_of_creation)
+        )
+
+
+class TagNot(TagPredicate):
+    """NOT term"""
+
+    def __init__(self, term: TagPredicate):
+        self.term = term
+        self.indexed = term.indexed
+
+    def select(self, book: "NotesBook", candidates: int) -> int:
+        return candidates & ~self.term.select(book, candidates)
+
+
+class TagOr(TagPredicate):
+    """term OR term"""
+
+    def __init__(self, terms: list[TagPredicate]):
+        self.terms = terms
+        self.indexed = all(term.indexed for term in terms)
+
+    def select(self, book: "NotesBook", candidates: int) -> int:
+        notes = 0
+        for term in self.terms:
+            notes |= term.select(book, candidates)
+        return notes
+
+
+class TagAnd(TagPredicate):
+    """term AND term; the terms answered from the tag index go first"""
+
+    def __init__(self, terms: list[TagPredicate]):
+        self.terms = sorted(terms, key=lambda term: not term.indexed)
+        self.indexed = all(term.indexed for term in terms)
+
+    def select(self, book: "NotesBook", candidates: int) -> int:
+        """
+        The select function narrows the candidates down term by term, so the words are only checked
+        against the notes left by the tags.
+        """
+        for term in self.terms:
+            if not candidates:
+                break
+            candidates = term.select(book, candidates)
+        return candidates
+
+
+class TagQueryPlan:
+    """
+    A compiled tag query.
+
+    Attributes:
+        criteria (str): The text of the query.
+        root (TagPredicate): The root of the plan.
+
+    Methods:
+        execute(book): Yields the numbers of the notes of the book matching the query, in ascending order.
+    """
+
+    def __init__(self, criteria: str, root: TagPredicate):
+        self.criteria = criteria
+        self.root = root
+
+    def execute(self, book: "NotesBook") -> Iterator[str]:
+        return bitmap_numbers(self.root.select(book, book.tag_index.notes))
+
+
+class _TagParser(_Parser[TagPredicate]):
+    """A recursive descent parser of the tag queries of the notes book"""
+
+    or_node = TagOr
+    and_node = TagAnd
+    not_node = TagNot
+
+    def term(self, token: str) -> TagPredicate:
+        if token.startswith("#"):
+            return HasTag(token)
+        return NoteText(token.strip('"'))
+
+
+def is_tag_query(criteria: str) -> bool:
+    """
+    The is_tag_query function checks if the notes search criteria has a tag ('#' at the beginning of a word);
+    other criteria keep the plain notes search box syntax.
+    """
+    return TAG_SYNTAX.search(criteria) is not None
+
+
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def compile_tag_query(criteria: str) -> TagQueryPlan:
+    """
+    The compile_tag_query function parses a tag query into a plan. Plans are kept for the recent queries.
+    """
+    return TagQueryPlan(criteria, _TagParser(criteria).parse())
@@ -1,13 +1,53 @@
 """Record"""
+import time
 from datetime import date
 from datetime import datetime
+from datetime import timedelta
+from functools import lru_cache
 from typing import Any
 from typing import Union
 
+from my_address_book.constants import NOTE_DATE_FORMAT
 from my_address_book.entities import Email
 from my_address_book.entities import Note
 from my_address_book.entities import Phone
 from my_address_book.entities import User
+from my_address_book.entities import normalize_tag
+
+
+@lru_cache(maxsize=2)
+def days_to_birthdays_table(today: date) -> dict[tuple[int, int], int]:
+    """
+    The days_to_birthdays_table function returns the number of days from today to the next birthday
+    for every (month, day) of the year; 29 February falls on 28 February in the other years.
+    The table is computed once a day, so a birthday costs one lookup instead of building dates.
+    """
+    table = {}
+    day = date(2000, 1, 1)  # a leap year, so it has every birthday
+    while day.year == 2000:
+        for year in (today.year, today.year + 1):
+            try:
+                next_birthday = date(year, day.month, day.day)
+            except ValueError:
+                next_birthday = date(year, 2, 28)
+            if next_birthday >= today:
+                break
+        table[(day.month, day.day)] = (next_birthday - today).days
+        day += timedelta(days=1)
+    return table
+
+
+def parse_date_of_creation(text: str | None) -> int | None:
+    """
+    The parse_date_of_creation function converts a date of creation saved as text (NOTE_DATE_FORMAT, local time)
+    by the versions before the timestamps into a Unix timestamp; None when it is missing or not such a date.
+    """
+    if text is None:
+        return None
+    try:
+        return int(datetime.strptime(text, NOTE_DATE_FORMAT).timestamp())
+    except (TypeError, ValueError, OverflowError, OSError):
+        return None
 
 
 class RecordNote:
@@ -16,20 +56,87 @@ class RecordNote:
 
     Attributes:
         note (Note): The note object associated with the record.
-        date_of_creation (datetime): The date of creation of the record.
+        created (int | None): The time of creation of the record as a Unix timestamp; None when it is not known.
+        date_of_creation (str): The time of creation in NOTE_DATE_FORMAT and local time, as the lists show it.
+        version (int): The number of changes of the record, increased by every change of its note.
+        dirty (bool): The record has changed since the book last saved it (see Book.collect_dirty_records).
 
     Methods:
         add_note_name(note_name: str) -> None:
             Adds a name to the note object.
         add_note(note_new: str) -> None:
             Adds a note to the note object.
-        make_date_of_creation() -> datetime:
-            Creates and returns the current date as the date of creation.
+        add_tags(*tags: str) -> None:
+            Adds tags to the note object.
+        remove_tags(*tags: str) -> None:
+            Removes tags from the note object.
+        make_date_of_creation() -> int:
+            Returns the current time as the time of creation.
+        mark_dirty(old_tags: tuple[str, ...] | None = None) -> None:
+            Marks the record changed after a change of its note.
+        own_entities() -> None:
+            Makes the record the owner of its note.
+
+    A change of the note of the record (see entities.Entity) increases the version of the record, marks it dirty
+    and is reported to its notes book.
     """
 
+    # The notes book the record belongs to; it is told about changes to keep its cache and tag index up to date.
+    # Not pickled, like RecordContact._book.
+    _book: Any = None
+    # A record read from a file is clean; the instance attributes are set by its first change.
+    version: int = 0
+    dirty: bool = False
+
     def __init__(self, note: Note):
         self.note: Note = note
-        self.date_of_creation: str = self.make_date_of_creation()
+        note._owner = self
+        self.created: int | None = self.make_date_of_creation()
+
+    @property
+    def date_of_creation(self) -> str:
+        """
+        The date_of_creation function returns the time of creation in NOTE_DATE_FORMAT and local time;
+        an empty string when it is not known.
+        """
+        if self.created is None:
+            return ""
+        return datetime.fromtimestamp(self.created).strftime(NOTE_DATE_FORMAT)
+
+    def _journal(self) -> None:
+        """
+        Lets the notes book that owns the record keep the record as it was, to roll back a batch of changes.
+        """
+        if self._book is not None:
+            self._book.journal_record(self)
+
+    def mark_dirty(self, old_tags: tuple[str, ...] | None = None) -> None:
+        """
+        The mark_dirty function marks the record changed: its version is increased, it is saved by the next save
+        and its notes book updates its tag index when the tags have changed from old_tags.
+        """
+        self.version += 1
+        self.dirty = True
+        if self._book is not None:
+            self._book.reindex_record(self, old_tags)
+
+    def own_entities(self) -> None:
+        """
+        Makes the record the owner of its note, so its changes are reported to it;
+        needed after its state has been restored from a copy or a pickle.
+        """
+        self.note._owner = self
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state.pop("_book", None)
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        if "date_of_creation" in state:  # pickled before the timestamps
+            state["created"] = parse_date_of_creation(state.pop("date_of_creation"))
+        self.__dict__.update(state)
+        self.own_entities()
 
     def add_note_name(self, note_name: str) -> None:
         """
@@ -45,14 +152,28 @@ class RecordNote:
 
         self.note.note = note_new
 
-    def make_date_of_creation(self) -> str:
+    def add_tags(self, *tags: str) -> None:
+        """
+        The add_tags function adds the tags, with or without '#', to the note.
+        """
+
+        self.note.tags = self.note.tags + tags
+
+    def remove_tags(self, *tags: str) -> None:
+        """
+        The remove_tags function removes the tags, with or without '#', from the note.
+        """
+
+        removed = {normalize_tag(tag) for tag in tags}
+        self.note.tags = [tag for tag in self.note.tags if tag not in removed]
+
+    def make_date_of_creation(self) -> int:
         """
         The make_date_of_creation function creates a date of creation for the user.
-        The function takes in no arguments and returns the current date.
+        The function takes in no arguments and returns the current time as a Unix timestamp.
         """
 
-        current_date = datetime.now()
-        return current_date.strftime("%d-%m-%Y %H:%M:%S")
+        return int(time.time())
 
 
 class RecordContact:
@@ -75,8 +196,22 @@ class RecordContact:
         add_birthday: Adds a birthday date to the contact.
 
         days_to_birthday: Calculates the number of days until the next birthday of the contact.
+
+        mark_dirty: Marks the record changed after a change of it or of its entities.
+
+        own_entities: Makes the record the owner of its user, phone numbers and emails.
+
+    A change of the user, a phone number or an email of the record (see entities.Entity) or an added phone number,
+    email or birthday increases the version of the record, marks it dirty and is reported to its address book.
     """
 
+    # The address book the record belongs to; it is told about changes to keep its indexes up to date.
+    # Not pickled, and records loaded from files saved before it existed fall back to this default.
+    _book: Any = None
+    # A record read from a file is clean; the instance attributes are set by its first change.
+    version: int = 0
+    dirty: bool = False
+
     class Subrecord:
         """
         Subrecord is a class representing a subrecord of a contact, such as a phone number or email.
@@ -92,6 +227,7 @@ class RecordContact:
 
     def __init__(self, user: User):
         self.user = user
+        user._owner = self
         self.phone_numbers: list["RecordContact.Subrecord"] = []
         self.emails: list["RecordContact.Subrecord"] = []
 
@@ -99,37 +235,82 @@ class RecordContact:
         """
         Adds a new phone number to the contact.
         """
+        self._journal()
+        phone_number._owner = self
         subrecord_phone = self.Subrecord(phone_number, phone_assignment)
         self.phone_numbers.append(subrecord_phone)
+        self.mark_dirty()
 
     def add_email(self, email: Email, email_assignment: list | None = None) -> None:
         """
         Adds a new email to the contact.
         """
+        self._journal()
+        email._owner = self
         subrecord_email = self.Subrecord(email, email_assignment)
         self.emails.append(subrecord_email)
+        self.mark_dirty()
+
+    def mark_dirty(self) -> None:
+        """
+        Marks the record changed: its version is increased, it is saved by the next save
+        and its address book updates its indexes.
+        """
+        self.version += 1
+        self.dirty = True
+        self._notify_book()
 
-    def add_birthday(self, birthday_date: datetime) -> None:
+    def own_entities(self) -> None:
         """
-        Add a birthday data to the contact.
+        Makes the record the owner of its user, phone numbers and emails, so their changes are reported to it;
+        needed after their state has been restored from a copy or a pickle.
         """
+        self.user._owner = self
+        for subrecord in self.phone_numbers + self.emails:
+            subrecord.subrecord._owner = self
+
+    def _journal(self) -> None:
+        """
+        Lets the address book that owns the record keep the record as it was, to roll back a batch of changes.
+        """
+        if self._book is not None:
+            self._book.journal_record(self)
+
+    def _notify_book(self) -> None:
+        """
+        Tells the address book that owns the record that the record has changed.
+        """
+        if self._book is not None:
+            self._book.reindex_record(self)
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state.pop("_book", None)
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.own_entities()
+
+    def add_birthday(self, birthday_date: date | None) -> None:
+        """
+        Add a birthday data to the contact; the user reports the change (see entities.Entity).
+        """
+        self.user._owner = self
         self.user.birthday_date = birthday_date
 
     def days_to_birthday(self, current_date: Union[datetime, None] = None) -> Union[int, None]:
         """
-        Calculate the number of days to the next birthday.
+        Calculate the number of days to the next birthday: 0 on the birthday itself.
+        The books read the days of all their contacts at once with AddressBook.days_to_birthdays.
         """
         if current_date is None:  # this check is required for the test
             current_date = datetime.now()
 
         birthday = self.user.birthday_date
 
-        if isinstance(birthday, date):
-            next_birthday = datetime(current_date.year, birthday.month, birthday.day)
-
-            if next_birthday < current_date:
-                next_birthday = datetime(current_date.year + 1, birthday.month, birthday.day)
-        else:
+        if not isinstance(birthday, date):
             return None
 
-        return (next_birthday - current_date).days
+        today = current_date.date() if isinstance(current_date, datetime) else current_date
+        return days_to_birthdays_table(today)[(birthday.month, birthday.day)]
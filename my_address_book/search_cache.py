@@ -0,0 +1,67 @@
+"""
+The search_cache module provides the bounded LRU cache of search results kept by every book.
+
+The cache is keyed by the search criteria together with the generation of the book (see Book.mark_changed)
+and the current day, so a change of the book or of the date makes the old results unreachable;
+they are never returned again and drop out as the least recently used ones.
+
+Classes:
+    SearchCache: A bounded LRU cache of search results with hit and miss counters.
+"""
+from collections import OrderedDict
+from typing import Any
+from typing import Hashable
+
+from my_address_book.constants import SEARCH_CACHE_SIZE
+
+
+class SearchCache:
+    """
+    A bounded LRU cache of search results.
+
+    Attributes:
+        maxsize (int): The greatest number of kept results.
+        hits (int): The number of searches answered from the cache.
+        misses (int): The number of searches that had to run.
+
+    Methods:
+        get(key): Returns the cached result for the key, or None.
+        put(key, result): Keeps a result, dropping the least recently used one when the cache is full.
+        clear(): Drops all the results; the counters are kept.
+    """
+
+    def __init__(self, maxsize: int = SEARCH_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._results: OrderedDict[Hashable, Any] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def get(self, key: Hashable) -> Any:
+        """
+        The get function returns the cached result for the key and counts a hit, or returns None and counts a miss.
+        """
+        result = self._results.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self._results.move_to_end(key)
+        self.hits += 1
+        return result
+
+    def put(self, key: Hashable, result: Any) -> None:
+        """
+        The put function keeps a result, dropping the least recently used one when the cache is full.
+        """
+        self._results[key] = result
+        self._results.move_to_end(key)
+        if len(self._results) > self.maxsize:
+            self._results.popitem(last=False)
+
+    def clear(self) -> None:
+        """
+        The clear function drops all the results; the counters are kept.
+        """
+        self._results.clear()
@@ -0,0 +1,351 @@
+"""
+The server module provides a local asyncio HTTP/JSON server over the address book and the notes book,
+so several tools can query one address book at the same time.
+
+Requests are served on the event loop: lookups read the books directly, while changes are made by
+one writer at a time under a lock. Changes only mark the books dirty; a background task saves them
+in batches every flush interval (and on shutdown), so a burst of writes costs one save.
+Connections are kept alive between requests (HTTP/1.1).
+
+Endpoints:
+    GET    /contacts/<name>          One contact.
+    GET    /contacts?q=<criteria>    Contacts matching the search box criteria or query (all contacts without q).
+    POST   /contacts                 Add a contact: {"name", "phones", "emails", "birthday"}.
+    DELETE /contacts/<name>          Delete a contact.
+    GET    /phones/<number>          Contacts owning a phone number (caller ID).
+    GET    /domains                  Number of contacts per email domain.
+    GET    /birthdays?days=<n>       Contacts with a birthday within n days.
+    GET    /notes?q=<criteria>       Notes matching the criteria or a tag query (all notes without q).
+    GET    /stats                    The generations of the books and the hits and misses of their search caches.
+
+Classes:
+    BookServer: Serves the books over TCP or a Unix socket.
+"""
+import asyncio
+import json
+import os
+import re
+from http import HTTPStatus
+from urllib.parse import parse_qs
+from urllib.parse import unquote
+from urllib.parse import urlsplit
+
+from my_address_book.address_book import AddressBook as AB
+from my_address_book.constants import EMAIL_ASSIGNMENTS
+from my_address_book.constants import PHONE_ASSIGNMENTS
+from my_address_book.exporter import contact_to_dict
+from my_address_book.exporter import note_to_dict
+from my_address_book.importer import ContactRow
+from my_address_book.importer import make_contact
+from my_address_book.importer import split_assignment
+from my_address_book.notes_book import NotesBook as NB
+from my_address_book.query import QueryError
+from my_address_book.validation import check_name_in_address_book
+
+FLUSH_INTERVAL = 1.0
+MAX_BODY_SIZE = 1024 * 1024
+
+
+class RequestError(Exception):
+    """An error answered to the client with an HTTP status"""
+
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _subrecords(values: list, assignments: list[str]) -> list[tuple[str, str | None]]:
+    """
+    The _subrecords function reads phones or emails of a request, given either as 'value(assignment)'
+    strings or as {"value", "assignment"} objects as they are returned by the server.
+    """
+    subrecords = []
+    for value in values:
+        if isinstance(value, dict):
+            subrecords.append((str(value.get("value", "")), value.get("assignment")))
+        else:
+            subrecords.append(split_assignment(str(value), assignments))
+    return subrecords
+
+
+def _content_length(headers: dict[str, str]) -> int:
+    """
+    The _content_length function returns the length of the request body, checked to be a number within MAX_BODY_SIZE.
+    """
+    try:
+        length = int(headers.get("content-length", "0") or 0)
+    except ValueError as error:
+        raise RequestError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length") from error
+    if length < 0:
+        raise RequestError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+    if length > MAX_BODY_SIZE:
+        raise RequestError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body is too large")
+    return length
+
+
+def _book_stats(book: AB | NB) -> dict[str, int]:
+    """
+    The _book_stats function returns the size, the generation and the search cache counters of a book.
+    """
+    cache = book.search_cache
+    return {"records": len(book), "generation": book.generation, "cached": len(cache), "hits": cache.hits, "misses": cache.misses}
+
+
+class BookServer:
+    """
+    A local JSON API over an address book and a notes book.
+
+    Attributes:
+        addressbook (AB): The served address book.
+        notesbook (NB): The served notes book.
+        file_ab (str | None): The file the address book is saved to, None to keep it in memory.
+        file_nb (str | None): The file the notes book is saved to.
+        flush_interval (float): The seconds between the batched saves of changed books.
+
+    Methods:
+        handle(method, target, body): Answers one request with a status and JSON data.
+        flush(): Saves the changed books.
+        start(host, port, unix_path): Starts listening and the background saving.
+        close(): Stops the server and saves the pending changes.
+    """
+
+    def __init__(
+        self,
+        addressbook: AB,
+        notesbook: NB,
+        file_ab: str | None = None,
+        file_nb: str | None = None,
+        flush_interval: float = FLUSH_INTERVAL,
+    ):
+        self.addressbook = addressbook
+        self.notesbook = notesbook
+        self.file_ab = file_ab
+        self.file_nb = file_nb
+        self.flush_interval = flush_interval
+        self.dirty = False
+        self._write_lock = asyncio.Lock()
+        self._server: asyncio.Server | None = None
+        self._flush_task: asyncio.Task | None = None
+
+    async def handle(self, method: str, target: str, body: bytes = b"") -> tuple[HTTPStatus, object]:
+        """
+        The handle function routes one request and returns the status and the data of the answer.
+        """
+        url = urlsplit(target)
+        parts = [unquote(part) for part in url.path.split("/") if part]
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+        if parts[:1] == ["contacts"] and len(parts) <= 2:
+            return await self._handle_contacts(method, url.path, parts[1:], query, body)
+        if method == "GET":
+            return self._handle_lookup(url.path, parts, query)
+        raise RequestError(HTTPStatus.NOT_FOUND, f"Unknown path '{url.path}'")
+
+    async def _handle_contacts(
+        self, method: str, path: str, names: list[str], query: dict, body: bytes
+    ) -> tuple[HTTPStatus, object]:
+        if names and method == "GET":
+            return self._get_contact(names[0])
+        if names and method == "DELETE":
+            return await self._delete_contact(names[0])
+        if not names and method == "GET":
+            return self._search_contacts(query.get("q", ""))
+        if not names and method == "POST":
+            return await self._add_contact(body)
+        raise RequestError(HTTPStatus.METHOD_NOT_ALLOWED, f"Method {method} is not allowed for '{path}'")
+
+    def _handle_lookup(self, path: str, parts: list[str], query: dict) -> tuple[HTTPStatus, object]:
+        if parts[:1] == ["phones"] and len(parts) == 2:
+            return HTTPStatus.OK, [contact_to_dict(contact) for contact in self.addressbook.lookup_phone(parts[1])]
+        if parts == ["domains"]:
+            return HTTPStatus.OK, self.addressbook.email_index.domain_counts()
+        if parts == ["birthdays"]:
+            return self._birthdays(query.get("days", "7"))
+        if parts == ["notes"]:
+            return self._search_notes(query.get("q", ""))
+        if parts == ["stats"]:
+            return HTTPStatus.OK, {"contacts": _book_stats(self.addressbook), "notes": _book_stats(self.notesbook)}
+        raise RequestError(HTTPStatus.NOT_FOUND, f"Unknown path '{path}'")
+
+    def _get_contact(self, name: str) -> tuple[HTTPStatus, object]:
+        if name not in self.addressbook.data:
+            raise RequestError(HTTPStatus.NOT_FOUND, f"The contact {name} was not found.")
+        return HTTPStatus.OK, contact_to_dict(self.addressbook.data[name])
+
+    def _search_contacts(self, criteria: str) -> tuple[HTTPStatus, object]:
+        try:
+            contacts = self.addressbook.search(criteria) if criteria else self.addressbook
+        except (QueryError, re.error) as error:
+            raise RequestError(HTTPStatus.BAD_REQUEST, str(error)) from error
+        return HTTPStatus.OK, [contact_to_dict(contact) for contact in contacts.values()]
+
+    def _birthdays(self, days: str) -> tuple[HTTPStatus, object]:
+        if not days.isdigit():
+            raise RequestError(HTTPStatus.BAD_REQUEST, f"Days must be a number, but got '{days}'")
+        birthdays = self.addressbook.birthdays_within(int(days))
+        return HTTPStatus.OK, [contact_to_dict(contact) for contact in birthdays.values()]
+
+    def _search_notes(self, criteria: str) -> tuple[HTTPStatus, object]:
+        try:
+            notes = self.notesbook.search(criteria) if criteria else self.notesbook
+        except (QueryError, re.error) as error:
+            raise RequestError(HTTPStatus.BAD_REQUEST, str(error)) from error
+        return HTTPStatus.OK, [note_to_dict(number, record) for number, record in notes.items()]
+
+    async def _add_contact(self, body: bytes) -> tuple[HTTPStatus, object]:
+        try:
+            data = json.loads(body or b"{}")
+        except ValueError as error:
+            raise RequestError(HTTPStatus.BAD_REQUEST, f"Invalid JSON: {error}") from error
+        if not isinstance(data, dict):
+            raise RequestError(HTTPStatus.BAD_REQUEST, "The contact must be a JSON object")
+
+        row = ContactRow(
+            0,
+            data.get("name") or "",
+            _subrecords(data.get("phones") or [], PHONE_ASSIGNMENTS),
+            _subrecords(data.get("emails") or [], EMAIL_ASSIGNMENTS),
+            data.get("birthday"),
+        )
+        try:
+            contact = make_contact(row)
+        except ValueError as error:
+            raise RequestError(HTTPStatus.UNPROCESSABLE_ENTITY, str(error)) from error
+
+        async with self._write_lock:
+            message_error = check_name_in_address_book(self.addressbook, row.name)
+            if message_error:
+                raise RequestError(HTTPStatus.CONFLICT, message_error)
+            self.addressbook.add_record(contact)
+            self.dirty = True
+        return HTTPStatus.CREATED, contact_to_dict(contact)
+
+    async def _delete_contact(self, name: str) -> tuple[HTTPStatus, object]:
+        async with self._write_lock:
+            if name not in self.addressbook.data:
+                raise RequestError(HTTPStatus.NOT_FOUND, f"The contact {name} was not found.")
+            self.addressbook.delete_record(name)
+            self.dirty = True
+        return HTTPStatus.OK, {"deleted": name}
+
+    async def flush(self) -> None:
+        """
+        The flush function saves the changed books. The save runs in a worker thread while the write lock
+        is held, so lookups go on during the save and no change can slip into a half-written file.
+        """
+        async with self._write_lock:
+            if not self.dirty:
+                return
+            if self.file_ab:
+                await asyncio.to_thread(self.addressbook.save_records_to_file, self.file_ab)
+            if self.file_nb:
+                await asyncio.to_thread(self.notesbook.save_records_to_file, self.file_nb)
+            self.dirty = False
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> tuple[str, str, str, dict, bytes] | None:
+        """
+        The _read_request function reads one HTTP request from the connection,
+        or returns None when the client has closed it.
+        """
+        request_line = await reader.readline()
+        if not request_line.strip():
+            return None
+        try:
+            method, target, version = request_line.decode("latin-1").split()
+        except ValueError as error:
+            raise RequestError(HTTPStatus.BAD_REQUEST, "Malformed request line") from error
+
+        headers = {}
+        while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+            key, _, value = line.decode("latin-1").partition(":")
+            headers[key.strip().lower()] = value.strip()
+
+        length = _content_length(headers)
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), target, version, headers, body
+
+    async def _serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        The _serve_connection function answers the requests of one connection until the client closes it
+        or asks not to keep it alive.
+        """
+        try:
+            while True:
+                keep_alive = False
+                try:
+                    request = await self._read_request(reader)
+                    if request is None:
+                        break
+                    method, target, version, headers, body = request
+                    connection = headers.get("connection", "").lower()
+                    keep_alive = connection == "keep-alive" or (version == "HTTP/1.1" and connection != "close")
+                    status, data = await self.handle(method, target, body)
+                except RequestError as error:
+                    status, data = error.status, {"error": str(error)}
+
+                payload = json.dumps(data, ensure_ascii=False).encode("utf-8")
+                head = (
+                    f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                    "Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(payload)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+                )
+                writer.write(head.encode("latin-1") + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8080, unix_path: str | None = None) -> None:
+        """
+        The start function starts listening on a TCP port or, when unix_path is given, on a Unix socket,
+        and starts the batched saving of changes.
+        """
+        if unix_path:
+            if os.path.exists(unix_path):
+                os.remove(unix_path)
+            self._server = await asyncio.start_unix_server(self._serve_connection, unix_path)
+        else:
+            self._server = await asyncio.start_server(self._serve_connection, host, port)
+        self._flush_task = asyncio.create_task(self._flush_periodically())
+
+    @property
+    def port(self) -> int | None:
+        """
+        Returns the TCP port the server listens on (useful when it was started on port 0).
+        """
+        if self._server is None or not self._server.sockets:
+            return None
+        address = self._server.sockets[0].getsockname()
+        return address[1] if isinstance(address, tuple) else None
+
+    async def serve_forever(self) -> None:
+        """
+        The serve_forever function serves until the task is cancelled, then saves the pending changes.
+        """
+        if self._server is None:
+            raise RuntimeError("The server is not started")
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+    async def close(self) -> None:
+        """
+        The close function stops accepting connections and the background saving, then saves the pending changes.
+        """
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+        await self.flush()
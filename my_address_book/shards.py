@@ -0,0 +1,354 @@
+"""
+The shards module stores a book as snapshot files (shards) in a directory, committed by an atomic manifest,
+so a save rewrites only the shards of the changed records and keeps the shards other processes saved meanwhile.
+
+Classes:
+    ShardedStorage: Saves and loads a book as shards in a directory.
+
+Functions:
+    is_sharded(path: str) -> bool: Checks if a book path is a directory of shards.
+    shard_of(key: str, shards: int) -> int: Returns the shard of a key.
+"""
+import json
+import os
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+from typing import Any
+
+from my_address_book.blob_store import BLOB_NAME
+from my_address_book.blob_store import BLOB_SUFFIX
+from my_address_book.codec import MappedSnapshot
+from my_address_book.codec import convert_pickle_file
+from my_address_book.codec import read_book_file
+from my_address_book.codec import read_snapshot
+from my_address_book.codec import write_snapshot
+from my_address_book.constants import STORAGE_SHARDS
+from my_address_book.storage import atomic_write
+from my_address_book.storage import locked_directory
+from my_address_book.storage import paused_gc
+
+if TYPE_CHECKING:  # the books import this module to save themselves
+    from my_address_book.interface_book import Book
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+
+def is_sharded(path: str) -> bool:
+    """
+    The is_sharded function checks if a book path is a directory of shards: an existing directory
+    or a path ending with a separator (a directory to be created by the first save).
+    """
+    return path.endswith(os.sep) or os.path.isdir(path)
+
+
+def shard_of(key: str, shards: int) -> int:
+    """
+    The shard_of function returns the shard of the record with the key; it does not change between runs.
+    """
+    return zlib.crc32(key.encode()) % shards
+
+
+class ShardedStorage:
+    """
+    Saves and loads a book as shards in a directory.
+
+    Attributes:
+        directory (str): The directory of the shards and the manifest.
+        blob_file (str): The blob file of the long note bodies in the directory (see the blob_store module),
+            named by the manifest once it is read; a full save may move the bodies to a new one.
+        shards (int): The number of shards of a new directory; an existing one keeps the number of its manifest.
+
+    Methods:
+        load(book: Book) -> None:
+            Reads all the shards into the book, in parallel, and sorts it.
+        save(book: Book) -> int:
+            Writes the shards of the records changed since the last load or save and returns their number.
+        refresh(book: Book) -> int:
+            Reads the shards saved by another process since the last load or save and returns their number.
+        map_shard(key: str, kind: int) -> MappedSnapshot | None:
+            Maps the shard holding the key into memory.
+    """
+
+    def __init__(self, directory: str, shards: int = STORAGE_SHARDS):
+        self.directory = os.path.abspath(directory)
+        self.blob_file = os.path.join(self.directory, BLOB_NAME)
+        self.shards = shards
+
+    @property
+    def legacy_file_name(self) -> str:
+        """
+        The book file of the layout before the shards, read when the directory has no manifest.
+        """
+        return self.directory + ".bin"
+
+    def _path(self, file_name: str) -> str:
+        return os.path.join(self.directory, file_name)
+
+    def _read_manifest(self) -> dict[str, Any] | None:
+        try:
+            with open(self._path(MANIFEST_NAME), encoding="utf-8") as file:
+                manifest = json.load(file)
+        except FileNotFoundError:
+            return None
+        if manifest.get("version") != MANIFEST_VERSION:
+            raise ValueError(f"Unknown manifest version {manifest.get('version')} in {self.directory}")
+        self.blob_file = self._path(manifest.get("blob", BLOB_NAME))
+        return manifest
+
+    def _read_shard(self, file_name: str, kind: int) -> list:
+        with open(self._path(file_name), "rb") as file:
+            return list(read_snapshot(file, kind, self.blob_file))
+
+    def _read_shards(self, manifest: dict[str, Any], kind: int) -> list[list]:
+        """
+        The _read_shards function reads the records of all the shards of the manifest in a thread pool.
+        """
+        file_names = [shard["file"] for shard in manifest["files"]]
+        with paused_gc(), ThreadPoolExecutor(max_workers=min(len(file_names), os.cpu_count() or 1) or 1) as executor:
+            return list(executor.map(lambda file_name: self._read_shard(file_name, kind), file_names))
+
+    def load(self, book: "Book") -> None:
+        """
+        The load function reads all the shards into the book in a thread pool and sorts the book once.
+        Without a manifest, the book file before the shards is read if it exists, converted once to a snapshot
+        when it was saved with pickle; otherwise the book stays empty.
+        """
+        manifest = None
+        if os.path.isdir(self.directory):
+            with locked_directory(self.directory, shared=True):
+                manifest = self._read_manifest()
+                if manifest is not None:
+                    if manifest["kind"] != book.snapshot_kind:
+                        raise ValueError(f"The shards in {self.directory} hold another kind of book")
+                    shards = self._read_shards(manifest, book.snapshot_kind)
+        if manifest is None:
+            if os.path.exists(self.legacy_file_name):
+                convert_pickle_file(self.legacy_file_name, book.snapshot_kind)
+                with open(self.legacy_file_name, "rb") as file:
+                    book.update_records(read_book_file(file, book.snapshot_kind, self.legacy_file_name + BLOB_SUFFIX))
+            return
+
+        with paused_gc():
+            book.update_records(item for shard in shards for item in shard)
+            book.sort_book()
+        book.changed_keys, book.added_keys = set(), set()
+        book.shards_directory = self.directory
+        book.snapshot_file = book.snapshot_base = None
+        book.shard_files = [shard["file"] for shard in manifest["files"]]
+
+    def refresh(self, book: "Book") -> int:
+        """
+        The refresh function reads into the book the shards another process has saved since the book last had them,
+        keeping the records not saved yet, and returns their number.
+        """
+        if book.shards_directory != self.directory or book.shard_files is None or not os.path.isdir(self.directory):
+            return 0
+        with locked_directory(self.directory, shared=True):
+            manifest = self._read_manifest()
+            changed_keys = book.changed_keys
+            if manifest is None or changed_keys is None or len(manifest["files"]) != len(book.shard_files):
+                return 0
+            stale = {shard for shard, entry in enumerate(manifest["files"]) if entry["file"] != book.shard_files[shard]}
+            if not stale:
+                return 0
+            items = [
+                (key, record)
+                for shard in sorted(stale)
+                for key, record in self._read_shard(manifest["files"][shard]["file"], book.snapshot_kind)
+                if key not in changed_keys
+            ]
+            stale_keys = [key for key in book.data if key not in changed_keys and shard_of(key, manifest["shards"]) in stale]
+            book.merge_records(stale_keys, items)
+            for shard in stale:
+                book.shard_files[shard] = manifest["files"][shard]["file"]
+        return len(stale)
+
+    def map_shard(self, key: str, kind: int) -> MappedSnapshot | None:
+        """
+        The map_shard function maps the shard that holds the record with the key, if it is in the book,
+        into memory (see codec.MappedSnapshot); None when the directory has no manifest.
+        """
+        if not os.path.isdir(self.directory):
+            return None
+        with locked_directory(self.directory, shared=True):
+            manifest = self._read_manifest()
+            if manifest is None:
+                return None
+            return MappedSnapshot(self._path(manifest["files"][shard_of(key, manifest["shards"])]["file"]), kind, self.blob_file)
+
+    def save(self, book: "Book") -> int:
+        """
+        The save function writes the shards of the records changed since the last load or save (all of them when
+        that is not known), then the manifest, and returns their number; a failed save keeps the changes.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        with locked_directory(self.directory):
+            manifest = self._read_manifest()
+            if manifest is not None and manifest["kind"] != book.snapshot_kind:
+                raise ValueError(f"The shards in {self.directory} hold another kind of book")
+            book.prepare_snapshot(self.blob_file)
+            changed_keys, added_keys = book.take_changes()
+            if book.shards_directory != self.directory:
+                changed_keys, book.shard_files = None, None
+            try:
+                written, shard_files = self._write(book, manifest, changed_keys, book.shard_files, added_keys)
+            except BaseException:
+                book.restore_changes(changed_keys, added_keys)
+                raise
+            book.shards_directory = self.directory
+            book.shard_files = shard_files
+            book.snapshot_file = book.snapshot_base = None
+        return written
+
+    def _write(
+        self,
+        book: "Book",
+        manifest: dict[str, Any] | None,
+        changed_keys: set[str] | None,
+        shard_files: list[str | None] | None,
+        added_keys: set[str],
+    ) -> tuple[int, list[str | None]]:
+        """
+        The _write function writes the changed shards (all of them when changed_keys is None) and returns their number
+        and the new shard_files of the book: None for the shards it does not hold all the records of.
+        """
+        shards = manifest["shards"] if manifest else self.shards
+        files: list[dict[str, Any]] = manifest["files"] if manifest else [{"file": None, "records": 0} for _ in range(shards)]
+        merged: set[int] = set()
+        serial = (manifest["serial"] if manifest else 0) + 1
+        replaced_blob = None
+        if manifest is None or changed_keys is None or shard_files is None or len(shard_files) != shards:
+            records: dict[int, list] = {shard: [] for shard in range(shards)}
+            changed_keys, shard_files = set(), [None] * shards
+            replaced_blob = self._compact(book, serial)
+        else:
+            shard_files = list(shard_files)
+            records, merged = self._merge(book, files, shard_files, changed_keys, added_keys)
+        if not records:
+            return 0, shard_files
+        stale = {shard for shard in merged if files[shard]["file"] != shard_files[shard]}
+        for key, record in book.data.items():
+            shard = shard_of(key, shards)
+            if shard in records and (shard not in stale or key in changed_keys):
+                records[shard].append((key, record))
+
+        self._commit(book.snapshot_kind, serial, files, records)
+        if replaced_blob is not None:
+            self._remove_blob_files(replaced_blob)
+        for shard in records:
+            shard_files[shard] = None if shard in merged else files[shard]["file"]
+        return len(records), shard_files
+
+    def _compact(self, book: "Book", serial: int) -> str | None:
+        """
+        The _compact function lets the book rewrite the blob file to a new one of the save with the serial number
+        (see Book.compact_blob_file), which the manifest then names, and returns the blob file replaced; None if it did not.
+        """
+        new_file = self._path(f"notes-{serial}{BLOB_SUFFIX}")
+        try:
+            os.remove(new_file)  # left by a failed save; the notes were moved back to the blob file by prepare_snapshot
+        except FileNotFoundError:
+            pass
+        if not book.compact_blob_file(self.blob_file, new_file):
+            return None
+        replaced, self.blob_file = self.blob_file, new_file
+        return replaced
+
+    def _remove_blob_files(self, replaced: str) -> None:
+        """
+        The _remove_blob_files function removes the blob files of the directory but the one of the manifest and
+        the one it replaced, which the notes other processes have loaded still read from until they reload them.
+        """
+        for file_name in os.listdir(self.directory):
+            path = self._path(file_name)
+            if file_name.endswith(BLOB_SUFFIX) and path not in (self.blob_file, replaced):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def _commit(self, kind: int, serial: int, files: list[dict[str, Any]], records: dict[int, list]) -> None:
+        """
+        The _commit function writes the records of the shards to new files of the save with the serial number,
+        replaces their entries of files and the manifest, then removes the replaced files.
+        """
+        replaced = []
+        for shard in sorted(records):
+            file_name = f"shard-{shard:03d}-{serial}.bin"
+            with atomic_write(self._path(file_name)) as file:
+                write_snapshot(file, kind, records[shard])
+            if files[shard]["file"]:
+                replaced.append(files[shard]["file"])
+            files[shard] = {"file": file_name, "records": len(records[shard])}
+
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "kind": kind,
+            "shards": len(files),
+            "serial": serial,
+            "blob": os.path.basename(self.blob_file),
+            "files": files,
+        }
+        with atomic_write(self._path(MANIFEST_NAME)) as file:
+            file.write(json.dumps(manifest, indent=1).encode())
+
+        for file_name in replaced:
+            try:
+                os.remove(self._path(file_name))
+            except FileNotFoundError:
+                pass
+
+    def _merge(
+        self,
+        book: "Book",
+        files: list[dict[str, Any]],
+        shard_files: list[str | None],
+        changed_keys: set[str],
+        added_keys: set[str],
+    ) -> tuple[dict[int, list], set[int]]:
+        """
+        The _merge function returns, by shard to write, the records saved by other processes that the book has not
+        changed, and the shards holding records the book does not have; a record under a key both added is moved to Book.free_key.
+        """
+        stale = {shard for shard, entry in enumerate(files) if entry["file"] != shard_files[shard]}
+        records: dict[int, list] = {}
+        moved: list = []
+
+        def saved_records(shard: int) -> list:
+            return self._saved_records(book, files[shard]["file"], changed_keys, added_keys, moved) if shard in stale else []
+
+        for shard in {shard_of(key, len(files)) for key in changed_keys}:
+            records[shard] = saved_records(shard)
+        merged = stale & records.keys()
+        if not moved:
+            return records, merged
+        taken = set(book.data)
+        for shard in stale:
+            with MappedSnapshot(self._path(files[shard]["file"]), book.snapshot_kind) as snapshot:
+                taken.update(snapshot)
+        for record in moved:
+            key = book.free_key(taken)
+            if key is None:  # the records are keyed by a field of theirs: the record of the book replaces the other
+                break
+            taken.add(key)
+            shard = shard_of(key, len(files))
+            if shard not in records:
+                records[shard] = saved_records(shard)
+            records[shard].append((key, record))
+            merged.add(shard)
+        return records, merged
+
+    def _saved_records(self, book: "Book", file_name: str, changed_keys: set[str], added_keys: set[str], moved: list) -> list:
+        """
+        The _saved_records function returns the records of a shard file that the book has not changed,
+        and appends the records under the keys it has also added to moved.
+        """
+        records = []
+        for key, record in self._read_shard(file_name, book.snapshot_kind):
+            if key not in changed_keys:
+                records.append((key, record))
+            elif key in added_keys:
+                moved.append(record)
+        return records
@@ -6,13 +6,17 @@ Functions:
                                                     A decorator function that adds a '+' sign to a phone number.
     sanitize_phone_number(phone: str) -> str: Cleans a phone number by removing unnecessary characters.
     print_all_contacts(addressbook: AB) -> str: Prints all the contacts in an address book in a formatted table.
+    format_tags(tags: Iterable[str]) -> str: Formats the tags of a note as '#tag #tag'.
 """
+from typing import TYPE_CHECKING
 from typing import Callable
+from typing import Iterable
 
-from prettytable import PrettyTable
+if TYPE_CHECKING:  # the books import this module for sanitize_phone_number
+    from my_address_book.address_book import AddressBook as AB
+    from my_address_book.notes_book import NotesBook as NB
 
-from my_address_book.address_book import AddressBook as AB
-from my_address_book.notes_book import NotesBook as NB
+PHONE_JUNK = str.maketrans("", "", "(, ), -, +, x, .")
 
 
 def format_phone_number(func: Callable[..., str]) -> Callable[..., str]:
@@ -32,17 +36,26 @@ def sanitize_phone_number(phone: str) -> str:
     """
     Clean number
     """
-    return "".join(number.strip().strip("(, ), -, +, x, .") for number in phone)
+    return "".join(phone.translate(PHONE_JUNK).split())
 
 
-def print_all_contacts(addressbook: AB) -> str:
+def format_tags(tags: Iterable[str]) -> str:
+    """
+    The format_tags function formats the tags of a note as the search box takes them: '#work #urgent'.
+    """
+    return " ".join(f"#{tag}" for tag in tags)
+
+
+def print_all_contacts(addressbook: "AB") -> str:
     """
     The print_all_contacts function prints all contacts in the addressbook.
 
     :param addressbook: AB: Pass the addressbook to the function
     """
+    from prettytable import PrettyTable  # imported here to keep the headless CLI startup fast
 
     table = PrettyTable()
+    days_to_birthdays = addressbook.days_to_birthdays()
     phone_length = "Phone Number".ljust(25)
     emain_length = "Email".ljust(36)
     table.field_names = [
@@ -83,7 +96,7 @@ def print_all_contacts(addressbook: AB) -> str:
 
         birthday = contact.user.birthday_date.strftime("%d-%m-%Y") if contact.user.birthday_date else "-"
 
-        day_to_birthday = contact.days_to_birthday() if contact.user.birthday_date else "-"
+        day_to_birthday = days_to_birthdays.get(contact_name, "-")
 
         table.add_row(
             [
@@ -99,7 +112,9 @@ def print_all_contacts(addressbook: AB) -> str:
     return str(table)
 
 
-def print_all_notes(notesbook: NB) -> str:
+def print_all_notes(notesbook: "NB") -> str:
+    from prettytable import PrettyTable  # imported here to keep the headless CLI startup fast
+
     table = PrettyTable()
     name_length = "Note name".ljust(21)
     note_length = "Note".ljust(68)
@@ -111,7 +126,10 @@ def print_all_notes(notesbook: NB) -> str:
     for key, record in notesbook.items():
         number_note_for_table = key
         name_note_for_table = record.note.name_note if record.note.name_note else "-"
-        note_for_table = record.note.note
+        if record.note.tags:
+            name_note_for_table += "\n" + format_tags(record.note.tags)
+        # A long note is shown by its preview, so listing the book does not read the blob file.
+        note_for_table = record.note.preview if record.note.blob is None else f"{record.note.preview}..."
         date_note_for_table = "\n".join(str(record.date_of_creation).split())
 
         table.add_row(
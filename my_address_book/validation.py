@@ -13,6 +13,8 @@ Functions:
                                                             Checks if a given name does not exist in the address book.
     check_number_not_in_notes_book(notes_book: NB, number: str) -> None:
                                                             Checks if the number is in the notes book.
+    tags_validation(tags: str) -> None: Verifies the tags of a note, separated by spaces or commas.
+    split_tags(tags: str) -> list[str]: Splits the tags entered for a note.
 """
 import re
 import os
@@ -90,13 +92,31 @@ def note_validation(note: str) -> None:
         raise ValueError(f"Note length must be more {NOTE_LEN}, but got '{note}'")
 
 
+@input_error
+def tags_validation(tags: str) -> None:
+    """
+    The tags_validation function checks that every tag, with or without '#', is made of letters, digits,
+    '_' and '-', so it can be searched for as '#tag'.
+    """
+    for tag in split_tags(tags):
+        if not re.fullmatch(r"#?\w[\w-]*", tag):
+            raise ValueError(f"A tag must be made of letters, digits, '_' and '-', but got '{tag}'")
+
+
+def split_tags(tags: str) -> list[str]:
+    """
+    The split_tags function splits the tags entered for a note at spaces and commas.
+    """
+    return tags.replace(",", " ").split()
+
+
 @input_error
 def check_name_in_address_book(address_book: AB, name: str) -> None:
     """
     The check_name_in_address_book function checks if a name is already in the address book.
         If it is, then an error message will be raised.
     """
-    if name in (name_contact for name_contact in address_book):
+    if name in address_book:
         raise ValueError(f"The contact '{name}' already exists in the address book.")
 
 
@@ -107,7 +127,7 @@ def check_name_not_in_address_book(address_book: AB, name: str) -> None:
         If it is, then a ValueError exception will be raised with an error message explaining that
         the contact already exists in the address book.
     """
-    if name not in (name_contact for name_contact in address_book):
+    if name not in address_book:
         raise KeyError(f"The contact {name} was not found.")
 
 
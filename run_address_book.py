@@ -22,6 +22,7 @@ from my_address_book import (
     MyThemeApp,
     NotesBook as NB,
 )
+from my_address_book.autosave import AutoSave
 
 
 class AddressBookApp(npyscreen.NPSAppManaged):
@@ -33,17 +34,22 @@ class AddressBookApp(npyscreen.NPSAppManaged):
 
     Attributes:
         addressbook (AB): An instance of the AB class, representing the address book.
+        notesbook (NB): An instance of the NB class, representing the notes book.
+        autosave (AutoSave): Saves the changed books in the background; the forms only mark them dirty.
 
     Methods:
         __init__: Initializes the AddressBookApp object.
         onStart: Called when the application starts, sets up the theme, reads records from a file,
         and adds forms to the application.
+        reload_changed: Merges into the books what another instance of the application has saved.
     """
 
     def __init__(self) -> None:
         super().__init__()
         self.addressbook = AB()
+        self.addressbook.index_in_background = True
         self.notesbook = NB()
+        self.autosave = AutoSave()
 
     def onStart(self) -> None:
         """
@@ -117,6 +123,21 @@ class AddressBookApp(npyscreen.NPSAppManaged):
             draw_line=10,
         )
 
+    def reload_changed(self) -> None:
+        """
+        The reload_changed function merges into the books the records another instance of the application
+        has saved to the storage since they were loaded or saved; only the shards it has saved are read,
+        and the changes not saved yet are kept.
+        """
+        self.addressbook.reload_changed(FILE_AB)
+        self.notesbook.reload_changed(FILE_NB)
+
 
 if __name__ == "__main__":
-    AddressBookApp().run()
+    app = AddressBookApp()
+    try:
+        app.run()
+    finally:
+        app.autosave.close()
+        # The saved book gets a fresh index file, so the next start does not rebuild the indexes.
+        app.addressbook.save_indexes(FILE_AB)
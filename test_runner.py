@@ -1,6 +1,8 @@
 """runner"""
 import unittest
 
+from tests import test_autosave
+from tests import test_blob_store
 from tests import test_class_AB
 from tests import test_class_Email
 from tests import test_class_NB
@@ -9,7 +11,19 @@ from tests import test_class_Phone
 from tests import test_class_RecordContact
 from tests import test_class_RecordNote
 from tests import test_class_User
+from tests import test_codec
+from tests import test_cli
+from tests import test_dedupe
+from tests import test_exporter
+from tests import test_importer
+from tests import test_index_store
+from tests import test_indexes
+from tests import test_parallel_search
+from tests import test_query
+from tests import test_search_cache
 from tests import test_utils
+from tests import test_server
+from tests import test_shards
 from tests import test_validation
 
 ABTestSuite = unittest.TestSuite()
@@ -23,6 +37,24 @@ ABTestSuite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(test_utils.
 ABTestSuite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(test_class_Note.TestNote))
 ABTestSuite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(test_class_RecordNote.TestRecordNote))
 ABTestSuite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(test_class_NB.TestNotesBook))
+ABTestSuite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(test_importer.TestImporter))
+ABTestSuite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(test_exporter.TestExporter))
+ABTestSuite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(test_cli.TestCli))
+ABTestSuite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(test_server.TestBookServer))
+ABTestSuite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(test_indexes.TestPhoneIndex))
+ABTestSuite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(test_indexes.TestEmailIndex))
+ABTestSuite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(test_indexes.TestNameIndex))
+ABTestSuite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(test_indexes.TestBirthdayIndex))
+ABTestSuite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(test_indexes.TestTagIndex))
+ABTestSuite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(test_query.TestQuery))
+ABTestSuite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(test_search_cache.TestSearchCache))
+ABTestSuite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(test_parallel_search.TestParallelSearch))
+ABTestSuite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(test_dedupe.TestDedupe))
+ABTestSuite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(test_autosave.TestAutoSave))
+ABTestSuite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(test_codec.TestCodec))
+ABTestSuite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(test_shards.TestShards))
+ABTestSuite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(test_index_store.TestIndexStore))
+ABTestSuite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(test_blob_store.TestBlobStore))
 
 runner = unittest.TextTestRunner(verbosity=2)
 runner.run(ABTestSuite)
@@ -0,0 +1,167 @@
+"""Tests autosave"""
+import os
+import shutil
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from my_address_book.address_book import AddressBook as AB
+from my_address_book.autosave import AutoSave
+from my_address_book.codec import CONTACTS
+from my_address_book.codec import DELTA_SUFFIX
+from my_address_book.codec import read_snapshot
+from my_address_book.entities import User
+from my_address_book.index_store import index_file_name
+from my_address_book.records import RecordContact
+from my_address_book.storage import atomic_write
+
+
+class TestAutoSave(unittest.TestCase):
+    """Tests the atomic saves and the background autosave"""
+
+    def setUp(self) -> None:
+        self.test_file = os.path.join(os.getcwd(), "tests", "test_autosave.bin")
+        self.addressbook_test = AB()
+        self.addressbook_test.add_record(RecordContact(User("sasha")))
+        self.autosave = AutoSave(delay=60)
+
+    def tearDown(self) -> None:
+        self.autosave.close()
+        for file_name in (self.test_file, self.test_file + DELTA_SUFFIX, index_file_name(self.test_file)):
+            if os.path.exists(file_name):
+                os.remove(file_name)
+        del self.addressbook_test
+
+    def read_names(self) -> list[str]:
+        with open(self.test_file, "rb") as file:
+            return [name for name, _ in read_snapshot(file, CONTACTS)]
+
+    def test_atomic_write(self) -> None:
+        """
+        The test_atomic_write function tests that a failed write leaves the old file and no temporary file.
+        """
+        self.addressbook_test.save_records_to_file(self.test_file)
+        with self.assertRaises(ValueError):
+            with atomic_write(self.test_file) as file:
+                file.write(b"half of a book")
+                raise ValueError("Interrupted")
+
+        self.assertEqual(self.read_names(), ["sasha"])
+        self.assertEqual([name for name in os.listdir(os.path.dirname(self.test_file)) if name.endswith(".tmp")], [])
+
+    @unittest.skipIf(os.name != "posix", "POSIX permissions")
+    def test_atomic_write_mode(self) -> None:
+        """
+        The test_atomic_write_mode function tests that a new file gets the permissions of the umask
+        and a replaced file keeps its permissions.
+        """
+        umask = os.umask(0o022)
+        try:
+            self.addressbook_test.save_records_to_file(self.test_file)
+        finally:
+            os.umask(umask)
+        self.assertEqual(os.stat(self.test_file).st_mode & 0o777, 0o644)
+
+        os.chmod(self.test_file, 0o640)
+        with atomic_write(self.test_file) as file:
+            file.write(b"")
+        self.assertEqual(os.stat(self.test_file).st_mode & 0o777, 0o640)
+
+    def test_coalesced_save(self) -> None:
+        """
+        The test_coalesced_save function tests that marking a book dirty returns at once
+        and the edits made within the delay are saved once.
+        """
+        self.autosave.delay = 0.05
+        for name in ("olena", "anna", "petro"):
+            self.addressbook_test.add_record(RecordContact(User(name)))
+            self.autosave.mark_dirty(self.addressbook_test, self.test_file)
+        self.assertFalse(os.path.exists(self.test_file))
+
+        deadline = time.monotonic() + 5
+        while self.autosave.saves == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.autosave.saves, 1)
+        self.assertEqual(self.read_names(), ["anna", "olena", "petro", "sasha"])
+
+    def test_flush(self) -> None:
+        self.autosave.mark_dirty(self.addressbook_test, self.test_file)
+        self.autosave.flush()
+        self.assertEqual(self.read_names(), ["sasha"])
+        self.autosave.flush()
+        self.assertEqual(self.autosave.saves, 1)
+
+    def test_changed_during_save(self) -> None:
+        """
+        The test_changed_during_save function tests that a book changed while it is written is not put on the disk
+        and stays dirty.
+        """
+        self.addressbook_test.save_records_to_file(self.test_file)
+        write_records = AB.write_records
+
+        def write_and_change(book: AB, file) -> None:
+            write_records(book, file)
+            book.mark_changed()
+
+        self.autosave.mark_dirty(self.addressbook_test, self.test_file)
+        self.addressbook_test.add_record(RecordContact(User("olena")))
+        with patch.object(AB, "write_records", autospec=True, side_effect=write_and_change):
+            self.autosave.flush()
+        self.assertEqual((self.autosave.saves, self.read_names()), (0, ["sasha"]))
+
+        self.autosave.flush()
+        self.assertEqual((self.autosave.saves, self.read_names()), (1, ["olena", "sasha"]))
+
+    def test_sharded_save(self) -> None:
+        """
+        The test_sharded_save function tests that a book kept in shards is saved to its changed shards.
+        """
+        directory = os.path.join(os.getcwd(), "tests", "test_autosave", "")
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.addressbook_test.save_records_to_file(directory)
+        self.addressbook_test.add_record(RecordContact(User("olena")))
+        self.autosave.mark_dirty(self.addressbook_test, directory)
+        self.autosave.flush()
+
+        addressbook = AB()
+        addressbook.read_records_from_file(directory)
+        self.assertEqual((self.autosave.saves, list(addressbook.data)), (1, ["olena", "sasha"]))
+        self.assertEqual(self.addressbook_test.changed_keys, set())
+
+    def test_changed_while_keys_taken(self) -> None:
+        """
+        The test_changed_while_keys_taken function tests that a change made in another thread while a save takes
+        the changed keys waits for them to be taken, so it is left for the next save.
+        """
+        directory = os.path.join(os.getcwd(), "tests", "test_autosave", "")
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.addressbook_test.save_records_to_file(directory)
+        self.addressbook_test.add_record(RecordContact(User("olena")))
+        collect_dirty_records = AB.collect_dirty_records
+        changes = []
+
+        def collect_and_change(book: AB) -> None:
+            changes.append(threading.Thread(target=book.mark_changed, args=("sasha",)))
+            changes[0].start()
+            changes[0].join(0.05)
+            self.assertTrue(changes[0].is_alive())
+            collect_dirty_records(book)
+
+        with patch.object(AB, "collect_dirty_records", autospec=True, side_effect=collect_and_change):
+            self.addressbook_test.save_records_to_file(directory)
+        changes[0].join()
+        self.assertEqual(self.addressbook_test.changed_keys, {"sasha"})
+
+    def test_batch_not_saved(self) -> None:
+        with self.addressbook_test.batch():
+            self.addressbook_test.add_record(RecordContact(User("olena")))
+            self.autosave.mark_dirty(self.addressbook_test, self.test_file)
+            self.autosave.flush()
+            self.assertFalse(os.path.exists(self.test_file))
+        self.autosave.flush()
+        self.assertEqual(self.read_names(), ["olena", "sasha"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,179 @@
+"""Tests blob_store"""
+import json
+import os
+import shutil
+import unittest
+from unittest.mock import patch
+
+from my_address_book.blob_store import BLOB_MAGIC
+from my_address_book.blob_store import BLOB_NAME
+from my_address_book.blob_store import BLOB_SUFFIX
+from my_address_book.blob_store import BlobHandle
+from my_address_book.blob_store import BlobWriter
+from my_address_book.codec import DELTA_SUFFIX
+from my_address_book.constants import NOTE_PREVIEW_LENGTH
+from my_address_book.entities import Note
+from my_address_book.exporter import iter_notes
+from my_address_book.notes_book import NotesBook as NB
+from my_address_book.records import RecordNote
+from my_address_book.shards import MANIFEST_NAME
+from my_address_book.utils import print_all_notes
+
+
+class TestBlobStore(unittest.TestCase):
+    """Tests the note bodies saved out of line"""
+
+    def setUp(self) -> None:
+        self.test_file = os.path.join(os.getcwd(), "tests", "test_blob_store.bin")
+        self.test_dir = os.path.join(os.getcwd(), "tests", "test_blob_store", "")
+        self.long_text = "A long note about the meeting. " * 100
+        self.notesbook_test = NB()
+        self.notesbook_test.add_record(RecordNote(Note("a short note")))
+        self.notesbook_test.add_record(RecordNote(Note(self.long_text)))
+
+    def tearDown(self) -> None:
+        for file_name in (self.test_file, self.test_file + DELTA_SUFFIX, self.test_file + BLOB_SUFFIX):
+            if os.path.exists(file_name):
+                os.remove(file_name)
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+        del self.notesbook_test
+
+    def read_book(self, file_name: str) -> NB:
+        notesbook = NB()
+        notesbook.read_records_from_file(file_name)
+        return notesbook
+
+    def test_blob_writer(self) -> None:
+        """
+        The test_blob_writer function tests that the bodies are appended after the header and read back,
+        the long ones compressed.
+        """
+        blob_file = self.test_file + BLOB_SUFFIX
+        with BlobWriter(blob_file) as writer:
+            short = writer.append("короткий текст")
+            long = writer.append(self.long_text)
+        with BlobWriter(blob_file) as writer:
+            appended = writer.append("one more")
+
+        self.assertEqual(short, BlobHandle(blob_file, len(BLOB_MAGIC), len("короткий текст".encode()), False))
+        self.assertTrue(long.compressed)
+        self.assertLess(long.length, len(self.long_text))
+        self.assertEqual(appended.offset, long.offset + long.length)
+        self.assertEqual([short.read(), long.read(), appended.read()], ["короткий текст", self.long_text, "one more"])
+        with open(blob_file, "rb") as file:
+            self.assertEqual(file.read(len(BLOB_MAGIC)), BLOB_MAGIC)
+
+    def test_lazy_body(self) -> None:
+        """
+        The test_lazy_body function tests that a long note is saved out of line, read with its preview only
+        and loaded from the blob file when it is used.
+        """
+        self.notesbook_test.save_records_to_file(self.test_file)
+        self.assertLess(os.path.getsize(self.test_file), len(self.long_text) // 2)
+
+        notesbook = self.read_book(self.test_file)
+        short, long = notesbook.get_record("1").note, notesbook.get_record("2").note
+        self.assertIsNone(short.blob)
+        self.assertEqual(short.note, "a short note")
+        with patch.object(BlobHandle, "read", side_effect=AssertionError("the body was read")):
+            self.assertEqual(long.preview, self.long_text[:NOTE_PREVIEW_LENGTH])
+            self.assertTrue(f"{self.long_text[:NOTE_PREVIEW_LENGTH]}..." in print_all_notes(notesbook))
+        self.assertEqual(long.note, self.long_text)
+        self.assertEqual(long.preview, self.long_text[:NOTE_PREVIEW_LENGTH])
+
+    def test_scan_keeps_bodies_unloaded(self) -> None:
+        """
+        The test_scan_keeps_bodies_unloaded function tests that searching and exporting the notes read
+        the long notes from the blob file without keeping them in memory.
+        """
+        self.notesbook_test.get_record("2").add_tags("work")
+        self.notesbook_test.save_records_to_file(self.test_file)
+        notesbook = self.read_book(self.test_file)
+        long = notesbook.get_record("2").note
+
+        self.assertEqual(list(notesbook.search("meeting")), ["1"])
+        self.assertEqual(list(notesbook.search("#work about")), ["2"])
+        self.assertTrue(self.long_text in "".join(iter_notes(notesbook, "jsonl")))
+        self.assertTrue(self.long_text in "".join(iter_notes(notesbook, "csv")))
+        self.assertEqual(long.preview, self.long_text[:NOTE_PREVIEW_LENGTH])
+        self.assertFalse(long._loaded)
+        self.assertEqual(long.note, self.long_text)
+
+    def test_search_reads_undecided_bodies(self) -> None:
+        """
+        The test_search_reads_undecided_bodies function tests that a search reads the long notes from the blob file
+        only when their previews do not match.
+        """
+        self.notesbook_test.add_record(RecordNote(Note(self.long_text + "Signed by Olena.")))
+        self.notesbook_test.save_records_to_file(self.test_file)
+        notesbook = self.read_book(self.test_file)
+        long, signed = notesbook.get_record("2").note, notesbook.get_record("3").note
+
+        with patch.object(BlobHandle, "read", autospec=True, side_effect=BlobHandle.read) as read:
+            self.assertEqual([record.note.blob for record in notesbook.search("about").values()], [long.blob, signed.blob])
+            self.assertEqual(read.call_count, 0)
+            self.assertEqual([record.note.blob for record in notesbook.search("olena").values()], [signed.blob])
+            self.assertEqual(read.call_count, 2)
+        self.assertEqual(len(notesbook.search("nothing")), 0)
+
+    def test_changed_body(self) -> None:
+        """
+        The test_changed_body function tests that a changed long note is appended again and a note
+        that became short is kept inline.
+        """
+        self.notesbook_test.save_records_to_file(self.test_file)
+        notesbook = self.read_book(self.test_file)
+        blob = notesbook.get_record("2").note.blob
+        notesbook.get_record("2").add_note(self.long_text + "Added.")
+        self.assertIsNone(notesbook.get_record("2").note.blob)
+        notesbook.save_records_to_file(self.test_file)
+        self.assertGreater(notesbook.get_record("2").note.blob.offset, blob.offset)
+
+        notesbook = self.read_book(self.test_file)
+        self.assertEqual(notesbook.get_record("2").note.note, self.long_text + "Added.")
+        notesbook.get_record("2").add_note("short now")
+        notesbook.save_records_to_file(self.test_file)
+        self.assertIsNone(self.read_book(self.test_file).get_record("2").note.blob)
+
+    def test_shards(self) -> None:
+        """
+        The test_shards function tests that a notes book in shards keeps its long notes in the blob file
+        of its directory, and that a book saved elsewhere copies its bodies to the blob file there.
+        """
+        self.notesbook_test.save_records_to_file(self.test_file)
+        notesbook = self.read_book(self.test_file)
+        notesbook.save_records_to_file(self.test_dir)
+        self.assertTrue(os.path.exists(os.path.join(self.test_dir, BLOB_NAME)))
+        os.remove(self.test_file + BLOB_SUFFIX)
+
+        notesbook = self.read_book(self.test_dir)
+        self.assertEqual(notesbook.get_record("2").note.blob.file_name, os.path.join(os.path.abspath(self.test_dir), BLOB_NAME))
+        self.assertEqual(notesbook.get_record("2").note.note, self.long_text)
+
+    def test_compaction(self) -> None:
+        """
+        The test_compaction function tests that a full save of a directory rewrites the blob file once most of it
+        holds the bodies of changed notes, keeping the blob file it replaced for the notes loaded from it.
+        """
+        self.notesbook_test.save_records_to_file(self.test_dir)
+        for number in range(3):
+            self.notesbook_test.get_record("2").add_note(self.long_text + str(number))
+            self.notesbook_test.save_records_to_file(self.test_dir)
+        blob_file = os.path.join(os.path.abspath(self.test_dir), BLOB_NAME)
+        size = os.path.getsize(blob_file)
+        stale = self.read_book(self.test_dir)
+
+        self.notesbook_test.delete_record("1")
+        self.notesbook_test.add_record(RecordNote(Note("a short note")))  # renumbers the notes: a full save
+        self.notesbook_test.save_records_to_file(self.test_dir)
+        with open(os.path.join(self.test_dir, MANIFEST_NAME), encoding="utf-8") as file:
+            compacted = os.path.join(os.path.abspath(self.test_dir), json.load(file)["blob"])
+        self.assertNotEqual(compacted, blob_file)
+        self.assertLess(os.path.getsize(compacted), size // 2)
+        self.assertEqual(self.notesbook_test.get_record("1").note.blob.file_name, compacted)
+        self.assertEqual(self.read_book(self.test_dir).get_record("1").note.note, self.long_text + "2")
+        self.assertEqual(stale.get_record("2").note.note, self.long_text + "2")
+
+
+if __name__ == "__main__":
+    unittest.main()
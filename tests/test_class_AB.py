@@ -2,12 +2,21 @@
 import os
 import pickle
 import unittest
+from datetime import date
 from datetime import datetime
+from datetime import timedelta
+from unittest.mock import patch
 
 from my_address_book.address_book import AddressBook as AB
+from my_address_book.codec import CONTACTS
+from my_address_book.codec import DELTA_SUFFIX
+from my_address_book.codec import SnapshotError
+from my_address_book.codec import convert_pickle_file
+from my_address_book.codec import read_snapshot
 from my_address_book.entities import Email
 from my_address_book.entities import Phone
 from my_address_book.entities import User
+from my_address_book.index_store import index_file_name
 from my_address_book.records import RecordContact
 
 
@@ -28,8 +37,9 @@ class TestAddressBook(unittest.TestCase):
         self.test_file = os.path.join(current_dir, "tests", "test_file.bin")
 
     def tearDown(self) -> None:
-        if os.path.exists(self.test_file):
-            os.remove(self.test_file)
+        for file_name in (self.test_file, self.test_file + DELTA_SUFFIX, index_file_name(self.test_file)):
+            if os.path.exists(file_name):
+                os.remove(file_name)
         del self.addressbook_test
         del self.record_test
         del self.user_test
@@ -137,6 +147,176 @@ class TestAddressBook(unittest.TestCase):
         addressbook_search = self.addressbook_test.search("1111")
         self.assertTrue(0 == len(addressbook_search))
 
+    def test_lookup_phone(self) -> None:
+        """
+        The test_lookup_phone function tests the caller ID lookup in AddressBook.py: the index follows
+        add_phone_number on a record of the book and forgets a deleted record.
+        """
+        self.addressbook_test.add_record(self.record_test)
+        self.assertEqual(self.addressbook_test.lookup_phone("+38 095 123 45 67"), [self.record_test])
+
+        self.record_test.add_phone_number(Phone("0441234567"))
+        self.assertEqual(self.addressbook_test.lookup_phone("+380441234567"), [self.record_test])
+
+        self.addressbook_test.delete_record("sasha")
+        self.assertEqual(self.addressbook_test.lookup_phone("380951234567"), [])
+
+    def test_search_email_domain(self) -> None:
+        """
+        The test_search_email_domain function tests the '@domain' search in AddressBook.py: the email index
+        follows add_email on a record of the book and the deletion of a record.
+        """
+        self.addressbook_test.add_record(self.record_test)
+        self.assertTrue("sasha" in self.addressbook_test.search("@gmail.com"))
+
+        self.record_test.add_email(Email("sasha@work.corp.com"))
+        self.assertTrue("sasha" in self.addressbook_test.search("@corp.com"))
+
+        self.addressbook_test.delete_record("sasha")
+        self.assertEqual(len(self.addressbook_test.search("@gmail.com")), 0)
+
+    def test_fuzzy_search(self) -> None:
+        """
+        The test_fuzzy_search function tests that the '~name' search in AddressBook.py finds a name with a typo.
+        """
+        self.addressbook_test.add_record(self.record_test)
+        self.assertEqual(len(self.addressbook_test.search("sahsa")), 0)
+        self.assertTrue("sasha" in self.addressbook_test.search("~sahsa"))
+
+        self.addressbook_test.delete_record("sasha")
+        self.assertEqual(len(self.addressbook_test.fuzzy_search("sahsa")), 0)
+
+    def test_search_transliterated(self) -> None:
+        """
+        The test_search_transliterated function tests that a name is found by its Cyrillic and its Latin spelling.
+        """
+        self.addressbook_test.add_record(RecordContact(User("Олександр")))
+        self.addressbook_test.add_record(RecordContact(User("Yulia")))
+        self.assertTrue("Олександр" in self.addressbook_test.search("Oleks"))
+        self.assertTrue("Олександр" in self.addressbook_test.search("олекс"))
+        self.assertTrue("Yulia" in self.addressbook_test.search("Юл"))
+        self.assertEqual(len(self.addressbook_test.search("Петро")), 0)
+
+    def test_days_to_birthdays(self) -> None:
+        """
+        The test_days_to_birthdays function tests that the days to the birthdays are computed for the whole book
+        and computed again when a birthday is changed.
+        """
+        self.addressbook_test.add_record(self.record_test)
+        self.addressbook_test.add_record(RecordContact(User("olena")))
+        self.assertEqual(list(self.addressbook_test.days_to_birthdays()), ["sasha"])
+
+        self.record_test.add_birthday((date.today() + timedelta(days=5)).replace(year=1992))
+        self.assertEqual(self.addressbook_test.days_to_birthdays(), {"sasha": 5})
+        self.assertEqual(list(self.addressbook_test.search("-5")), ["sasha"])
+        self.assertEqual(len(self.addressbook_test.search("-4")), 0)
+
+    def test_search_cache(self) -> None:
+        """
+        The test_search_cache function tests that a repeated search is answered from the cache
+        and that a change of the book or of a record of it makes the search run again.
+        """
+        self.addressbook_test.add_record(self.record_test)
+        first = self.addressbook_test.search("name:sasha")
+        self.assertIs(self.addressbook_test.search("name:sasha  "), first)
+        self.assertEqual((self.addressbook_test.search_cache.hits, self.addressbook_test.search_cache.misses), (1, 1))
+
+        generation = self.addressbook_test.generation
+        self.record_test.add_phone_number(Phone("380501112233"))
+        self.assertTrue(self.addressbook_test.generation > generation)
+        self.assertTrue("sasha" in self.addressbook_test.search("phone:38050"))
+
+        self.addressbook_test.delete_record("sasha")
+        self.assertEqual(len(self.addressbook_test.search("name:sasha")), 0)
+        self.assertEqual(self.addressbook_test.search_cache.hits, 1)
+
+    def test_rename(self) -> None:
+        """
+        The test_rename function tests that a contact renamed in place is moved to its new name in the book,
+        its indexes and its differential snapshot.
+        """
+        self.addressbook_test.add_record(self.record_test)
+        for number in range(10):
+            self.addressbook_test.add_record(RecordContact(User(f"olena {number}")))
+        self.addressbook_test.save_records_to_file(self.test_file)
+
+        self.user_test.name = "oleksandr"
+        self.assertEqual(list(self.addressbook_test.data)[:2], ["oleksandr", "olena 0"])
+        self.assertEqual(len(self.addressbook_test.search("name:sasha")), 0)
+        self.assertEqual(list(self.addressbook_test.search("name:oleksandr")), ["oleksandr"])
+        self.assertEqual(self.addressbook_test.lookup_phone("0951234567"), [self.record_test])
+        self.assertEqual(self.addressbook_test.changed_keys, {"sasha", "oleksandr"})
+
+        self.addressbook_test.save_records_to_file(self.test_file)
+        self.assertTrue(os.path.exists(self.test_file + DELTA_SUFFIX))
+        addressbook = AB()
+        addressbook.read_records_from_file(self.test_file)
+        self.assertEqual(list(addressbook.data)[:2], ["oleksandr", "olena 0"])
+        self.assertFalse("sasha" in addressbook)
+
+    def test_lookup_phone_after_read(self) -> None:
+        """
+        The test_lookup_phone_after_read function tests that the phone index is rebuilt when the book is read.
+        """
+        self.addressbook_test.add_record(self.record_test)
+        self.addressbook_test.save_records_to_file(self.test_file)
+
+        addressbook = AB()
+        addressbook.read_records_from_file(self.test_file)
+        self.assertEqual(addressbook.lookup_phone("0951234567")[0].user.name, "sasha")
+
+    def test_batch(self) -> None:
+        """
+        The test_batch function tests that the changes of a batch are searchable at once,
+        and that the book is sorted and saved once when the batch ends.
+        """
+        with patch.object(AB, "save_records_to_file", autospec=True, side_effect=AB.save_records_to_file) as save:
+            with self.addressbook_test.batch(self.test_file):
+                for name in ("olena", "sasha", "anna"):
+                    record = RecordContact(User(name))
+                    self.addressbook_test.add_record(record)
+                    record.add_phone_number(Phone(f"+38067{len(name)}{len(self.addressbook_test.data)}00000"))
+                self.assertEqual(list(self.addressbook_test.data), ["olena", "sasha", "anna"])
+                self.assertEqual(list(self.addressbook_test.search("name:an")), ["anna"])
+
+                with self.addressbook_test.batch(self.test_file):
+                    self.addressbook_test.delete_record("olena")
+                save.assert_not_called()
+
+        self.assertEqual(save.call_count, 1)
+        self.assertEqual(list(self.addressbook_test.data), ["anna", "sasha"])
+        self.assertEqual([record.user.name for record in self.addressbook_test.lookup_phone("+380674300000")], ["anna"])
+
+        addressbook = AB()
+        addressbook.read_records_from_file(self.test_file)
+        self.assertEqual(list(addressbook.data), ["anna", "sasha"])
+
+    def test_batch_rollback(self) -> None:
+        """
+        The test_batch_rollback function tests that an exception in a batch restores the added, deleted
+        and changed contacts and their indexes, and that the book is not saved.
+        """
+        self.addressbook_test.add_record(self.record_test)
+        self.addressbook_test.add_record(RecordContact(User("olena")))
+
+        with self.assertRaises(RuntimeError):
+            with self.addressbook_test.batch(self.test_file):
+                self.addressbook_test.add_record(RecordContact(User("anna")))
+                self.addressbook_test.delete_record("olena")
+                self.record_test.add_phone_number(Phone("+380671112233"))
+                self.record_test.add_birthday(datetime(1990, 1, 1))
+                raise RuntimeError("Interrupted")
+
+        self.assertEqual(list(self.addressbook_test.data), ["olena", "sasha"])
+        self.assertEqual([phone.subrecord.phone for phone in self.record_test.phone_numbers], ["380951234567"])
+        self.assertEqual(self.record_test.user.birthday_date, datetime(1982, 6, 26))
+        self.assertEqual(self.addressbook_test.lookup_phone("+380671112233"), [])
+        self.assertEqual(list(self.addressbook_test.search("name:anna")), [])
+        self.assertFalse(os.path.exists(self.test_file))
+
+        self.record_test.add_email(Email("sasha@corp.com"))
+        self.assertEqual(list(self.addressbook_test.search("@corp.com")), ["sasha"])
+
     def test_save_records_to_file(self) -> None:
         """
         The test_save_records_to_file function tests the save_records_to_file function in AddressBook.py
@@ -148,7 +328,7 @@ class TestAddressBook(unittest.TestCase):
         self.addressbook_test.save_records_to_file(self.test_file)
 
         with open(self.test_file, "rb") as file:
-            content = pickle.load(file)
+            content = dict(read_snapshot(file, CONTACTS))
             self.assertTrue("sasha" in content)
 
     def test_read_records_from_file(self) -> None:
@@ -156,11 +336,15 @@ class TestAddressBook(unittest.TestCase):
         The test_read_records_from_file function tests the read_records_from_file function in AddressBook.py
             by creating a test file, adding a record to it, and then reading that record from the file into
             an addressbook object. The test passes if 'Sasha' is in the addressbook object.
+            A file saved with pickle is read only after it has been converted.
         """
         with open(self.test_file, "wb") as file:
             self.addressbook_test.add_record(self.record_test)
             pickle.dump(self.addressbook_test, file)
 
+        with self.assertRaises(SnapshotError):
+            AB().read_records_from_file(self.test_file)
+        convert_pickle_file(self.test_file, CONTACTS)
         self.addressbook_test.read_records_from_file(self.test_file)
 
         self.assertTrue("sasha" in self.addressbook_test)
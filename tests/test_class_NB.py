@@ -1,9 +1,12 @@
 """Test class NoteBook"""
 import unittest
+from datetime import date
 from datetime import datetime
+from datetime import timedelta
 
 from my_address_book.entities import Note
 from my_address_book.notes_book import NotesBook as NB
+from my_address_book.query import QueryError
 from my_address_book.records import RecordNote
 
 
@@ -29,6 +32,77 @@ class TestNotesBook(unittest.TestCase):
         record_note: RecordNote = self.notesbook_test.get_record("1")
         self.assertEqual(record_note.note.name_note, "name note")
 
+    def test_search_cache(self) -> None:
+        """
+        The test_search_cache function tests that a repeated search of notes is cached until a note is added.
+        """
+        self.notesbook_test.add_record(self.record_test)
+        first = self.notesbook_test.search("some")
+        self.assertIs(self.notesbook_test.search("some"), first)
+
+        self.notesbook_test.add_record(RecordNote(Note("some more")))
+        self.assertEqual(len(self.notesbook_test.search("some")), 2)
+        self.assertEqual((self.notesbook_test.search_cache.hits, self.notesbook_test.search_cache.misses), (1, 2))
+
+    def test_note_changes(self) -> None:
+        """
+        The test_note_changes function tests that a note changed in place is searched again
+        and updates the tag index.
+        """
+        self.notesbook_test.add_record(self.record_test)
+        self.assertEqual(len(self.notesbook_test.search("other")), 0)
+        self.assertEqual(len(self.notesbook_test.search("#work")), 0)
+        generation = self.notesbook_test.generation
+
+        self.record_test.add_note("other text")
+        self.assertTrue(self.notesbook_test.generation > generation)
+        self.assertEqual(len(self.notesbook_test.search("other")), 1)
+
+        self.record_test.add_tags("work")
+        self.assertEqual(list(self.notesbook_test.search("#work")), ["1"])
+        self.note_test.tags = ["home"]
+        self.assertEqual(len(self.notesbook_test.search("#work")), 0)
+        self.assertEqual(self.notesbook_test.tag_counts(), {"home": 1})
+
+        self.notesbook_test.delete_record("1")
+        generation = self.notesbook_test.generation
+        self.record_test.add_note_name("detached")
+        self.assertEqual(self.notesbook_test.generation, generation)
+
+    def test_batch_rollback(self) -> None:
+        """
+        The test_batch_rollback function tests that an exception in a batch restores the notes as they were.
+        """
+        self.notesbook_test.add_record(self.record_test)
+        with self.assertRaises(RuntimeError):
+            with self.notesbook_test.batch():
+                self.notesbook_test.add_record(RecordNote(Note("some more")))
+                self.notesbook_test.delete_record("1")
+                raise RuntimeError("Interrupted")
+
+        self.assertEqual(list(self.notesbook_test.data.values()), [self.record_test])
+        self.assertEqual(len(self.notesbook_test.search("some")), 1)
+
+    def test_batch_rollback_edited_note(self) -> None:
+        """
+        The test_batch_rollback_edited_note function tests that a failed batch restores a note edited in place.
+        """
+        self.notesbook_test.add_record(self.record_test)
+        self.assertEqual(len(self.notesbook_test.search("#work")), 0)
+        with self.assertRaises(RuntimeError):
+            with self.notesbook_test.batch():
+                self.record_test.add_note("other text")
+                self.notesbook_test.tag_note("1", "work")
+                raise RuntimeError("Interrupted")
+
+        record = self.notesbook_test.get_record("1")
+        self.assertEqual((record.note.note, record.note.name_note, record.note.tags), ("some text", "name note", ()))
+        self.assertEqual(len(self.notesbook_test.search("other")), 0)
+        self.assertEqual(len(self.notesbook_test.search("#work")), 0)
+
+        record.add_note("changed after the batch")
+        self.assertEqual(len(self.notesbook_test.search("changed")), 1)
+
     def test_search_note(self) -> None:
         """
         The test_search_note function tests the search function in NotesBook.py
@@ -75,6 +149,73 @@ class TestNotesBook(unittest.TestCase):
         record_note: RecordNote = notesbook_search.get_record("1")
         self.assertTrue(time in record_note.date_of_creation)
 
+    def test_creation_index(self) -> None:
+        """
+        The test_creation_index function tests the notes found by their time of creation: a range of days,
+        the last days and the newest first, also after a deletion renumbers the notes.
+        """
+        today = datetime.combine(date.today(), datetime.min.time())
+        for days_ago in (40, 10, 3, 0):
+            record = RecordNote(Note(f"{days_ago} days ago"))
+            record.created = int((today - timedelta(days=days_ago)).timestamp()) + 1
+            self.notesbook_test.add_record(record)
+        unknown = RecordNote(Note("unknown"))
+        unknown.created = None
+        self.notesbook_test.add_record(unknown)
+
+        notes = self.notesbook_test.created_between(date.today() - timedelta(days=10), date.today() - timedelta(days=3))
+        self.assertEqual(list(notes.data), ["2", "3"])
+        notes = self.notesbook_test.created_in_last_days(4)
+        self.assertEqual([record.note.note for record in notes.values()], ["3 days ago", "0 days ago"])
+        self.assertEqual(list(self.notesbook_test.newest_first().data), ["4", "3", "2", "1", "5"])
+        self.assertEqual(list(self.notesbook_test.newest_first(2).data), ["4", "3"])
+
+        self.notesbook_test.delete_record("2")
+        self.assertEqual(list(self.notesbook_test.newest_first().data), ["4", "3", "1", "5"])
+        self.notesbook_test.add_record(RecordNote(Note("now")))
+        self.assertEqual([record.note.note for record in self.notesbook_test.newest_first(2).values()], ["now", "0 days ago"])
+
+        day = (date.today() - timedelta(days=3)).strftime("%d-%m-%Y")
+        self.assertEqual([record.note.note for record in self.notesbook_test.search(f"created:{day}").values()], ["3 days ago"])
+        self.assertEqual(len(self.notesbook_test.search(f"created:..{day}")), 2)
+        self.assertEqual(len(self.notesbook_test.search("last:1")), 2)
+        self.assertEqual(len(self.notesbook_test.search("created:31-02-2024")), 0)
+
+    def test_tag_query(self) -> None:
+        """
+        The test_tag_query function tests the notes found by combinations of tags and words, also after
+        a deletion renumbers the notes and after a note is tagged in the book.
+        """
+        for text, tags in (
+            ("meeting with ann", ["work", "urgent"]),
+            ("meeting notes", ["#Work", "done", "urgent"]),
+            ("buy milk", ["home"]),
+            ("no tags", []),
+        ):
+            record = RecordNote(Note(text))
+            record.add_tags(*tags)
+            self.notesbook_test.add_record(record)
+
+        self.assertEqual(list(self.notesbook_test.search("#work AND #urgent NOT #done")), ["1"])
+        self.assertEqual(list(self.notesbook_test.search("#work OR #home")), ["1", "2", "3"])
+        self.assertEqual(list(self.notesbook_test.search("NOT #work")), ["3", "4"])
+        self.assertEqual(list(self.notesbook_test.search("#urgent meeting NOT #done")), ["1"])
+        self.assertEqual(list(self.notesbook_test.search("(#home OR #done) milk")), ["3"])
+        self.assertEqual(list(self.notesbook_test.search("#unknown")), [])
+        self.assertEqual(self.notesbook_test.tag_counts(), {"done": 1, "home": 1, "urgent": 2, "work": 2})
+        with self.assertRaises(QueryError):
+            self.notesbook_test.search("#work AND")
+
+        self.notesbook_test.delete_record("1")
+        self.assertEqual(list(self.notesbook_test.search("#work")), ["2"])
+        self.notesbook_test.add_record(RecordNote(Note("after the deletion")))
+        self.assertEqual(list(self.notesbook_test.search("#home")), ["2"])
+        self.notesbook_test.tag_note("4", "#home")
+        self.assertEqual(list(self.notesbook_test.search("#home")), ["2", "4"])
+        self.notesbook_test.untag_note("2", "HOME")
+        self.assertEqual(list(self.notesbook_test.search("#home")), ["4"])
+        self.assertTrue(self.notesbook_test._tag_index.generation == self.notesbook_test.generation)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -41,6 +41,14 @@ class TestNote(unittest.TestCase):
         """
         self.assertEqual(self.note_test.name_note, "name note")
 
+    def test_set_tags(self) -> None:
+        """
+        The test_set_tags function tests that the tags of a note are kept once each, without the '#', casefolded and sorted.
+        """
+        self.assertEqual(self.note_test.tags, ())
+        self.note_test.tags = ["#Work", "urgent", "work", " ", "#"]
+        self.assertEqual(self.note_test.tags, ("urgent", "work"))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -50,6 +50,34 @@ class TestRecordContact(unittest.TestCase):
         self.record_test.add_birthday(datetime(1982, 6, 26))
         self.assertEqual(self.record_test.user.birthday_date, datetime(1982, 6, 26))
 
+    def test_dirty_tracking(self) -> None:
+        """
+        The test_dirty_tracking function tests that a change of the record or of its entities marks the record dirty
+        and increases its version, and that a rolled back batch gives the entities back to the restored record.
+        """
+        from my_address_book.address_book import AddressBook as AB
+
+        record = RecordContact(User("Olena"))
+        self.assertEqual((record.version, record.dirty), (0, False))
+        record.add_phone_number(Phone("380501112233"))
+        record.phone_numbers[0].subrecord.phone = "380501112234"
+        record.add_birthday(datetime(1990, 1, 2))
+        record.user.birthday_date = datetime(1990, 1, 3)
+        self.assertEqual((record.version, record.dirty), (4, True))
+
+        addressbook = AB()
+        addressbook.add_record(self.record_test)
+        self.record_test.dirty = False
+        with self.assertRaises(ValueError), addressbook.batch():
+            self.email_test.email = "sasha@corp.com"
+            raise ValueError
+        restored = addressbook.get_record("Sasha")
+        self.assertEqual(restored.emails[0].subrecord.email, "test_sasha@gmail.com")
+        self.assertFalse(restored.dirty)
+        restored.emails[0].subrecord.email = "sasha@corp.com"
+        self.assertTrue(restored.dirty)
+        self.assertEqual(list(addressbook.search("sasha@corp.com").values()), [restored])
+
     def test_days_to_birthday(self) -> None:
         """
         The test_days_to_birthday function tests the days_to_birthday function in Record.py
@@ -62,6 +90,19 @@ class TestRecordContact(unittest.TestCase):
         #     datetime_mock.now.return_value = current_date
         self.assertEqual(self.record_test.days_to_birthday(current_date), 0)
 
+    def test_days_to_birthday_calendar_days(self) -> None:
+        """
+        The test_days_to_birthday_calendar_days function tests that the days are counted in calendar days,
+        whatever the time of day, and that a birthday on 29 February falls on 28 February in other years.
+        """
+        self.record_test.add_birthday(datetime(2000, 1, 2))
+        self.assertEqual(self.record_test.days_to_birthday(datetime(2023, 1, 1, 18, 30)), 1)
+        self.assertEqual(self.record_test.days_to_birthday(datetime(2023, 1, 3)), 364)
+
+        self.record_test.add_birthday(datetime(2000, 2, 29))
+        self.assertEqual(self.record_test.days_to_birthday(datetime(2023, 2, 27)), 1)
+        self.assertEqual(self.record_test.days_to_birthday(datetime(2023, 3, 1)), 365)
+
     def test_days_to_birthday_none(self) -> None:
         """
         The test_days_to_birthday_none function tests the days_to_birthday function in Record.py
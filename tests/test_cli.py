@@ -0,0 +1,226 @@
+"""Tests command line interface"""
+import io
+import json
+import os
+import pickle
+import shutil
+import unittest
+from contextlib import redirect_stderr
+from contextlib import redirect_stdout
+from datetime import date
+from datetime import timedelta
+
+from my_address_book.address_book import AddressBook as AB
+from my_address_book.cli import main
+from my_address_book.codec import DELTA_SUFFIX
+from my_address_book.codec import is_snapshot
+from my_address_book.entities import User
+from my_address_book.index_store import index_file_name
+from my_address_book.records import RecordContact
+
+
+class TestCli(unittest.TestCase):
+    """Tests command line interface"""
+
+    def setUp(self) -> None:
+        current_dir = os.getcwd()
+        self.test_file = os.path.join(current_dir, "tests", "test_file.bin")
+        self.test_csv = os.path.join(current_dir, "tests", "test_cli.csv")
+        self.options = ["--addressbook", self.test_file, "--json"]
+
+    def tearDown(self) -> None:
+        for file_name in (self.test_file, self.test_file + DELTA_SUFFIX, index_file_name(self.test_file), self.test_csv):
+            if os.path.exists(file_name):
+                os.remove(file_name)
+
+    def run_cli(self, *argv: str) -> tuple[int, str, str]:
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            code = main([*self.options, *argv])
+        return code, stdout.getvalue(), stderr.getvalue()
+
+    def test_add_and_search(self) -> None:
+        """
+        The test_add_and_search function tests that a contact added from the command line is saved
+        and found by the search command.
+        """
+        code, _, _ = self.run_cli("add", "sasha", "--phone", "+38(095)123-45-67(mobile)", "--birthday", "26-06-1982")
+        self.assertEqual(code, 0)
+
+        addressbook = AB()
+        addressbook.read_records_from_file(self.test_file)
+        self.assertEqual(addressbook.get_record("sasha").phone_numbers[0].subrecord.phone, "+380951234567")
+
+        code, output, _ = self.run_cli("search", "38095")
+        self.assertEqual(code, 0)
+        self.assertEqual(json.loads(output)[0]["name"], "sasha")
+
+    def test_search_invalid_pattern(self) -> None:
+        """
+        The test_search_invalid_pattern function tests that a broken regular expression is reported with exit code 1.
+        """
+        self.run_cli("add", "sasha")
+        code, output, error = self.run_cli("search", "a(")
+        self.assertEqual(code, 1)
+        self.assertEqual(output, "")
+        self.assertTrue("missing )" in error)
+
+    def test_add_invalid(self) -> None:
+        """
+        The test_add_invalid function tests that a validation error is reported with exit code 1.
+        """
+        code, _, error = self.run_cli("add", "sasha", "--email", "test@sasha@gmail.com")
+        self.assertEqual(code, 1)
+        self.assertTrue("Invalid 'test@sasha@gmail.com' email address." in error)
+        self.assertFalse(os.path.exists(self.test_file))
+
+    def test_delete(self) -> None:
+        self.run_cli("add", "sasha")
+        code, output, _ = self.run_cli("delete", "sasha")
+        self.assertEqual(code, 0)
+        self.assertEqual(json.loads(output), {"deleted": "sasha"})
+
+        code, _, error = self.run_cli("delete", "sasha")
+        self.assertEqual(code, 1)
+        self.assertTrue("was not found" in error)
+
+    def test_show_and_list(self) -> None:
+        """
+        The test_show_and_list function tests that a contact and the pages of contacts are read from a mapped book.
+        """
+        for name in ("olena", "sasha", "anna"):
+            self.run_cli("add", name, "--phone", "0951234567")
+
+        code, output, _ = self.run_cli("show", "sasha")
+        self.assertEqual(code, 0)
+        self.assertEqual([contact["name"] for contact in json.loads(output)], ["sasha"])
+        code, _, error = self.run_cli("show", "petro")
+        self.assertEqual(code, 1)
+        self.assertTrue("was not found" in error)
+
+        _, output, _ = self.run_cli("list", "--page", "2", "--page-size", "2")
+        self.assertEqual([contact["name"] for contact in json.loads(output)], ["sasha"])
+        _, output, _ = self.run_cli("list", "--page", "3", "--page-size", "2")
+        self.assertEqual(json.loads(output), [])
+        _, output, _ = self.run_cli("--notesbook", self.test_file + ".notes", "list", "--notes", "--newest")
+        self.assertEqual(json.loads(output), [])
+
+    def test_sharded_book(self) -> None:
+        """
+        The test_sharded_book function tests the commands on a book kept in shards.
+        """
+        directory = os.path.join(os.getcwd(), "tests", "test_cli_shards", "")
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.options = ["--addressbook", directory, "--json"]
+        self.run_cli("add", "sasha", "--phone", "0951234567")
+        self.run_cli("add", "olena")
+
+        _, output, _ = self.run_cli("show", "sasha")
+        self.assertEqual([contact["name"] for contact in json.loads(output)], ["sasha"])
+        _, output, _ = self.run_cli("list")
+        self.assertEqual([contact["name"] for contact in json.loads(output)], ["olena", "sasha"])
+        self.assertTrue(os.path.isdir(directory))
+
+    def test_import_and_export(self) -> None:
+        """
+        The test_import_and_export function tests the import of a CSV file and the export to stdout.
+        """
+        with open(self.test_csv, "w", encoding="utf-8") as file:
+            file.write("name,phones,emails,birthday\nolena,380501112233,,\nsasha,380951234567,,\n")
+
+        code, output, _ = self.run_cli("import", self.test_csv)
+        self.assertEqual(code, 0)
+        self.assertEqual(json.loads(output)["imported"], 2)
+
+        code, output, _ = self.run_cli("export", "--format", "csv")
+        self.assertEqual(code, 0)
+        self.assertEqual(output.splitlines()[1:], ["olena,+380501112233,,", "sasha,+380951234567,,"])
+
+    def test_birthdays_within(self) -> None:
+        """
+        The test_birthdays_within function tests that only the contacts with a birthday in the given number of days
+        are listed, the nearest first.
+        """
+        today = date.today()
+        soon = (today + timedelta(days=3)).replace(year=1992).strftime("%d-%m-%Y")
+        later = (today + timedelta(days=40)).replace(year=1992).strftime("%d-%m-%Y")
+        self.run_cli("add", "olena", "--birthday", later)
+        self.run_cli("add", "sasha", "--birthday", soon)
+
+        code, output, _ = self.run_cli("birthdays-within", "7")
+        self.assertEqual(code, 0)
+        self.assertEqual([contact["name"] for contact in json.loads(output)], ["sasha"])
+
+        code, output, _ = self.run_cli("birthdays-within", "60")
+        self.assertEqual([contact["name"] for contact in json.loads(output)], ["sasha", "olena"])
+
+    def test_next_birthdays_and_reminders(self) -> None:
+        """
+        The test_next_birthdays_and_reminders function tests the nearest birthdays and the birthdays due.
+        """
+        today = date.today()
+        self.run_cli("add", "olena", "--birthday", (today + timedelta(days=40)).replace(year=1992).strftime("%d-%m-%Y"))
+        self.run_cli("add", "sasha", "--birthday", today.replace(year=1992).strftime("%d-%m-%Y"))
+
+        code, output, _ = self.run_cli("next-birthdays", "1")
+        self.assertEqual(code, 0)
+        self.assertEqual([contact["name"] for contact in json.loads(output)], ["sasha"])
+
+        code, output, _ = self.run_cli("reminders")
+        self.assertEqual(json.loads(output), [{"date": today.strftime("%d-%m-%Y"), "name": "sasha"}])
+
+    def test_dedupe(self) -> None:
+        """
+        The test_dedupe function tests that duplicates are only listed without --apply and merged with it.
+        """
+        self.run_cli("add", "sasha", "--phone", "0951234567")
+        self.run_cli("add", "oleksandr", "--phone", "+380951234567", "--email", "sasha@gmail.com")
+
+        code, output, _ = self.run_cli("dedupe")
+        self.assertEqual(code, 0)
+        self.assertEqual([(pair["keep"], pair["duplicate"]) for pair in json.loads(output)["pairs"]], [("oleksandr", "sasha")])
+
+        code, output, _ = self.run_cli("dedupe", "--apply")
+        self.assertEqual(json.loads(output)["merged"], 1)
+        addressbook = AB()
+        addressbook.read_records_from_file(self.test_file)
+        self.assertEqual(list(addressbook.data), ["oleksandr"])
+
+    def test_convert(self) -> None:
+        """
+        The test_convert function tests that a book file saved with pickle is converted to a snapshot once,
+        and that an empty notes book is converted to a snapshot of notes.
+        """
+        addressbook = AB()
+        addressbook.add_record(RecordContact(User("sasha")))
+        with open(self.test_file, "wb") as file:
+            pickle.dump(addressbook.data, file)
+
+        code, _, error = self.run_cli("show", "sasha")
+        self.assertEqual(code, 1)
+        self.assertTrue("convert" in error)
+
+        code, output, _ = self.run_cli("convert", self.test_file)
+        self.assertEqual((code, json.loads(output)), (0, {self.test_file: 1}))
+        _, output, _ = self.run_cli("convert", self.test_file)
+        self.assertEqual(json.loads(output), {self.test_file: 0})
+        with open(self.test_file, "rb") as file:
+            self.assertTrue(is_snapshot(file))
+
+        notes_file = self.test_file + ".notes"
+        self.addCleanup(os.remove, notes_file)
+        with open(notes_file, "wb") as file:
+            pickle.dump({}, file)
+        code, output, _ = self.run_cli("convert", "--notes", notes_file)
+        self.assertEqual((code, json.loads(output)), (0, {notes_file: 0}))
+        code, output, _ = self.run_cli("--notesbook", notes_file, "list", "--notes")
+        self.assertEqual((code, json.loads(output)), (0, []))
+
+    def test_sort_folder_invalid_path(self) -> None:
+        code, _, error = self.run_cli("sort-folder", os.path.join("tests", "no_such_folder"))
+        self.assertEqual(code, 1)
+        self.assertTrue("The way is not exists!" in error)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,266 @@
+"""Tests codec"""
+import io
+import os
+import pickle
+import unittest
+from datetime import date
+from datetime import datetime
+from unittest.mock import patch
+
+from my_address_book.address_book import AddressBook as AB
+from my_address_book.codec import CONTACTS
+from my_address_book.codec import DELTA_SUFFIX
+from my_address_book.codec import MappedSnapshot
+from my_address_book.codec import NOTES
+from my_address_book.codec import SnapshotError
+from my_address_book.codec import convert_pickle_file
+from my_address_book.codec import is_snapshot
+from my_address_book.codec import read_snapshot
+from my_address_book.codec import write_snapshot
+from my_address_book.entities import Email
+from my_address_book.entities import Note
+from my_address_book.entities import Phone
+from my_address_book.entities import User
+from my_address_book.index_store import index_file_name
+from my_address_book.notes_book import NotesBook as NB
+from my_address_book.records import RecordContact
+from my_address_book.records import RecordNote
+
+
+class TestCodec(unittest.TestCase):
+    """Tests the binary snapshot format of the books"""
+
+    def setUp(self) -> None:
+        self.test_file = os.path.join(os.getcwd(), "tests", "test_codec.bin")
+        self.addressbook_test = AB()
+        record = RecordContact(User("Олександр"))
+        record.add_phone_number(Phone("+380951234567"), [1, "mobile"])
+        record.add_phone_number(Phone("0441234567"))
+        record.add_email(Email("oleks@corp.com"), [1, "work"])
+        record.add_birthday(date(1982, 6, 26))
+        self.addressbook_test.add_record(record)
+        self.addressbook_test.add_record(RecordContact(User("anna")))
+
+    def tearDown(self) -> None:
+        for file_name in (self.test_file, self.test_file + DELTA_SUFFIX, index_file_name(self.test_file)):
+            if os.path.exists(file_name):
+                os.remove(file_name)
+        del self.addressbook_test
+
+    def test_round_trip(self) -> None:
+        """
+        The test_round_trip function tests that a saved and read address book has the same contacts.
+        """
+        self.addressbook_test.save_records_to_file(self.test_file)
+        addressbook = AB()
+        addressbook.read_records_from_file(self.test_file)
+
+        self.assertEqual(list(addressbook.data), ["anna", "Олександр"])
+        record = addressbook.get_record("Олександр")
+        self.assertEqual(
+            [(phone.subrecord.phone, phone.name) for phone in record.phone_numbers],
+            [("+380951234567", [1, "mobile"]), ("0441234567", None)],
+        )
+        self.assertEqual([(email.subrecord.email, email.name) for email in record.emails], [("oleks@corp.com", [1, "work"])])
+        self.assertEqual(record.user.birthday_date, date(1982, 6, 26))
+        self.assertEqual(addressbook.get_record("anna").user.birthday_date, None)
+        self.assertEqual(addressbook.lookup_phone("0951234567"), [record])
+
+    def test_birthday_types(self) -> None:
+        """
+        The test_birthday_types function tests that a birthday saved as a datetime is read as a datetime
+        and one saved as a date as a date.
+        """
+        self.addressbook_test.get_record("anna").add_birthday(datetime(1990, 1, 2, 10, 30, 5, 7))
+        self.addressbook_test.save_records_to_file(self.test_file)
+        addressbook = AB()
+        addressbook.read_records_from_file(self.test_file)
+
+        birthday = addressbook.get_record("anna").user.birthday_date
+        self.assertEqual((type(birthday), birthday), (datetime, datetime(1990, 1, 2, 10, 30, 5, 7)))
+        birthday = addressbook.get_record("Олександр").user.birthday_date
+        self.assertEqual((type(birthday), birthday), (date, date(1982, 6, 26)))
+
+    def test_notes_round_trip(self) -> None:
+        notesbook = NB()
+        record_note = RecordNote(Note("some text"))
+        record_note.add_note_name("name note")
+        record_note.add_tags("#Work", "urgent")
+        notesbook.add_record(record_note)
+        notesbook.add_record(RecordNote(Note(None)))
+        notesbook.save_records_to_file(self.test_file)
+
+        notesbook_read = NB()
+        notesbook_read.read_records_from_file(self.test_file)
+        self.assertEqual(list(notesbook_read.data), ["1", "2"])
+        self.assertEqual(notesbook_read.get_record("1").note.name_note, "name note")
+        self.assertEqual(notesbook_read.get_record("1").date_of_creation, record_note.date_of_creation)
+        self.assertEqual(notesbook_read.get_record("2").note.note, None)
+        self.assertEqual(notesbook_read.get_record("1").note.tags, ("urgent", "work"))
+        self.assertEqual(list(notesbook_read.search("#work")), ["1"])
+
+    def test_dates_of_creation_migrated(self) -> None:
+        """
+        The test_dates_of_creation_migrated function tests that the dates of creation saved as text by the pickle files
+        are read as timestamps.
+        """
+        records = {"1": RecordNote(Note("pickled note")), "2": RecordNote(Note("old note"))}
+        vars(records["1"])["date_of_creation"] = vars(records["1"]).pop("created") and "not a date"
+        vars(records["2"])["date_of_creation"] = vars(records["2"]).pop("created") and "26-06-2022 10:20:30"
+        with open(self.test_file, "wb") as file:
+            pickle.dump(records, file)
+        convert_pickle_file(self.test_file, NOTES)
+        notesbook = NB()
+        notesbook.read_records_from_file(self.test_file)
+        self.assertEqual(notesbook.get_record("1").created, None)
+        self.assertEqual(notesbook.get_record("2").created, int(datetime(2022, 6, 26, 10, 20, 30).timestamp()))
+        self.assertEqual(notesbook.get_record("2").date_of_creation, "26-06-2022 10:20:30")
+        self.assertEqual(notesbook.get_record("1").date_of_creation, "")
+        notesbook.save_records_to_file(self.test_file)
+        notesbook.read_records_from_file(self.test_file)
+        self.assertEqual(list(notesbook.newest_first().data), ["2", "1"])
+
+    def test_streaming_blocks(self) -> None:
+        """
+        The test_streaming_blocks function tests a snapshot written and read in several blocks.
+        """
+        for number in range(10):
+            self.addressbook_test.add_record(RecordContact(User(f"contact {number}")), sort=False)
+        file = io.BytesIO()
+        with patch("my_address_book.codec.SNAPSHOT_BLOCK_SIZE", 3):
+            write_snapshot(file, CONTACTS, self.addressbook_test.data.items())
+        file.seek(0)
+        self.assertTrue(is_snapshot(file))
+        self.assertEqual([name for name, _ in read_snapshot(file, CONTACTS)], list(self.addressbook_test.data))
+
+    def test_errors(self) -> None:
+        file = io.BytesIO()
+        write_snapshot(file, CONTACTS, self.addressbook_test.data.items())
+        for data, kind in ((b"not a snapshot", CONTACTS), (file.getvalue(), NOTES), (file.getvalue()[:12], CONTACTS)):
+            with self.assertRaises(SnapshotError):
+                list(read_snapshot(io.BytesIO(data), kind))
+
+    def test_mapped_snapshot(self) -> None:
+        """
+        The test_mapped_snapshot function tests that a mapped snapshot finds, iterates and pages the records
+        in the order of the book.
+        """
+        for number in range(10):
+            self.addressbook_test.add_record(RecordContact(User(f"contact {number}")), sort=False)
+        self.addressbook_test.sort_book()
+        with patch("my_address_book.codec.SNAPSHOT_BLOCK_SIZE", 3):
+            self.addressbook_test.save_records_to_file(self.test_file)
+
+        with MappedSnapshot(self.test_file, CONTACTS) as snapshot:
+            self.assertEqual(len(snapshot), 12)
+            self.assertEqual(list(snapshot), list(self.addressbook_test.data))
+            self.assertEqual([name for name, _ in snapshot.items()], list(self.addressbook_test.data))
+            record = snapshot.get_record("Олександр")
+            self.assertEqual(record.phone_numbers[0].subrecord.phone, "+380951234567")
+            self.assertEqual(record.user.birthday_date, date(1982, 6, 26))
+            self.assertTrue("contact 7" in snapshot)
+            self.assertFalse("contact" in snapshot)
+            with self.assertRaises(KeyError):
+                snapshot.get_record("contact 10")
+            self.assertEqual([name for name, _ in snapshot.page(10, 5)], list(self.addressbook_test.data)[10:])
+
+    def test_mapped_snapshot_errors(self) -> None:
+        with open(self.test_file, "wb") as file:
+            pickle.dump(self.addressbook_test.data, file)
+        with self.assertRaises(SnapshotError):
+            MappedSnapshot(self.test_file, CONTACTS)
+
+        self.addressbook_test.save_records_to_file(self.test_file)
+        with self.assertRaises(SnapshotError):
+            MappedSnapshot(self.test_file, NOTES)
+        with open(self.test_file, "r+b") as file:
+            file.truncate(os.path.getsize(self.test_file) - 3)
+        with self.assertRaises(SnapshotError):
+            MappedSnapshot(self.test_file, CONTACTS)
+
+    def test_differential_snapshot(self) -> None:
+        """
+        The test_differential_snapshot function tests that a save of a few changed records writes only them
+        next to the full snapshot, that they are read back, and that a full snapshot is written again when
+        many records have changed.
+        """
+        for number in range(20):
+            self.addressbook_test.add_record(RecordContact(User(f"contact {number:02d}")), sort=False)
+        self.addressbook_test.sort_book()
+        self.addressbook_test.save_records_to_file(self.test_file)
+        with open(self.test_file, "rb") as file:
+            snapshot = file.read()
+
+        addressbook = AB()
+        addressbook.read_records_from_file(self.test_file)
+        addressbook.get_record("Олександр").phone_numbers[0].subrecord.phone = "+380951112233"
+        addressbook.delete_record("contact 03")
+        addressbook.add_record(RecordContact(User("olena")))
+        self.assertTrue(addressbook.write_book_file(self.test_file))
+        with open(self.test_file, "rb") as file:
+            self.assertEqual(file.read(), snapshot)
+
+        addressbook.get_record("anna").add_email(Email("anna@corp.com"))
+        addressbook.save_records_to_file(self.test_file)
+        addressbook_read = AB()
+        addressbook_read.read_records_from_file(self.test_file)
+        self.assertEqual(list(addressbook_read.data), list(addressbook.data))
+        self.assertEqual(addressbook_read.lookup_phone("+380951112233")[0].user.name, "Олександр")
+        self.assertEqual(addressbook_read.get_record("anna").emails[0].subrecord.email, "anna@corp.com")
+        self.assertEqual(addressbook_read.changed_keys, {"Олександр", "contact 03", "olena", "anna"})
+
+        for number in range(10):
+            addressbook_read.get_record(f"contact {number + 10:02d}").add_email(Email(f"user{number}@corp.com"))
+        self.assertFalse(addressbook_read.write_book_file(self.test_file))
+        self.assertFalse(os.path.exists(self.test_file + DELTA_SUFFIX))
+        addressbook = AB()
+        addressbook.read_records_from_file(self.test_file)
+        self.assertEqual(list(addressbook.data), list(addressbook_read.data))
+        self.assertEqual(addressbook.changed_keys, set())
+
+    def test_stale_differential_snapshot(self) -> None:
+        """
+        The test_stale_differential_snapshot function tests that a differential snapshot written for another full
+        snapshot is ignored.
+        """
+        for number in range(20):
+            self.addressbook_test.add_record(RecordContact(User(f"contact {number:02d}")))
+        self.addressbook_test.save_records_to_file(self.test_file)
+        addressbook = AB()
+        addressbook.read_records_from_file(self.test_file)
+        addressbook.get_record("anna").add_email(Email("anna@corp.com"))
+        self.assertTrue(addressbook.write_book_file(self.test_file))
+        with open(self.test_file + DELTA_SUFFIX, "rb") as file:
+            delta = file.read()
+
+        self.addressbook_test.delete_record("contact 00")
+        self.addressbook_test.mark_all_changed()
+        self.assertFalse(self.addressbook_test.write_book_file(self.test_file))
+        with open(self.test_file + DELTA_SUFFIX, "wb") as file:
+            file.write(delta)
+        addressbook_read = AB()
+        addressbook_read.read_records_from_file(self.test_file)
+        self.assertEqual(list(addressbook_read.data), list(self.addressbook_test.data))
+        self.assertEqual(addressbook_read.get_record("anna").emails, [])
+        self.assertEqual(addressbook_read.changed_keys, set())
+
+    def test_convert_pickle_file(self) -> None:
+        """
+        The test_convert_pickle_file function tests that a book file saved with pickle is read only by the conversion.
+        """
+        with open(self.test_file, "wb") as file:
+            pickle.dump(self.addressbook_test.data, file)
+        with self.assertRaises(SnapshotError) as error:
+            AB().read_records_from_file(self.test_file)
+        self.assertTrue("convert" in str(error.exception))
+
+        with self.assertRaises(SnapshotError):
+            convert_pickle_file(self.test_file, NOTES)
+        self.assertEqual(convert_pickle_file(self.test_file, CONTACTS), 2)
+        self.assertEqual(convert_pickle_file(self.test_file, CONTACTS), 0)
+        with open(self.test_file, "rb") as file:
+            self.assertEqual([name for name, _ in read_snapshot(file, CONTACTS)], ["anna", "Олександр"])
+
+
+if __name__ == "__main__":
+    unittest.main()
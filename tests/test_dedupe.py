@@ -0,0 +1,113 @@
+"""Tests dedupe"""
+import os
+import unittest
+from datetime import date
+from unittest.mock import patch
+
+from my_address_book.address_book import AddressBook as AB
+from my_address_book.codec import DELTA_SUFFIX
+from my_address_book.dedupe import find_duplicates
+from my_address_book.dedupe import merge_duplicates
+from my_address_book.dedupe import phonetic_key
+from my_address_book.entities import Email
+from my_address_book.entities import Phone
+from my_address_book.entities import User
+from my_address_book.index_store import index_file_name
+from my_address_book.records import RecordContact
+
+
+class TestDedupe(unittest.TestCase):
+    """Tests finding and merging duplicate contacts"""
+
+    def setUp(self) -> None:
+        self.test_file = os.path.join(os.getcwd(), "tests", "test_dedupe.bin")
+        self.addressbook_test = AB()
+
+    def tearDown(self) -> None:
+        for file_name in (self.test_file, self.test_file + DELTA_SUFFIX, index_file_name(self.test_file)):
+            if os.path.exists(file_name):
+                os.remove(file_name)
+        del self.addressbook_test
+
+    def add_contact(
+        self, name: str, phones: tuple[str, ...] = (), emails: tuple[str, ...] = (), birthday: date | None = None
+    ) -> None:
+        record = RecordContact(User(name))
+        for phone in phones:
+            record.add_phone_number(Phone(phone))
+        for email in emails:
+            record.add_email(Email(email))
+        if birthday:
+            record.add_birthday(birthday)
+        self.addressbook_test.add_record(record)
+
+    def test_phonetic_key(self) -> None:
+        self.assertEqual(phonetic_key("Oleksandr"), "olksndr")
+        self.assertEqual(phonetic_key("Olexandr"), "olksndr")
+        self.assertEqual(phonetic_key("Олександр"), "olksndr")
+        self.assertEqual(phonetic_key("Petrenko Ivan"), phonetic_key("Іван Петренко"))
+
+    def test_find_duplicates(self) -> None:
+        """
+        The test_find_duplicates function tests that contacts sharing a phone (in any format) or a spelling
+        of the name are proposed, and the contact with more data is kept.
+        """
+        self.add_contact("Sasha", ("0951234567",))
+        self.add_contact("Oleksandr Petrenko", ("+380951234567",), ("sasha@gmail.com",), date(1990, 5, 1))
+        self.add_contact("Olexandr Petrenko")
+        self.add_contact("Anna", ("+380671112233",))
+
+        pairs = find_duplicates(self.addressbook_test)
+        self.assertEqual(
+            [(pair.keep, pair.duplicate) for pair in pairs],
+            [("Oleksandr Petrenko", "Olexandr Petrenko"), ("Oleksandr Petrenko", "Sasha")],
+        )
+        self.assertEqual(pairs[0].reasons, ["name"])
+        self.assertEqual(pairs[1].reasons, ["phone"])
+
+    def test_other_birthday(self) -> None:
+        """
+        The test_other_birthday function tests that namesakes with different birthdays are not proposed.
+        """
+        self.add_contact("Ivan Petrenko", birthday=date(1990, 5, 1))
+        self.add_contact("Ivan Petrenko ", birthday=date(1985, 2, 3))
+        self.assertEqual(find_duplicates(self.addressbook_test), [])
+
+    def test_large_block(self) -> None:
+        """
+        The test_large_block function tests that a key shared by too many contacts is not used for comparing them.
+        """
+        for number in range(5):
+            self.add_contact(f"Office {chr(ord('a') + number) * 8}", ("+380441234567",))
+        self.assertEqual(len(find_duplicates(self.addressbook_test, max_block_size=5)), 10)
+        self.assertEqual(find_duplicates(self.addressbook_test, max_block_size=4), [])
+
+    def test_merge_duplicates(self) -> None:
+        """
+        The test_merge_duplicates function tests that chained pairs end up in one contact
+        and the book is saved once.
+        """
+        self.add_contact("Sasha", ("0951234567",), ("sasha@gmail.com",))
+        self.add_contact("Oleksandr", ("+380951234567",), ("oleksandr@corp.com",))
+        self.add_contact("Olexandr", ("+380501112233",), ("oleksandr@corp.com",), date(1990, 5, 1))
+
+        pairs = find_duplicates(self.addressbook_test)
+        with patch.object(AB, "save_records_to_file", autospec=True, side_effect=AB.save_records_to_file) as save:
+            merged = merge_duplicates(self.addressbook_test, pairs, self.test_file)
+        self.assertEqual(merged, 2)
+        self.assertEqual(save.call_count, 1)
+
+        self.assertEqual(len(self.addressbook_test.data), 1)
+        record = next(iter(self.addressbook_test.data.values()))
+        self.assertEqual(sorted(phone.subrecord.phone for phone in record.phone_numbers), ["+380501112233", "+380951234567"])
+        self.assertEqual(sorted(email.subrecord.email for email in record.emails), ["oleksandr@corp.com", "sasha@gmail.com"])
+        self.assertEqual(record.user.birthday_date, date(1990, 5, 1))
+        self.assertEqual(list(self.addressbook_test.search("sasha@")), [record.user.name])
+
+        addressbook = AB()
+        addressbook.read_records_from_file(self.test_file)
+        self.assertEqual(list(addressbook.data), [record.user.name])
+
+
+if __name__ == "__main__":
+    unittest.main()
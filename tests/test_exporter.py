@@ -0,0 +1,109 @@
+"""Tests exporter"""
+import gzip
+import io
+import json
+import os
+import unittest
+from contextlib import redirect_stdout
+from datetime import date
+
+from my_address_book.address_book import AddressBook as AB
+from my_address_book.entities import Email
+from my_address_book.entities import Note
+from my_address_book.entities import Phone
+from my_address_book.entities import User
+from my_address_book.exporter import export_book
+from my_address_book.exporter import iter_contacts
+from my_address_book.importer import import_contacts
+from my_address_book.notes_book import NotesBook as NB
+from my_address_book.records import RecordContact
+from my_address_book.records import RecordNote
+
+
+class TestExporter(unittest.TestCase):
+    """Tests exporter"""
+
+    def setUp(self) -> None:
+        self.addressbook_test = AB()
+        self.record_test = RecordContact(User("sasha"))
+        self.record_test.add_birthday(date(1982, 6, 26))
+        self.record_test.add_phone_number(Phone("+380951234567"), [1, "mobile"])
+        self.record_test.add_email(Email("test_sasha@gmail.com"))
+        self.addressbook_test.add_record(self.record_test)
+
+        self.notesbook_test = NB()
+        record_note = RecordNote(Note("some text"))
+        record_note.add_note_name("name note")
+        self.notesbook_test.add_record(record_note)
+
+        current_dir = os.getcwd()
+        self.test_files = [
+            os.path.join(current_dir, "tests", "test_export.csv"),
+            os.path.join(current_dir, "tests", "test_export.vcf.gz"),
+        ]
+
+    def tearDown(self) -> None:
+        for file_name in self.test_files:
+            if os.path.exists(file_name):
+                os.remove(file_name)
+        del self.addressbook_test
+        del self.notesbook_test
+
+    def test_iter_contacts_jsonl(self) -> None:
+        """
+        The test_iter_contacts_jsonl function tests that every contact is yielded as one JSON line.
+        """
+        lines = list(iter_contacts(self.addressbook_test, "jsonl"))
+        self.assertEqual(len(lines), 1)
+        contact = json.loads(lines[0])
+        self.assertEqual(contact["name"], "sasha")
+        self.assertEqual(contact["phones"], [{"value": "+380951234567", "assignment": "mobile"}])
+        self.assertEqual(contact["birthday"], "1982-06-26")
+
+    def test_export_csv_round_trip(self) -> None:
+        """
+        The test_export_csv_round_trip function tests that a CSV export is read back by the importer.
+        """
+        count = export_book(self.addressbook_test, self.test_files[0])
+        self.assertEqual(count, 1)
+
+        addressbook = AB()
+        report = import_contacts(addressbook, self.test_files[0])
+        self.assertEqual(report.imported, 1)
+        contact: RecordContact = addressbook.get_record("sasha")
+        self.assertEqual(contact.phone_numbers[0].name, [1, "mobile"])
+        self.assertEqual(contact.emails[0].subrecord.email, "test_sasha@gmail.com")
+        self.assertEqual(contact.user.birthday_date, date(1982, 6, 26))
+
+    def test_export_vcard_gzip_round_trip(self) -> None:
+        """
+        The test_export_vcard_gzip_round_trip function tests a gzip-compressed vCard export.
+        """
+        export_book(self.addressbook_test, self.test_files[1])
+
+        with gzip.open(self.test_files[1], "rt", encoding="utf-8") as file:
+            self.assertTrue("TEL;TYPE=CELL:+380951234567" in file.read())
+
+        addressbook = AB()
+        report = import_contacts(addressbook, self.test_files[1])
+        self.assertEqual(report.imported, 1)
+
+    def test_export_notes_stdout(self) -> None:
+        """
+        The test_export_notes_stdout function tests the export of the notes book to stdout.
+        """
+        stdout = io.StringIO()
+        with redirect_stdout(stdout):
+            count = export_book(self.notesbook_test, "-", "csv")
+
+        self.assertEqual(count, 1)
+        self.assertTrue(stdout.getvalue().startswith("number,name,note,date_of_creation"))
+        self.assertTrue("1,name note,some text," in stdout.getvalue())
+
+    def test_export_notes_vcard(self) -> None:
+        with self.assertRaises(ValueError):
+            export_book(self.notesbook_test, None, "vcard")
+
+
+if __name__ == "__main__":
+    unittest.main()
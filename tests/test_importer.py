@@ -0,0 +1,140 @@
+"""Tests importer"""
+import gzip
+import os
+import unittest
+from datetime import date
+
+from my_address_book.address_book import AddressBook as AB
+from my_address_book.codec import CONTACTS
+from my_address_book.codec import DELTA_SUFFIX
+from my_address_book.codec import read_snapshot
+from my_address_book.entities import User
+from my_address_book.importer import import_contacts
+from my_address_book.importer import read_csv_contacts
+from my_address_book.importer import read_vcard_contacts
+from my_address_book.index_store import index_file_name
+from my_address_book.records import RecordContact
+
+CSV_CONTENT = """name,phones,emails,birthday
+sasha,+38(095)123-45-67(mobile);380441234567,test_sasha@gmail.com(work),26-06-1982
+olena,380501112233,,
+bad name,380501112233,,
+"""
+
+VCARD_CONTENT = """BEGIN:VCARD
+VERSION:3.0
+FN:sasha
+TEL;TYPE=CELL,VOICE:+380 95 123 45 67
+EMAIL;TYPE=INTERNET,HOME:test_sasha@gmail.com
+BDAY:1982-06-26
+END:VCARD
+BEGIN:VCARD
+VERSION:4.0
+N:;Oleh;;;
+TEL;VALUE=uri;TYPE=work:tel:+380-44-123-45-67
+BDAY:--0626
+END:VCARD
+"""
+
+
+class TestImporter(unittest.TestCase):
+    """Tests importer"""
+
+    def setUp(self) -> None:
+        self.addressbook_test = AB()
+        current_dir = os.getcwd()
+        self.test_file = os.path.join(current_dir, "tests", "test_file.bin")
+        self.test_csv = os.path.join(current_dir, "tests", "test_import.csv")
+        self.test_vcard = os.path.join(current_dir, "tests", "test_import.vcf.gz")
+
+    def tearDown(self) -> None:
+        for file_name in (
+            self.test_file,
+            self.test_file + DELTA_SUFFIX,
+            index_file_name(self.test_file),
+            self.test_csv,
+            self.test_vcard,
+        ):
+            if os.path.exists(file_name):
+                os.remove(file_name)
+        del self.addressbook_test
+
+    def test_read_csv_contacts(self) -> None:
+        """
+        The test_read_csv_contacts function tests that the CSV parser splits phones and emails
+        and recognises their assignments.
+        """
+        rows = list(read_csv_contacts(CSV_CONTENT.splitlines(keepends=True)))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0].name, "sasha")
+        self.assertEqual(rows[0].phones, [("+38(095)123-45-67", "mobile"), ("380441234567", None)])
+        self.assertEqual(rows[0].emails, [("test_sasha@gmail.com", "work")])
+        self.assertEqual(rows[1].birthday, None)
+
+    def test_read_vcard_contacts(self) -> None:
+        """
+        The test_read_vcard_contacts function tests that vCard 3.0 and 4.0 properties are parsed.
+        """
+        rows = list(read_vcard_contacts(VCARD_CONTENT.splitlines(keepends=True)))
+        self.assertEqual([row.name for row in rows], ["sasha", "Oleh"])
+        self.assertEqual(rows[0].phones, [("+380 95 123 45 67", "mobile")])
+        self.assertEqual(rows[0].emails, [("test_sasha@gmail.com", "home")])
+        self.assertEqual(rows[1].phones, [("+380-44-123-45-67", "work")])
+
+    def test_import_contacts_csv(self) -> None:
+        """
+        The test_import_contacts_csv function tests that valid rows are imported with sanitized phones,
+        invalid rows are reported and the book is saved once at the end.
+        """
+        with open(self.test_csv, "w", encoding="utf-8") as file:
+            file.write(CSV_CONTENT)
+
+        report = import_contacts(self.addressbook_test, self.test_csv, self.test_file, batch_size=2)
+
+        self.assertEqual(report.imported, 2)
+        self.assertEqual(report.failed, 1)
+        self.assertTrue(report.errors[0].startswith("line 4:"))
+
+        contact: RecordContact = self.addressbook_test.get_record("sasha")
+        self.assertEqual(contact.phone_numbers[0].subrecord.phone, "+380951234567")
+        self.assertEqual(contact.phone_numbers[0].name, [1, "mobile"])
+        self.assertEqual(contact.emails[0].name, [1, "work"])
+        self.assertEqual(contact.user.birthday_date, date(1982, 6, 26))
+
+        with open(self.test_file, "rb") as file:
+            content = dict(read_snapshot(file, CONTACTS))
+        self.assertEqual(list(content), ["olena", "sasha"])
+
+    def test_import_contacts_vcard_gzip(self) -> None:
+        """
+        The test_import_contacts_vcard_gzip function tests the import of a gzip-compressed vCard file.
+        """
+        with gzip.open(self.test_vcard, "wt", encoding="utf-8") as file:
+            file.write(VCARD_CONTENT)
+
+        report = import_contacts(self.addressbook_test, self.test_vcard)
+
+        self.assertEqual(report.imported, 2)
+        self.assertEqual(self.addressbook_test.get_record("Oleh").user.birthday_date, None)
+
+    def test_import_contacts_existing_name(self) -> None:
+        """
+        The test_import_contacts_existing_name function tests that a contact already in the book is not replaced.
+        """
+        self.addressbook_test.add_record(RecordContact(User("olena")))
+        with open(self.test_csv, "w", encoding="utf-8") as file:
+            file.write(CSV_CONTENT)
+
+        report = import_contacts(self.addressbook_test, self.test_csv)
+
+        self.assertEqual(report.imported, 1)
+        self.assertEqual(report.failed, 2)
+        self.assertEqual(self.addressbook_test.get_record("olena").phone_numbers, [])
+
+    def test_import_contacts_unknown_format(self) -> None:
+        with self.assertRaises(ValueError):
+            import_contacts(self.addressbook_test, "contacts.txt")
+
+
+if __name__ == "__main__":
+    unittest.main()
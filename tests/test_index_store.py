@@ -0,0 +1,161 @@
+"""Tests index_store"""
+import os
+import threading
+import unittest
+from datetime import date
+from datetime import timedelta
+from unittest.mock import patch
+
+from my_address_book.address_book import AddressBook as AB
+from my_address_book.codec import DELTA_SUFFIX
+from my_address_book.entities import Email
+from my_address_book.entities import Phone
+from my_address_book.entities import User
+from my_address_book.index_store import book_stamp
+from my_address_book.index_store import index_file_name
+from my_address_book.index_store import read_indexes
+from my_address_book.indexes import PhoneIndex
+from my_address_book.records import RecordContact
+
+
+class TestIndexStore(unittest.TestCase):
+    """Tests the indexes saved next to the book file"""
+
+    def setUp(self) -> None:
+        self.test_file = os.path.join(os.getcwd(), "tests", "test_index_store.bin")
+        self.index_file = index_file_name(self.test_file)
+        self.addressbook_test = AB()
+        for number in range(20):
+            record = RecordContact(User(f"contact {number}"))
+            record.add_phone_number(Phone(f"0951234{number:03d}"))
+            record.add_email(Email(f"user{number}@corp{number % 2}.com"))
+            record.add_birthday(date(1990, 1 + number % 12, 1 + number))
+            self.addressbook_test.add_record(record, sort=False)
+        self.addressbook_test.sort_book()
+        self.addressbook_test.save_records_to_file(self.test_file)
+
+    def tearDown(self) -> None:
+        for file_name in (self.test_file, self.test_file + DELTA_SUFFIX, self.index_file):
+            if os.path.exists(file_name):
+                os.remove(file_name)
+        del self.addressbook_test
+
+    def read_book(self) -> AB:
+        addressbook = AB()
+        addressbook.read_records_from_file(self.test_file)
+        return addressbook
+
+    def test_round_trip(self) -> None:
+        """
+        The test_round_trip function tests that the indexes written on the first load are loaded
+        by the next one instead of being rebuilt.
+        """
+        self.assertFalse(os.path.exists(self.index_file))
+        self.read_book()
+        self.assertTrue(os.path.exists(self.index_file))
+
+        with patch.object(AB, "reindex") as reindex:
+            addressbook = self.read_book()
+        reindex.assert_not_called()
+        self.assertEqual(addressbook.lookup_phone("0951234007")[0].user.name, "contact 7")
+        self.assertEqual(len(addressbook.search("@corp1.com")), 10)
+        self.assertEqual(list(addressbook.fuzzy_search("contct 12").data)[0], "contact 12")
+        self.assertEqual(len(addressbook.next_birthdays(20)), 20)
+        self.assertTrue(addressbook.get_record("contact 3")._book is addressbook)
+
+        addressbook.get_record("contact 3").add_phone_number(Phone("0447654321"))
+        self.assertEqual(addressbook.lookup_phone("0447654321")[0].user.name, "contact 3")
+
+    def test_deferred_load(self) -> None:
+        """
+        The test_deferred_load function tests that the index file is loaded when the indexes are first used,
+        with the changes made to the book before.
+        """
+        self.read_book()
+        with patch("my_address_book.address_book.read_indexes", wraps=read_indexes) as load:
+            addressbook = self.read_book()
+            load.assert_not_called()
+            addressbook.delete_record("contact 7")
+            record = RecordContact(User("olena"))
+            record.add_phone_number(Phone("0951234007"))
+            addressbook.add_record(record)
+            addressbook.get_record("contact 3").add_phone_number(Phone("0447654321"))
+            self.assertEqual([record.user.name for record in addressbook.lookup_phone("0951234007")], ["olena"])
+            load.assert_called_once()
+        self.assertEqual(addressbook.lookup_phone("0447654321")[0].user.name, "contact 3")
+        self.assertTrue(addressbook.indexes_ready)
+
+    def test_stale_index(self) -> None:
+        """
+        The test_stale_index function tests that an index file written for another version of the book
+        or damaged is not used.
+        """
+        self.read_book()
+        addressbook = self.read_book()
+        addressbook.delete_record("contact 5")
+        self.assertFalse(addressbook.save_indexes(self.test_file))
+        addressbook.save_records_to_file(self.test_file)
+        self.assertFalse(read_indexes(self.index_file, book_stamp(self.test_file), AB().indexes, 19))
+
+        addressbook = self.read_book()
+        self.assertEqual(addressbook.lookup_phone("0951234005"), [])
+        self.assertTrue(read_indexes(self.index_file, book_stamp(self.test_file), AB().indexes, 19))
+
+        with open(self.index_file, "r+b") as file:
+            file.truncate(100)
+        addressbook = self.read_book()
+        self.assertEqual(addressbook.lookup_phone("0951234007")[0].user.name, "contact 7")
+
+    def test_save_indexes(self) -> None:
+        """
+        The test_save_indexes function tests that the indexes are written only for the book as it was saved.
+        """
+        self.addressbook_test.add_record(RecordContact(User("olena")))
+        self.assertFalse(self.addressbook_test.save_indexes(self.test_file))
+        self.addressbook_test.save_records_to_file(self.test_file)
+        self.assertTrue(self.addressbook_test.save_indexes(self.test_file))
+        self.assertTrue(read_indexes(self.index_file, book_stamp(self.test_file), AB().indexes, 21))
+
+    def test_background_rebuild(self) -> None:
+        """
+        The test_background_rebuild function tests that the searches scan the book while the indexes
+        are rebuilt in the background, and use the indexes, with the changes made meanwhile, once they are ready.
+        """
+        addressbook = AB()
+        addressbook.index_in_background = True
+        rebuild = threading.Event()
+        add_phones = PhoneIndex.add
+
+        def wait_and_add(index: PhoneIndex, record: RecordContact) -> None:
+            rebuild.wait(10)
+            add_phones(index, record)
+
+        with patch.object(PhoneIndex, "add", wait_and_add):
+            addressbook.read_records_from_file(self.test_file)
+            self.assertFalse(addressbook.indexes_ready)
+
+            record = RecordContact(User("olena"))
+            record.add_phone_number(Phone("+380951234007"))
+            record.add_email(Email("olena@mail.corp1.com"))
+            record.add_birthday(date.today() + timedelta(days=1))
+            addressbook.add_record(record)
+            self.assertEqual([record.user.name for record in addressbook.lookup_phone("951234007")], ["contact 7", "olena"])
+            self.assertEqual(len(addressbook.search("@corp1.com")), 11)
+            self.assertEqual(len(addressbook.search("phone:0951234007")), 2)
+            self.assertEqual(list(addressbook.fuzzy_search("olna").data), ["olena"])
+            self.assertTrue("olena" in addressbook.next_birthdays(5))
+            self.assertTrue("olena" in [record.user.name for _, record in addressbook.birthday_reminders(1)])
+            self.assertFalse(addressbook.indexes_ready)
+            rebuild.set()
+
+        addressbook.wait_for_indexes()
+        self.assertTrue(addressbook.indexes_ready)
+        self.assertEqual([record.user.name for record in addressbook.lookup_phone("951234007")], ["contact 7", "olena"])
+        self.assertEqual(len(addressbook.search("@corp1.com")), 11)
+        self.assertEqual(list(addressbook.fuzzy_search("olna").data), ["olena"])
+        self.assertFalse("olena" in [record.user.name for _, record in addressbook.birthday_reminders(1)])
+        self.assertTrue(os.path.exists(self.index_file))
+
+
+if __name__ == "__main__":
+    unittest.main()
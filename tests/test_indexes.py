@@ -0,0 +1,255 @@
+"""Tests indexes"""
+import unittest
+from datetime import date
+from datetime import timedelta
+
+from my_address_book.entities import Email
+from my_address_book.entities import Note
+from my_address_book.entities import Phone
+from my_address_book.entities import User
+from my_address_book.indexes import BirthdayIndex
+from my_address_book.indexes import EmailIndex
+from my_address_book.indexes import NameIndex
+from my_address_book.indexes import bounded_levenshtein
+from my_address_book.indexes import PhoneIndex
+from my_address_book.indexes import TagIndex
+from my_address_book.indexes import bitmap_numbers
+from my_address_book.indexes import bitmap_of
+from my_address_book.indexes import canonical_phone
+from my_address_book.indexes import search_key
+from my_address_book.records import RecordContact
+from my_address_book.records import RecordNote
+
+
+class TestPhoneIndex(unittest.TestCase):
+    """Tests class PhoneIndex"""
+
+    def setUp(self) -> None:
+        self.index_test = PhoneIndex()
+        self.record_test = RecordContact(User("sasha"))
+        self.record_test.add_phone_number(Phone("+380951234567"))
+        self.record_test.add_phone_number(Phone("0441234567"))
+        self.index_test.add(self.record_test)
+
+    def tearDown(self) -> None:
+        del self.index_test
+        del self.record_test
+
+    def test_canonical_phone(self) -> None:
+        self.assertEqual(canonical_phone("+38(095)123-45-67"), "380951234567")
+
+    def test_lookup_exact(self) -> None:
+        self.assertEqual(self.index_test.lookup("38 (095) 123-45-67"), {"sasha"})
+
+    def test_lookup_local_finds_international(self) -> None:
+        """
+        The test_lookup_local_finds_international function tests that a local number (with or without the
+        trunk '0') finds the contact saved with the international number.
+        """
+        self.assertEqual(self.index_test.lookup("0951234567"), {"sasha"})
+        self.assertEqual(self.index_test.lookup("951234567"), {"sasha"})
+
+    def test_lookup_international_finds_local(self) -> None:
+        self.assertEqual(self.index_test.lookup("+380441234567"), {"sasha"})
+
+    def test_lookup_too_short_suffix(self) -> None:
+        self.assertEqual(self.index_test.lookup("4567"), set())
+
+    def test_remove(self) -> None:
+        """
+        The test_remove function tests that the numbers of a removed contact are no longer found,
+        while a contact sharing a number is still found.
+        """
+        record = RecordContact(User("olena"))
+        record.add_phone_number(Phone("380951234567"))
+        self.index_test.add(record)
+
+        self.index_test.remove("sasha")
+
+        self.assertEqual(self.index_test.lookup("0951234567"), {"olena"})
+        self.assertEqual(self.index_test.lookup("0441234567"), set())
+
+
+class TestEmailIndex(unittest.TestCase):
+    """Tests class EmailIndex"""
+
+    def setUp(self) -> None:
+        self.index_test = EmailIndex()
+        for name, email in (("sasha", "Sasha@Example.com"), ("olena", "olena@mail.example.com"), ("oleh", "sasha@gmail.com")):
+            record = RecordContact(User(name))
+            record.add_email(Email(email))
+            self.index_test.add(record)
+
+    def tearDown(self) -> None:
+        del self.index_test
+
+    def test_by_domain_with_subdomains(self) -> None:
+        self.assertEqual(self.index_test.by_domain("example.com"), {"sasha", "olena"})
+        self.assertEqual(self.index_test.by_domain("EXAMPLE.com", subdomains=False), {"sasha"})
+        self.assertEqual(self.index_test.by_domain("ample.com"), set())
+
+    def test_by_local_part(self) -> None:
+        self.assertEqual(self.index_test.by_local_part("sasha"), {"sasha", "oleh"})
+
+    def test_domain_counts_and_remove(self) -> None:
+        """
+        The test_domain_counts_and_remove function tests that the counts follow the removal of a contact.
+        """
+        self.assertEqual(self.index_test.domain_counts(), {"example.com": 1, "mail.example.com": 1, "gmail.com": 1})
+        self.index_test.remove("olena")
+        self.assertEqual(self.index_test.domain_counts(), {"example.com": 1, "gmail.com": 1})
+        self.assertEqual(self.index_test.by_domain("example.com"), {"sasha"})
+
+
+class TestNameIndex(unittest.TestCase):
+    """Tests class NameIndex"""
+
+    def setUp(self) -> None:
+        self.index_test = NameIndex()
+        for name in ("sasha", "Sasko", "Olena", "Олександр", "Ann"):
+            self.index_test.add(RecordContact(User(name)))
+
+    def tearDown(self) -> None:
+        del self.index_test
+
+    def test_bounded_levenshtein(self) -> None:
+        self.assertEqual(bounded_levenshtein("sasha", "sahsa", 2), 2)
+        self.assertEqual(bounded_levenshtein("sasha", "olena", 2), None)
+
+    def test_closest_latin(self) -> None:
+        """
+        The test_closest_latin function tests that a typo finds the name and the closest names come first.
+        """
+        self.assertEqual(self.index_test.closest("Sasha"), [(0, "sasha"), (2, "Sasko")])
+        self.assertEqual(self.index_test.closest("sahsa", max_distance=2), [(2, "sasha")])
+
+    def test_closest_cyrillic(self) -> None:
+        self.assertEqual(self.index_test.closest("олексанр"), [(1, "Олександр")])
+        self.assertEqual(self.index_test.closest("Oleksander"), [(1, "Олександр")])
+
+    def test_search_key(self) -> None:
+        """
+        The test_search_key function tests the transliteration of names, including the letters spelt
+        differently at the beginning of a word, and that the key of an indexed name is kept.
+        """
+        self.assertEqual(search_key("Олександр"), "oleksandr")
+        self.assertEqual(search_key("Євген Щербина"), "yevhen shcherbyna")
+        self.assertEqual(search_key("Юлія"), "yuliia")
+        self.assertEqual(search_key("Знам'янка"), "znamianka")
+        self.assertEqual(search_key("OLEKSANDR"), "oleksandr")
+        self.assertEqual(self.index_test.key("Олександр"), "oleksandr")
+
+    def test_closest_short_name(self) -> None:
+        self.assertEqual(self.index_test.closest("an", max_distance=1), [(1, "Ann")])
+
+    def test_closest_limit_and_remove(self) -> None:
+        self.assertEqual(len(self.index_test.closest("sasha", limit=1)), 1)
+        self.index_test.remove("sasha")
+        self.assertEqual(self.index_test.closest("sasha"), [(2, "Sasko")])
+
+
+class TestBirthdayIndex(unittest.TestCase):
+    """Tests class BirthdayIndex"""
+
+    def setUp(self) -> None:
+        self.today = date.today()
+        self.index_test = BirthdayIndex()
+        self.records = {}
+        for name, days in (("sasha", 3), ("olena", 0), ("ann", 40), ("petro", None)):
+            self.records[name] = RecordContact(User(name))
+            if days is not None:
+                self.records[name].add_birthday(self.birthday(days))
+            self.index_test.add(self.records[name])
+
+    def tearDown(self) -> None:
+        del self.index_test
+
+    def birthday(self, days: int) -> date:
+        return (self.today + timedelta(days=days)).replace(year=1992)
+
+    def test_next_birthdays(self) -> None:
+        self.assertEqual(self.index_test.next_birthdays(2), [(self.today, "olena"), (self.today + timedelta(days=3), "sasha")])
+        self.assertEqual(len(self.index_test.next_birthdays(10)), 3)
+
+    def test_edit_and_remove(self) -> None:
+        """
+        The test_edit_and_remove function tests that a changed birthday moves the contact in the schedule,
+        and that many changes keep the heap small.
+        """
+        self.records["ann"].add_birthday(self.birthday(1))
+        self.index_test.add(self.records["ann"])
+        self.index_test.remove("olena")
+        self.assertEqual([name for _, name in self.index_test.next_birthdays(3)], ["ann", "sasha"])
+
+        for days in range(200):
+            self.records["sasha"].add_birthday(self.birthday(days % 300 + 2))
+            self.index_test.add(self.records["sasha"])
+        self.assertTrue(len(self.index_test._heap) <= 64)
+        self.assertEqual(len(self.index_test), 2)
+
+    def test_passed_birthday_moves_to_next_year(self) -> None:
+        tomorrow = self.today + timedelta(days=1)
+        birthdays = self.index_test.next_birthdays(3, today=tomorrow)
+        self.assertEqual([name for _, name in birthdays], ["sasha", "ann", "olena"])
+        self.assertTrue(birthdays[2][0] > self.today + timedelta(days=300))
+
+    def test_due(self) -> None:
+        """
+        The test_due function tests that every birthday due is yielded once.
+        """
+        self.assertEqual(list(self.index_test.due()), [(self.today, "olena")])
+        self.assertEqual(list(self.index_test.due()), [])
+        self.assertEqual(list(self.index_test.due(5)), [(self.today + timedelta(days=3), "sasha")])
+
+
+class TestTagIndex(unittest.TestCase):
+    """Tests class TagIndex"""
+
+    def setUp(self) -> None:
+        self.index_test = TagIndex()
+        self.records = {}
+        for number, tags in (("1", ["work", "urgent"]), ("2", ["work"]), ("3", []), ("70", ["home", "urgent"])):
+            self.records[number] = RecordNote(Note(f"note {number}"))
+            self.records[number].add_tags(*tags)
+            self.index_test.add(number, self.records[number])
+
+    def tearDown(self) -> None:
+        del self.index_test
+
+    def test_bitmaps(self) -> None:
+        self.assertEqual(bitmap_of([1, 2, 70]), (1 << 1) | (1 << 2) | (1 << 70))
+        self.assertEqual(list(bitmap_numbers(bitmap_of([0, 9, 64, 1000]))), ["0", "9", "64", "1000"])
+        self.assertEqual((bitmap_of([]), list(bitmap_numbers(0))), (0, []))
+
+    def test_tagged(self) -> None:
+        work, urgent = self.index_test.tagged("work"), self.index_test.tagged("urgent")
+        self.assertEqual(list(bitmap_numbers(work & urgent)), ["1"])
+        self.assertEqual(list(bitmap_numbers(self.index_test.notes & ~work)), ["3", "70"])
+        self.assertEqual(self.index_test.tagged("unknown"), 0)
+        self.assertEqual(self.index_test.counts(), {"home": 1, "urgent": 2, "work": 2})
+
+    def test_remove_and_rebuild(self) -> None:
+        self.index_test.remove("70", self.records["70"])
+        self.assertEqual(self.index_test.counts(), {"urgent": 1, "work": 2})
+        self.assertEqual(list(bitmap_numbers(self.index_test.notes)), ["1", "2", "3"])
+
+        bitmaps = (self.index_test.notes, self.index_test.tagged("work"), self.index_test.tagged("urgent"))
+        self.index_test.rebuild((number, self.records[number]) for number in ("1", "2", "3"))
+        self.assertEqual((self.index_test.notes, self.index_test.tagged("work"), self.index_test.tagged("urgent")), bitmaps)
+
+    def test_retag(self) -> None:
+        """
+        The test_retag function tests that a note is cleared from the bitmaps of its old tags only
+        and added to the bitmaps of its new tags.
+        """
+        old_tags = self.records["1"].note.tags
+        self.records["1"].remove_tags("work", "urgent")
+        self.records["1"].add_tags("home")
+        self.index_test._bitmaps["untouched"] = 1 << 1
+        self.index_test.retag("1", self.records["1"], old_tags)
+        self.assertEqual(self.index_test.counts(), {"home": 2, "untouched": 1, "urgent": 1, "work": 1})
+        self.assertEqual(list(bitmap_numbers(self.index_test.notes)), ["1", "2", "3", "70"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+"""Tests parallel search"""
+import unittest
+from datetime import datetime
+
+from my_address_book.address_book import AddressBook as AB
+from my_address_book.entities import Phone
+from my_address_book.entities import User
+from my_address_book.parallel_search import ParallelSearch
+from my_address_book.query import QueryError
+from my_address_book.records import RecordContact
+
+
+class TestParallelSearch(unittest.TestCase):
+    """Tests class ParallelSearch"""
+
+    def setUp(self) -> None:
+        self.addressbook_test = AB()
+        for number, name in enumerate(["sasha", "olena", "Олександр", "ann", "hanna", "petro", "Юлія"] * 5):
+            record = RecordContact(User(f"{name}{number}"))
+            record.add_phone_number(Phone(f"38095{number:07}"))
+            record.add_birthday(datetime(1990, number % 12 + 1, 1))
+            self.addressbook_test.add_record(record, sort=False)
+        self.addressbook_test.sort_book()
+        self.parallel_search_test = ParallelSearch(self.addressbook_test, shards=3, min_records=0)
+
+    def tearDown(self) -> None:
+        self.parallel_search_test.close()
+
+    def test_same_results_as_search(self) -> None:
+        """
+        The test_same_results_as_search function tests that the shards find the same contacts as the book,
+        in the same order.
+        """
+        for criteria in ("an", "oleks", "950000001", "-01-1990", "name:a NOT phone:3809500000", "~sahsa3"):
+            self.assertEqual(list(self.parallel_search_test.search(criteria)), list(self.addressbook_test.search(criteria)))
+
+    def test_book_changed(self) -> None:
+        self.assertEqual(len(self.parallel_search_test.search("zoryana")), 0)
+        self.addressbook_test.add_record(RecordContact(User("zoryana")))
+        self.assertEqual(list(self.parallel_search_test.search("zoryana")), ["zoryana"])
+
+    def test_query_error(self) -> None:
+        with self.assertRaises(QueryError):
+            self.parallel_search_test.search("name:")
+
+
+if __name__ == "__main__":
+    unittest.main()
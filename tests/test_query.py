@@ -0,0 +1,103 @@
+"""Tests query"""
+import unittest
+from datetime import date
+from datetime import timedelta
+
+from my_address_book.address_book import AddressBook as AB
+from my_address_book.entities import Email
+from my_address_book.entities import Phone
+from my_address_book.entities import User
+from my_address_book.query import And
+from my_address_book.query import QueryError
+from my_address_book.query import compile_query
+from my_address_book.query import is_query
+from my_address_book.records import RecordContact
+
+
+class TestQuery(unittest.TestCase):
+    """Tests the query language"""
+
+    def setUp(self) -> None:
+        today = date.today()
+        self.addressbook_test = AB()
+        contacts = [
+            ("Anna", "+380951234567", "anna@corp.com", today + timedelta(days=3)),
+            ("Олександр", "+380501112233", "oleks@mail.corp.com", today + timedelta(days=100)),
+            ("Sasha", "+48221234567", "sasha@gmail.com", None),
+            ("Hanna", "+380671234567", None, today + timedelta(days=10)),
+        ]
+        for name, phone, email, birthday in contacts:
+            record = RecordContact(User(name))
+            record.add_phone_number(Phone(phone))
+            if email:
+                record.add_email(Email(email))
+            if birthday:
+                record.add_birthday(birthday.replace(year=1992))
+            self.addressbook_test.add_record(record)
+
+    def tearDown(self) -> None:
+        del self.addressbook_test
+
+    def search(self, criteria: str) -> list[str]:
+        return list(self.addressbook_test.search(criteria))
+
+    def test_is_query(self) -> None:
+        self.assertTrue(is_query("name:ann"))
+        self.assertTrue(is_query("ann OR sasha"))
+        self.assertTrue(is_query("(phone:+380 bday:<30)"))
+        self.assertFalse(is_query("ann"))
+        self.assertFalse(is_query("-30"))
+        self.assertFalse(is_query("hostname:x"))
+
+    def test_fields(self) -> None:
+        """
+        The test_fields function tests every field of the query language.
+        """
+        self.assertEqual(self.search("name:ann"), ["Anna", "Hanna"])
+        self.assertEqual(self.search("name:oleks"), ["Олександр"])
+        self.assertEqual(self.search("phone:+380"), ["Anna", "Hanna", "Олександр"])
+        self.assertEqual(self.search("phone:0951234567"), ["Anna"])
+        self.assertEqual(self.search("email:@corp.com"), ["Anna", "Олександр"])
+        self.assertEqual(self.search("email:sasha@"), ["Sasha"])
+        self.assertEqual(self.search("email:anna@corp.com"), ["Anna"])
+        self.assertEqual(self.search("email:gmail"), ["Sasha"])
+        self.assertEqual(self.search("bday:<30"), ["Anna", "Hanna"])
+        self.assertEqual(self.search("bday:>30"), ["Олександр"])
+        self.assertEqual(self.search("bday:1992"), ["Anna", "Hanna", "Олександр"])
+
+    def test_operators(self) -> None:
+        """
+        The test_operators function tests AND (also implicit), OR, NOT, their precedence and parentheses.
+        """
+        self.assertEqual(self.search("name:ann phone:+380 bday:<5"), ["Anna"])
+        self.assertEqual(self.search("name:ann AND bday:<30"), ["Anna", "Hanna"])
+        self.assertEqual(self.search("name:sasha OR email:@corp.com"), ["Anna", "Sasha", "Олександр"])
+        self.assertEqual(self.search("phone:+380 NOT name:ann"), ["Олександр"])
+        self.assertEqual(self.search("name:sasha OR name:hanna bday:<30"), ["Hanna", "Sasha"])
+        self.assertEqual(self.search("(name:sasha OR name:oleks) phone:+380"), ["Олександр"])
+        self.assertEqual(self.search('name:"olek" OR sasha'), ["Sasha", "Олександр"])
+
+    def test_plan_order(self) -> None:
+        """
+        The test_plan_order function tests that the indexed and most selective terms of an AND come first.
+        """
+        plan = compile_query("bday:<30 name:ann email:anna@corp.com")
+        self.assertIsInstance(plan.root, And)
+        self.assertEqual([type(term).__name__ for term in plan.root.terms], ["EmailMatches", "NameContains", "BirthdayMatches"])
+        self.assertIs(compile_query("bday:<30 name:ann email:anna@corp.com"), plan)
+
+    def test_search_result_without_indexes(self) -> None:
+        """
+        The test_search_result_without_indexes function tests that a query on a search result gives the same contacts.
+        """
+        result = self.addressbook_test.search("phone:+380")
+        self.assertEqual(list(result.search("name:ann NOT bday:>5")), ["Anna"])
+
+    def test_errors(self) -> None:
+        for criteria in ("name:", "name:ann OR", "(name:ann", "name:ann )", "phone:abc", "NOT"):
+            with self.assertRaises(QueryError):
+                self.addressbook_test.search(criteria)
+
+
+if __name__ == "__main__":
+    unittest.main()
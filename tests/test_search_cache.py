@@ -0,0 +1,40 @@
+"""Tests search cache"""
+import unittest
+
+from my_address_book.search_cache import SearchCache
+
+
+class TestSearchCache(unittest.TestCase):
+    """Tests class SearchCache"""
+
+    def setUp(self) -> None:
+        self.cache_test = SearchCache(2)
+
+    def tearDown(self) -> None:
+        del self.cache_test
+
+    def test_hits_and_misses(self) -> None:
+        self.assertIsNone(self.cache_test.get("sasha"))
+        self.cache_test.put("sasha", ["sasha"])
+        self.assertEqual(self.cache_test.get("sasha"), ["sasha"])
+        self.assertEqual((self.cache_test.hits, self.cache_test.misses), (1, 1))
+
+    def test_least_recently_used_dropped(self) -> None:
+        """
+        The test_least_recently_used_dropped function tests that a full cache drops the result used longest ago.
+        """
+        self.cache_test.put("sasha", ["sasha"])
+        self.cache_test.put("olena", ["olena"])
+        self.cache_test.get("sasha")
+        self.cache_test.put("ann", ["ann"])
+        self.assertEqual(len(self.cache_test), 2)
+        self.assertIsNone(self.cache_test.get("olena"))
+        self.assertEqual(self.cache_test.get("sasha"), ["sasha"])
+
+        self.cache_test.clear()
+        self.assertEqual(len(self.cache_test), 0)
+        self.assertEqual(self.cache_test.hits, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
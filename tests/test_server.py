@@ -0,0 +1,146 @@
+"""Tests server"""
+import asyncio
+import json
+import os
+import unittest
+from datetime import datetime
+from http import HTTPStatus
+
+from my_address_book.address_book import AddressBook as AB
+from my_address_book.codec import CONTACTS
+from my_address_book.codec import DELTA_SUFFIX
+from my_address_book.codec import read_snapshot
+from my_address_book.entities import Note
+from my_address_book.entities import Phone
+from my_address_book.entities import User
+from my_address_book.index_store import index_file_name
+from my_address_book.notes_book import NotesBook as NB
+from my_address_book.records import RecordContact
+from my_address_book.records import RecordNote
+from my_address_book.server import BookServer
+from my_address_book.server import RequestError
+
+
+class TestBookServer(unittest.IsolatedAsyncioTestCase):
+    """Tests class BookServer"""
+
+    def setUp(self) -> None:
+        self.addressbook_test = AB()
+        record_test = RecordContact(User("sasha"))
+        record_test.add_birthday(datetime(1982, 6, 26))
+        record_test.add_phone_number(Phone("+380951234567"))
+        self.addressbook_test.add_record(record_test)
+
+        self.notesbook_test = NB()
+        self.notesbook_test.add_record(RecordNote(Note("some text")))
+
+        current_dir = os.getcwd()
+        self.test_file = os.path.join(current_dir, "tests", "test_file.bin")
+        self.server = BookServer(self.addressbook_test, self.notesbook_test, self.test_file, flush_interval=60)
+
+    def tearDown(self) -> None:
+        for file_name in (self.test_file, self.test_file + DELTA_SUFFIX, index_file_name(self.test_file)):
+            if os.path.exists(file_name):
+                os.remove(file_name)
+
+    async def test_get_and_search(self) -> None:
+        """
+        The test_get_and_search function tests the lookup of one contact, the contact search and the note search.
+        """
+        status, data = await self.server.handle("GET", "/contacts/sasha")
+        self.assertEqual(status, HTTPStatus.OK)
+        self.assertEqual(data["phones"][0]["value"], "+380951234567")
+
+        status, data = await self.server.handle("GET", "/contacts?q=38095")
+        self.assertEqual([contact["name"] for contact in data], ["sasha"])
+
+        status, data = await self.server.handle("GET", "/notes?q=some")
+        self.assertEqual(data[0]["note"], "some text")
+
+        await self.server.handle("GET", "/contacts?q=38095")
+        status, data = await self.server.handle("GET", "/stats")
+        self.assertEqual((data["contacts"]["hits"], data["contacts"]["misses"]), (1, 1))
+
+        with self.assertRaises(RequestError) as error:
+            await self.server.handle("GET", "/contacts/olena")
+        self.assertEqual(error.exception.status, HTTPStatus.NOT_FOUND)
+
+    async def test_add_delete_and_flush(self) -> None:
+        """
+        The test_add_delete_and_flush function tests that changes mark the book dirty and are saved by one flush.
+        """
+        body = json.dumps({"name": "olena", "phones": ["380501112233(work)"], "birthday": "01-01-1990"}).encode()
+        status, data = await self.server.handle("POST", "/contacts", body)
+        self.assertEqual(status, HTTPStatus.CREATED)
+        self.assertEqual(data["phones"], [{"value": "+380501112233", "assignment": "work"}])
+
+        with self.assertRaises(RequestError) as error:
+            await self.server.handle("POST", "/contacts", body)
+        self.assertEqual(error.exception.status, HTTPStatus.CONFLICT)
+
+        status, _ = await self.server.handle("DELETE", "/contacts/sasha")
+        self.assertEqual(status, HTTPStatus.OK)
+        self.assertTrue(self.server.dirty)
+        self.assertFalse(os.path.exists(self.test_file))
+
+        await self.server.flush()
+        self.assertFalse(self.server.dirty)
+        with open(self.test_file, "rb") as file:
+            self.assertEqual([name for name, _ in read_snapshot(file, CONTACTS)], ["olena"])
+
+    async def test_add_invalid(self) -> None:
+        with self.assertRaises(RequestError) as error:
+            await self.server.handle("POST", "/contacts", json.dumps({"name": "sasha 1"}).encode())
+        self.assertEqual(error.exception.status, HTTPStatus.UNPROCESSABLE_ENTITY)
+
+    async def test_bad_requests(self) -> None:
+        """
+        The test_bad_requests function tests that a broken search pattern and a bad Content-Length are answered with 400.
+        """
+        for target in ("/contacts?q=a(", "/notes?q=a("):
+            with self.assertRaises(RequestError) as error:
+                await self.server.handle("GET", target)
+            self.assertEqual(error.exception.status, HTTPStatus.BAD_REQUEST)
+
+        await self.server.start("127.0.0.1", 0)
+        try:
+            for length in ("abc", "-1"):
+                reader, writer = await asyncio.open_connection("127.0.0.1", self.server.port)
+                writer.write(f"POST /contacts HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode())
+                await writer.drain()
+                response = await reader.read()
+                self.assertTrue(response.startswith(b"HTTP/1.1 400"))
+                self.assertTrue(b"Invalid Content-Length" in response)
+                writer.close()
+                await writer.wait_closed()
+        finally:
+            await self.server.close()
+
+    async def test_keep_alive_connection(self) -> None:
+        """
+        The test_keep_alive_connection function tests that several requests are answered over one connection.
+        """
+        await self.server.start("127.0.0.1", 0)
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", self.server.port)
+            for path in ("/contacts/sasha", "/birthdays?days=366", "/unknown"):
+                writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+                await writer.drain()
+                status_line = await reader.readline()
+                headers = {}
+                while (line := await reader.readline()) != b"\r\n":
+                    key, _, value = line.decode().partition(":")
+                    headers[key.lower()] = value.strip()
+                body = await reader.readexactly(int(headers["content-length"]))
+                self.assertEqual(headers["connection"], "keep-alive")
+
+            self.assertTrue(status_line.startswith(b"HTTP/1.1 404"))
+            self.assertTrue("Unknown path" in json.loads(body)["error"])
+            writer.close()
+            await writer.wait_closed()
+        finally:
+            await self.server.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,248 @@
+"""Tests shards"""
+import os
+import pickle
+import shutil
+import threading
+import unittest
+from unittest.mock import patch
+
+from my_address_book.address_book import AddressBook as AB
+from my_address_book.codec import is_snapshot
+from my_address_book.entities import Note
+from my_address_book.entities import Phone
+from my_address_book.entities import User
+from my_address_book.index_store import INDEX_NAME
+from my_address_book.notes_book import NotesBook as NB
+from my_address_book.records import RecordContact
+from my_address_book.records import RecordNote
+from my_address_book.shards import MANIFEST_NAME
+from my_address_book.shards import ShardedStorage
+from my_address_book.shards import shard_of
+from my_address_book.storage import locked_directory
+
+
+class TestShards(unittest.TestCase):
+    """Tests the books saved in shards"""
+
+    def setUp(self) -> None:
+        self.test_dir = os.path.join(os.getcwd(), "tests", "test_shards", "")
+        self.addressbook_test = AB()
+        for number in range(40):
+            record = RecordContact(User(f"contact {number}"))
+            record.add_phone_number(Phone(f"0951234{number:03d}"))
+            self.addressbook_test.add_record(record, sort=False)
+        self.addressbook_test.sort_book()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+        if os.path.exists(self.test_dir.rstrip(os.sep) + ".bin"):
+            os.remove(self.test_dir.rstrip(os.sep) + ".bin")
+        del self.addressbook_test
+
+    def shard_files(self) -> set[str]:
+        return {name for name in os.listdir(self.test_dir) if name not in (MANIFEST_NAME, INDEX_NAME)}
+
+    def read_book(self) -> AB:
+        addressbook = AB()
+        addressbook.read_records_from_file(self.test_dir)
+        return addressbook
+
+    def names_in_one_shard(self) -> list[str]:
+        by_shard: dict[int, list[str]] = {}
+        for name in self.addressbook_test.data:
+            by_shard.setdefault(shard_of(name, 16), []).append(name)
+        return max(by_shard.values(), key=len)
+
+    def test_round_trip(self) -> None:
+        """
+        The test_round_trip function tests that a book saved in shards is read back in its order, with its indexes.
+        """
+        self.addressbook_test.save_records_to_file(self.test_dir)
+        self.assertEqual(len(self.shard_files()), 16)
+
+        addressbook = AB()
+        addressbook.read_records_from_file(self.test_dir)
+        self.assertEqual(list(addressbook.data), list(self.addressbook_test.data))
+        self.assertEqual(addressbook.lookup_phone("0951234007")[0].user.name, "contact 7")
+        self.assertEqual(addressbook.changed_keys, set())
+
+    def test_only_changed_shards_written(self) -> None:
+        """
+        The test_only_changed_shards_written function tests that a save rewrites only the shards of the changed
+        records and removes the files it replaced.
+        """
+        self.addressbook_test.save_records_to_file(self.test_dir)
+        addressbook = AB()
+        addressbook.read_records_from_file(self.test_dir)
+        files_before = self.shard_files()
+
+        addressbook.get_record("contact 3").add_phone_number(Phone("0447654321"))
+        addressbook.delete_record("contact 5")
+        storage = ShardedStorage(self.test_dir)
+        shards = {shard_of("contact 3", 16), shard_of("contact 5", 16)}
+        self.assertEqual(storage.save(addressbook), len(shards))
+        self.assertEqual(storage.save(addressbook), 0)
+        self.assertEqual(len(files_before - self.shard_files()), len(shards))
+        self.assertEqual(len(self.shard_files()), 16)
+
+        addressbook_read = AB()
+        addressbook_read.read_records_from_file(self.test_dir)
+        self.assertEqual(len(addressbook_read.get_record("contact 3").phone_numbers), 2)
+        self.assertFalse("contact 5" in addressbook_read)
+        self.assertEqual(len(addressbook_read), 39)
+
+    def test_failed_save(self) -> None:
+        """
+        The test_failed_save function tests that the changes of a failed save are written by the next one.
+        """
+        self.addressbook_test.save_records_to_file(self.test_dir)
+        self.addressbook_test.add_record(RecordContact(User("olena")))
+        with patch("my_address_book.shards.write_snapshot", side_effect=OSError("No space left on device")):
+            with self.assertRaises(OSError):
+                self.addressbook_test.save_records_to_file(self.test_dir)
+        self.assertEqual(self.addressbook_test.changed_keys, {"olena"})
+
+        self.assertEqual(ShardedStorage(self.test_dir).save(self.addressbook_test), 1)
+        addressbook = AB()
+        addressbook.read_records_from_file(self.test_dir)
+        self.assertTrue("olena" in addressbook)
+
+    def test_book_file_migrated(self) -> None:
+        """
+        The test_book_file_migrated function tests that the book file of the layout before the shards is read,
+        converted once when it was saved with pickle, and the first save writes all the shards.
+        """
+        self.addressbook_test.save_records_to_file(self.test_dir.rstrip(os.sep) + ".bin")
+        addressbook = AB()
+        addressbook.read_records_from_file(self.test_dir)
+        self.assertEqual(list(addressbook.data), list(self.addressbook_test.data))
+        self.assertEqual(ShardedStorage(self.test_dir).save(addressbook), 16)
+
+        shutil.rmtree(self.test_dir)
+        with open(self.test_dir.rstrip(os.sep) + ".bin", "wb") as file:
+            pickle.dump(self.addressbook_test.data, file)
+        addressbook = AB()
+        addressbook.read_records_from_file(self.test_dir)
+        self.assertEqual(list(addressbook.data), list(self.addressbook_test.data))
+        with open(self.test_dir.rstrip(os.sep) + ".bin", "rb") as file:
+            self.assertTrue(is_snapshot(file))
+
+    def test_two_writers(self) -> None:
+        """
+        The test_two_writers function tests that two processes saving the same shard keep the changes of both.
+        """
+        self.addressbook_test.save_records_to_file(self.test_dir)
+        first, second = self.read_book(), self.read_book()
+        name_first, name_second, name_deleted = self.names_in_one_shard()[:3]
+
+        first.get_record(name_first).add_phone_number(Phone("0441111111"))
+        first.save_records_to_file(self.test_dir)
+        second.get_record(name_second).add_phone_number(Phone("0442222222"))
+        second.delete_record(name_deleted)
+        second.save_records_to_file(self.test_dir)
+
+        addressbook = self.read_book()
+        self.assertEqual(addressbook.lookup_phone("0441111111")[0].user.name, name_first)
+        self.assertEqual(addressbook.lookup_phone("0442222222")[0].user.name, name_second)
+        self.assertFalse(name_deleted in addressbook)
+        self.assertEqual(second.shard_files.count(None), 1)
+
+    def test_reload_changed(self) -> None:
+        """
+        The test_reload_changed function tests that a book reads only the shards saved by another process
+        and keeps its changes not saved yet.
+        """
+        self.addressbook_test.save_records_to_file(self.test_dir)
+        first, second = self.read_book(), self.read_book()
+        self.assertEqual(second.reload_changed(self.test_dir), 0)
+        name_first, name_second = self.names_in_one_shard()[:2]
+
+        first.get_record(name_first).add_phone_number(Phone("0441111111"))
+        first.add_record(RecordContact(User("olena")))
+        first.save_records_to_file(self.test_dir)
+        second.get_record(name_second).add_phone_number(Phone("0442222222"))
+
+        shards = {shard_of(name_first, 16), shard_of("olena", 16)}
+        self.assertEqual(second.reload_changed(self.test_dir), len(shards))
+        self.assertEqual(second.reload_changed(self.test_dir), 0)
+        self.assertEqual(second.lookup_phone("0441111111")[0].user.name, name_first)
+        self.assertEqual(len(second.get_record(name_second).phone_numbers), 2)
+        self.assertEqual(list(second.data), list(first.data))
+        self.assertEqual(second.changed_keys, {name_second})
+
+        second.save_records_to_file(self.test_dir)
+        addressbook = self.read_book()
+        self.assertEqual(len(addressbook.get_record(name_first).phone_numbers), 2)
+        self.assertEqual(len(addressbook.get_record(name_second).phone_numbers), 2)
+        self.assertEqual(AB().reload_changed(self.test_dir), 0)
+
+    def test_locked_save(self) -> None:
+        """
+        The test_locked_save function tests that a save waits for the lock held on the directory.
+        """
+        self.addressbook_test.save_records_to_file(self.test_dir)
+        self.addressbook_test.add_record(RecordContact(User("olena")))
+        save = threading.Thread(target=self.addressbook_test.save_records_to_file, args=(self.test_dir,))
+        with locked_directory(self.test_dir, shared=True):
+            save.start()
+            save.join(0.2)
+            self.assertTrue(save.is_alive())
+        save.join(5)
+        self.assertFalse(save.is_alive())
+        self.assertTrue("olena" in self.read_book())
+
+    def test_notes(self) -> None:
+        """
+        The test_notes function tests that notes are read back in the order of their numbers
+        and a renumbering rewrites all the shards.
+        """
+        notesbook = NB()
+        for number in range(12):
+            notesbook.add_record(RecordNote(Note(f"note {number}")))
+        notesbook.save_records_to_file(self.test_dir)
+
+        notesbook_read = NB()
+        notesbook_read.read_records_from_file(self.test_dir)
+        self.assertEqual(list(notesbook_read.data), [str(number) for number in range(1, 13)])
+        notesbook_read.add_record(RecordNote(Note("note 12")))
+        self.assertEqual(notesbook_read.changed_keys, {"13"})
+
+        notesbook_read.delete_record("2")
+        notesbook_read.add_record(RecordNote(Note("note 13")))
+        self.assertEqual(notesbook_read.changed_keys, None)
+        self.assertEqual(ShardedStorage(self.test_dir).save(notesbook_read), 16)
+        with self.assertRaises(ValueError):
+            AB().read_records_from_file(self.test_dir)
+
+    def test_notes_two_writers(self) -> None:
+        """
+        The test_notes_two_writers function tests that the notes two processes add under the same numbers
+        and save at the same time are all kept.
+        """
+        notesbook = NB()
+        notesbook.add_record(RecordNote(Note("note 1")))
+        notesbook.save_records_to_file(self.test_dir)
+        books = [NB(), NB()]
+        for writer, book in enumerate(books):
+            book.read_records_from_file(self.test_dir)
+            for number in range(3):
+                book.add_record(RecordNote(Note(f"writer {writer} note {number}")))
+        threads = [threading.Thread(target=book.save_records_to_file, args=(self.test_dir,)) for book in books]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        notesbook_read = NB()
+        notesbook_read.read_records_from_file(self.test_dir)
+        self.assertEqual(list(notesbook_read.data), [str(number) for number in range(1, 8)])
+        expected = {"note 1"} | {f"writer {writer} note {number}" for writer in range(2) for number in range(3)}
+        self.assertEqual({record.note.note for record in notesbook_read.data.values()}, expected)
+
+        for book in books:
+            book.reload_changed(self.test_dir)
+            self.assertEqual({record.note.note for record in book.data.values()}, expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
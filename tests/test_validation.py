@@ -11,7 +11,7 @@ from my_address_book.entities import User
 from my_address_book.notes_book import NotesBook as NB
 from my_address_book.records import RecordContact
 from my_address_book.records import RecordNote
-from my_address_book.constants import current_dir, FILE_AB
+from my_address_book.constants import current_dir
 from my_address_book.validation import birthday_date_validation
 from my_address_book.validation import check_name_in_address_book
 from my_address_book.validation import check_name_not_in_address_book
@@ -184,7 +184,7 @@ class TestValidation(unittest.TestCase):
         self.assertEqual(error_message, "ValueError: The way is not exists!")
 
     def test_file_path(self):
-        path = Path(FILE_AB)
+        path = Path(__file__)
         error_message = check_path_address_to_sort_files_in_it(path)
         self.assertEqual(error_message, "ValueError: The path points to a file! Must point to a folder!")
 